@@ -0,0 +1,41 @@
+"""Compare two benchmark result files written by benchmarks.run
+
+    python -m benchmarks.compare before.json after.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+
+def load(path: Path) -> tuple[dict, dict]:
+    data = json.loads(path.read_text())
+    return data, {(r["scenario"], r["rows"]): r for r in data["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    args = parser.parse_args()
+
+    before_meta, before = load(args.before)
+    after_meta, after = load(args.after)
+    print(f"{before_meta['commit']} -> {after_meta['commit']}")
+    print(f"{'scenario':>12} {'rows':>7} {'time':>18} {'peak memory':>22} {'retained memory':>22} {'subprocesses':>14}")
+
+    for key in sorted(before.keys() & after.keys()):
+        b, a = before[key], after[key]
+        print(
+            f"{key[0]:>12} {key[1]:>7} "
+            f"{b['seconds']:7.3f}s {a['seconds']:7.3f}s ({a['seconds'] / b['seconds']:4.2f}x) "
+            f"{b['peak_memory_bytes'] / 2**20:7.1f} {a['peak_memory_bytes'] / 2**20:7.1f}MiB "
+            # results written before retained memory was measured don't have it
+            f"{b.get('retained_memory_bytes', 0) / 2**20:7.1f} {a.get('retained_memory_bytes', 0) / 2**20:7.1f}MiB "
+            f"{b['subprocesses']:6d} {a['subprocesses']:6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
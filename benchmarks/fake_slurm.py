@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import random
+import time
+from collections import Counter
+from typing import Optional
+from slutil.adapters.abstract_slurm_service import AbstractSlurmService
+
+
+class LatencySlurm(AbstractSlurmService):
+    """Simulates slurm, sleeping for `latency` seconds on each call and counting the subprocesses the real adapter would fork"""
+
+    def __init__(self, latency: float = 0.0, batch_size: int = 500, seed: int = 0):
+        self.latency = latency
+        self.batch_size = batch_size
+        self.subprocesses: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._next_id = 9_000_000
+        self._accessible_checked = False
+
+    def _fork(self, program: str):
+        self.subprocesses[program] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_job_status(self, job_id: int, allow_none: bool) -> Optional[str]:
+        self._fork("sacct")
+        return self._rng.choice(["RUNNING", "COMPLETED"])
+
+    def get_job_statuses(self, job_ids: list[int]) -> dict[int, str]:
+        for _ in range(0, len(job_ids), self.batch_size):
+            self._fork("sacct")
+        return {job_id: self._rng.choice(["RUNNING", "COMPLETED"]) for job_id in job_ids}
+
+    def submit_job(self, sbatch: str, dependency_type: Optional[str], dependency_list: list[int]) -> int:
+        self._fork("sbatch")
+        self._next_id += 1
+        return self._next_id
+
+    def test_slurm_accessible(self) -> bool:
+        # the real adapter caches the sinfo result for the life of the process
+        if not self._accessible_checked:
+            self._fork("sinfo")
+            self._accessible_checked = True
+        return True
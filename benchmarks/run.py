@@ -0,0 +1,150 @@
+"""Time the service layer against synthetic histories
+
+    python -m benchmarks.run --sizes 1000 10000 --latency 0.01 --output bench.json
+    python -m benchmarks.compare before.json after.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+from benchmarks.fake_slurm import LatencySlurm
+from benchmarks.synthetic import write_history
+from slutil.adapters.csv_repository import journal_path_for, lock_path_for
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.dto import FilterQuery, map_jobs_to_job_list
+from slutil.services.services import filter_jobs, get_job, recent, report
+
+
+def run_report(uow, slurm, active):
+    report(slurm, uow)
+
+
+def run_recent(uow, slurm, active):
+    recent(slurm, uow, 10)
+
+
+def run_filter(uow, slurm, active):
+    filter_jobs(uow, slurm, FilterQuery(description_filter=re.compile("sweep 1[0-9] ")))
+
+
+def run_get_job(uow, slurm, active):
+    get_job(slurm, uow, active[0] if active else 1_000_000)
+
+
+def run_load(uow, slurm, active):
+    # the whole history held in memory, as the daemon and `recent --live` do, with a listing of it for display
+    with uow:
+        jobs = uow.jobs.list_all()
+    return jobs, map_jobs_to_job_list(jobs)
+
+
+def run_commit(uow, slurm, active):
+    # a change to one job of a fully loaded history, the worst case for the csv file
+    with uow:
+        jobs = uow.jobs.list()
+        jobs[len(jobs) // 2].description = "edited by benchmark"
+        uow.commit()
+
+
+SCENARIOS: dict[str, Callable] = {
+    "report": run_report,
+    "recent": run_recent,
+    "filter_jobs": run_filter,
+    "get_job": run_get_job,
+    "commit": run_commit,
+    "load": run_load,
+}
+
+
+def fresh_copy(history: Path, csv_path: Path):
+    """Replace csv_path with history, dropping the journal which earlier runs' commits left next to it"""
+    for path in (journal_path_for(csv_path), lock_path_for(csv_path)):
+        if path.exists():
+            path.unlink()
+    shutil.copy(history, csv_path)
+
+
+def measure(scenario: Callable, history: Path, workdir: Path, active: list[int], latency: float) -> dict:
+    """Run one scenario against a fresh copy of the history, including the cost of reading it
+
+    tracemalloc slows python down considerably, so time and peak memory are taken from separate runs
+    """
+    csv_path = workdir / ".slutil_job_history.csv"
+
+    fresh_copy(history, csv_path)
+    slurm = LatencySlurm(latency)
+    start = time.perf_counter()
+    scenario(CsvUnitOfWork(csv_path), slurm, active)
+    elapsed = time.perf_counter() - start
+
+    fresh_copy(history, csv_path)
+    tracemalloc.start()
+    kept = scenario(CsvUnitOfWork(csv_path), LatencySlurm(0.0), active)
+    # what the scenario's result keeps alive, e.g. a loaded history, rather than what it needed on the way
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    return {
+        "seconds": elapsed,
+        "peak_memory_bytes": peak,
+        "retained_memory_bytes": retained,
+        "subprocesses": sum(slurm.subprocesses.values()),
+        "subprocesses_by_program": dict(slurm.subprocesses),
+    }
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "UNKNOWN"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="number of rows in each synthetic history")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds each simulated slurm call takes")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario, the fastest is reported")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", type=Path, default=None, help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        for size in args.sizes:
+            history = tmp_path / f"history_{size}.csv"
+            active = write_history(history, size)
+            for name in args.scenarios:
+                runs = [measure(SCENARIOS[name], history, tmp_path, active, args.latency) for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r["seconds"])
+                results.append({"scenario": name, "rows": size, **best})
+                print(
+                    f"{name:>12} {size:>7} rows  {best['seconds']:8.3f}s  {best['peak_memory_bytes'] / 2**20:8.1f}MiB peak"
+                    f"  {best['retained_memory_bytes'] / 2**20:8.1f}MiB retained  {best['subprocesses']:5d} subprocesses"
+                )
+
+    output = {
+        "commit": current_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "latency": args.latency,
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Synthetic job histories shaped like real ones: mostly finished jobs, a few active ones and pipelines of dependent jobs"""
+from __future__ import annotations
+
+import csv
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+FINISHED_STATUSES = ["COMPLETED"] * 8 + ["FAILED", "CANCELLED", "TIMEOUT", "OUT_OF_MEMORY"]
+ACTIVE_STATUSES = ["PENDING", "RUNNING"]
+DEPENDENCY_TYPES = ["afterok", "afterany", "afternotok"]
+
+
+def write_history(path: Path, rows: int, active_fraction: float = 0.02, dependency_fraction: float = 0.3, seed: int = 0) -> list[int]:
+    """Write a history of the given size to path, returning the slurm ids of the active jobs"""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    first_id = 1_000_000
+    active = []
+    commits = [f"{rng.getrandbits(28):07x}" for _ in range(max(1, rows // 200))]
+    sbatch_files = [f"experiments/sweep_{i}.sbatch" for i in range(20)]
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        for i in range(rows):
+            slurm_id = first_id + i
+            submitted = start + timedelta(minutes=i)
+            # the most recent jobs are the ones still running, like a real history
+            if i >= rows * (1 - active_fraction):
+                status = rng.choice(ACTIVE_STATUSES)
+                active.append(slurm_id)
+            else:
+                status = rng.choice(FINISHED_STATUSES)
+
+            dependency = ("none", "none", [])
+            if i > 0 and rng.random() < dependency_fraction:
+                # pipelines depend on one to three jobs submitted shortly before
+                upstream = sorted({slurm_id - rng.randint(1, min(i, 50)) for _ in range(rng.randint(1, 3))})
+                dependency = (rng.choice(DEPENDENCY_TYPES), "COMPLETED" if status not in ACTIVE_STATUSES else "PENDING", upstream)
+
+            writer.writerow([
+                slurm_id,
+                submitted.strftime("%Y-%m-%d %H:%M:%S"),
+                rng.choice(commits),
+                rng.choice(sbatch_files),
+                status,
+                f"sweep {i % 97} lr={rng.random():.4f}",
+                submitted.strftime("%Y-%m-%d %H:%M:%S"),
+                dependency[0],
+                dependency[1],
+                dependency[2],
+                rng.random() < 0.01,
+            ])
+
+    return active
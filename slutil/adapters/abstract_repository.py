@@ -2,9 +2,49 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterable, Iterator, Optional, Tuple
 from slutil.model.Record import Record
 
+
+def tracked_state(job: Record) -> tuple:
+    """Fields which need to be persisted when they change, last_updated is only written alongside other changes"""
+    return (
+        job.slurm_id,
+        job.submitted_timestamp,
+        job.git_tag,
+        job.sbatch,
+        job.status,
+        job.description,
+        job.dependencies.type if job.dependencies else None,
+        job.dependencies.state if job.dependencies else None,
+        tuple(job.dependencies.ids) if job.dependencies else (),
+        job.deleted,
+    )
+
+
+def merge_changes(job: Record, loaded_state: tuple, current: Record):
+    """Keep the changes made to job since it was read as loaded_state, taking the other fields from current"""
+    state = tracked_state(job)
+    if state[4] == loaded_state[4]:
+        job.status = current.status
+    if state[5] == loaded_state[5]:
+        job.description = current.description
+    if state[6:9] == loaded_state[6:9]:
+        job.dependencies = current.dependencies
+    if state[9] == loaded_state[9]:
+        job.deleted = current.deleted
+    job.last_updated = max(job.last_updated, current.last_updated)
+
+
+# [low, high) bounds on a job field, None for an open end
+Range = Tuple[Optional[Any], Optional[Any]]
+
+
+def in_range(value: Any, bounds: Range) -> bool:
+    low, high = bounds
+    return (low is None or value >= low) and (high is None or value < high)
+
+
 class AbstractRepository(ABC):
     @staticmethod
     @abstractmethod
@@ -28,10 +68,51 @@ class AbstractRepository(ABC):
     def get_deleted(self, job_id: int) -> Record:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_many(self, job_ids: Iterable[int]) -> list[Record]:
+        raise NotImplementedError
+
+    def find_many(self, job_ids: Iterable[int]) -> dict[int, Record]:
+        """The visible job for each id, leaving out ids without one"""
+        found = {}
+        for job_id in job_ids:
+            try:
+                found[job_id] = self.get(job_id)
+            except KeyError:
+                pass
+        return found
+
+    @abstractmethod
+    def hide(self, job_id: int) -> Record:
+        raise NotImplementedError
+
+    @abstractmethod
+    def unhide(self, job_id: int) -> Record:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_records(self) -> Iterator[Record]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def latest(self, count: int) -> list[Record]:
+        raise NotImplementedError
+
     @abstractmethod
     def list(self) -> list[Record]:
         raise NotImplementedError
 
+    def list_in_progress(self) -> list[Record]:
+        """Visible jobs which haven't reached a terminal status"""
+        return [j for j in self.list() if j.in_progress]
+
     @abstractmethod
     def list_all(self):
         raise NotImplementedError
+
+    def list_in_range(self, id_range: Range = (None, None), submitted_range: Range = (None, None)) -> list[Record]:
+        """Visible jobs whose slurm id and submitted timestamp are within the given ranges"""
+        return [
+            j for j in self.list()
+            if in_range(j.slurm_id, id_range) and in_range(j.submitted_timestamp, submitted_range)
+        ]
@@ -9,6 +9,11 @@ class AbstractSlurmService(ABC):
     def get_job_status(job_id: int, allow_none: bool) -> Optional[str]:
         raise NotImplementedError
 
+    @staticmethod
+    @abstractmethod
+    def get_job_statuses(job_ids: list[int]) -> dict[int, str]:
+        raise NotImplementedError
+
     @staticmethod
     @abstractmethod
     def submit_job(sbatch: str, dependency_type: Optional[str], dependency_list: list[int]) -> int:
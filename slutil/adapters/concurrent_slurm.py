@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import logging
+from slutil.adapters.abstract_slurm_service import AbstractSlurmService, SlurmNotAccessibleError
+
+
+class ConcurrentSlurmService(AbstractSlurmService):
+    """Looks up job statuses with one call per job, spread over a bounded thread pool
+
+    For installations where a single sacct call cannot return every job (per-job accounting ACLs, federated clusters)
+    """
+
+    def __init__(self, slurm_service: AbstractSlurmService, max_workers: int):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.slurm_service = slurm_service
+        self.max_workers = max_workers
+
+    def get_job_status(self, job_id: int, allow_none: bool) -> Optional[str]:
+        return self.slurm_service.get_job_status(job_id, allow_none)
+
+    def get_job_statuses(self, job_ids: list[int]) -> dict[int, str]:
+        unique_ids = list(dict.fromkeys(job_ids))
+        if not unique_ids:
+            return {}
+
+        if not self.slurm_service.test_slurm_accessible():
+            raise SlurmNotAccessibleError("Slurm accessed required but cannot access Slurm")
+
+        workers = min(self.max_workers, len(unique_ids))
+        logging.debug("getting latest status of %d jobs with %d workers", len(unique_ids), workers)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # map yields results in submission order, so the first failure is raised regardless of timing
+            results = list(pool.map(lambda job_id: self.slurm_service.get_job_status(job_id, True), unique_ids))
+
+        return {job_id: status for job_id, status in zip(unique_ids, results) if status is not None}
+
+    def submit_job(self, sbatch: str, dependency_type: Optional[str], dependency_list: list[int]) -> int:
+        return self.slurm_service.submit_job(sbatch, dependency_type, dependency_list)
+
+    def test_slurm_accessible(self) -> bool:
+        return self.slurm_service.test_slurm_accessible()
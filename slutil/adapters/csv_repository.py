@@ -2,53 +2,221 @@ from __future__ import annotations
 
 from pathlib import Path
 import csv
-import ast
-from typing import Optional
+import io
+import logging
+import re
+import sys
+from typing import Iterable, Iterator, Optional
+import heapq
+from bisect import bisect_left
+from operator import attrgetter
 
-from marshmallow import Schema, fields, validate
-from slutil.adapters.abstract_repository import AbstractRepository
+from slutil.adapters.abstract_repository import AbstractRepository, Range, in_range, merge_changes, tracked_state
+from slutil.adapters.file_lock import FileLock
 from slutil.model.Record import Record, Dependencies, DependencyType, JobStatus, DependencyState
+from slutil.instrumentation import profiler
 from datetime import datetime
+from functools import lru_cache
 
 class CSVFormatError(Exception):
     pass
 
 
-file_entry = {
-    "job_id": fields.Integer(),
-    "submitted_timestamp": fields.DateTime("%Y-%m-%d %H:%M:%S"),
-    "git_tag": fields.String(),
-    "sbatch": fields.String(),
-    "status": fields.Enum(JobStatus),
-    "description": fields.String(),
-    "last_updated": fields.DateTime("%Y-%m-%d %H:%M:%S"),
-    "dependency_type": fields.Enum(DependencyType, allow_none=True),
-    "dependency_state": fields.Enum(DependencyState, allow_none=True),
-    "dependency_ids": fields.String(validate=validate.Regexp(r"\[[^\]]*\]")),
-    "is_deleted": fields.Boolean()
-}
+# streaming scans find_many makes before it loads the whole file instead
+STREAMING_SCAN_LIMIT = 2
+
+
+def journal_path_for(csv_path: Path) -> Path:
+    """Changes made since the csv file was last written, as csv lines which replace the line for the same job"""
+    return csv_path.with_suffix(".journal")
+
+
+def lock_path_for(csv_path: Path) -> Path:
+    """Taken exclusively to append to the journal or compact it, and shared to read the journal and csv file"""
+    return csv_path.with_suffix(".lock")
+
+
+FIELD_NAMES = [
+    "job_id",
+    "submitted_timestamp",
+    "git_tag",
+    "sbatch",
+    "status",
+    "description",
+    "last_updated",
+    "dependency_type",
+    "dependency_state",
+    "dependency_ids",
+    "is_deleted",
+]
+
+
+@lru_cache(maxsize=None)
+def file_entry_schema():
+    # marshmallow is only needed by `slutil check`, so it is not imported until then
+    from marshmallow import Schema, fields, validate
+
+    file_entry = {
+        "job_id": fields.Integer(),
+        "submitted_timestamp": fields.DateTime("%Y-%m-%d %H:%M:%S"),
+        "git_tag": fields.String(),
+        "sbatch": fields.String(),
+        "status": fields.Enum(JobStatus),
+        "description": fields.String(),
+        "last_updated": fields.DateTime("%Y-%m-%d %H:%M:%S"),
+        "dependency_type": fields.Enum(DependencyType, allow_none=True),
+        "dependency_state": fields.Enum(DependencyState, allow_none=True),
+        "dependency_ids": fields.String(validate=validate.Regexp(r"\[[^\]]*\]")),
+        "is_deleted": fields.Boolean()
+    }
+    return Schema.from_dict(file_entry)()
+
+
+TIMESTAMP_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2})")
+DEPENDENCY_IDS_PATTERN = re.compile(r"\[([^\]]*)\]")
+JOB_STATUSES = dict(JobStatus.__members__)
+DEPENDENCY_TYPES = dict(DependencyType.__members__)
+DEPENDENCY_STATES = dict(DependencyState.__members__)
+# the strings marshmallow's Boolean field accepts
+TRUTHY = frozenset({"t", "T", "true", "True", "TRUE", "on", "On", "ON", "y", "Y", "yes", "Yes", "YES", "1"})
+FALSY = frozenset({"f", "F", "false", "False", "FALSE", "off", "Off", "OFF", "n", "N", "no", "No", "NO", "0"})
+
+
+def enum_error(members: dict) -> str:
+    return "Must be one of: {}.".format(", ".join(members))
+
+
+STATUS_ERROR = enum_error(JOB_STATUSES)
+DEPENDENCY_TYPE_ERROR = enum_error(DEPENDENCY_TYPES)
+DEPENDENCY_STATE_ERROR = enum_error(DEPENDENCY_STATES)
+
+
+def parse_timestamp(value: str) -> datetime:
+    match = TIMESTAMP_PATTERN.fullmatch(value)
+    if match:
+        return datetime(*map(int, match.groups()))
+    # unpadded fields are still accepted by strptime
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+
+def journal_key(line: dict) -> tuple:
+    """Identifies the job a line is for, the same job can be written with unpadded timestamps in hand edited files"""
+    try:
+        return (line["job_id"], parse_timestamp(line["submitted_timestamp"]))
+    except (ValueError, TypeError):
+        return (line["job_id"], line["submitted_timestamp"])
+
+
+def parse_dependency_ids(value: str) -> list[int]:
+    match = DEPENDENCY_IDS_PATTERN.match(value)
+    if match is None:
+        raise ValueError(f"invalid dependency id list: {value}")
+    return [int(i.strip().strip("'\"")) for i in match.group(1).split(",") if i.strip()]
+
+
+def check_line_length(line_num: int, line: dict):
+    if "error" in line.keys() or "error" in line.values():
+        raise CSVFormatError(f"CSV format error: line number {line_num} is of an incorrect length, please fix the csv before trying again")
+
+
+def format_errors(line_num: int, errors: dict) -> str:
+    error_fmt = "\n".join("{} {}".format(k, v) for k, v in errors.items())
+    return f"CSV record has errors, line {line_num}: {error_fmt}"
+
+
+def decode_line(line_num: int, line: dict) -> Record:
+    """Validate and convert a line in a single pass, reporting errors the same way as file_entry_schema"""
+    check_line_length(line_num, line)
+
+    errors: dict[str, list[str]] = {}
+
+    def convert(field: str, parser, message: str):
+        try:
+            return parser(line[field])
+        except (KeyError, ValueError):
+            errors[field] = [message]
+
+    job_id = convert("job_id", int, "Not a valid integer.")
+    submitted_timestamp = convert("submitted_timestamp", parse_timestamp, "Not a valid datetime.")
+    status = convert("status", JOB_STATUSES.__getitem__, STATUS_ERROR)
+    if line["last_updated"] == line["submitted_timestamp"] and submitted_timestamp is not None:
+        # never refreshed, share the datetime rather than holding two equal ones
+        last_updated = submitted_timestamp
+    else:
+        last_updated = convert("last_updated", parse_timestamp, "Not a valid datetime.")
+
+    dependency_type = line["dependency_type"]
+    if dependency_type != "none":
+        dependency_type = convert("dependency_type", DEPENDENCY_TYPES.__getitem__, DEPENDENCY_TYPE_ERROR)
+    dependency_state = line["dependency_state"]
+    if dependency_state != "none":
+        dependency_state = convert("dependency_state", DEPENDENCY_STATES.__getitem__, DEPENDENCY_STATE_ERROR)
+
+    if DEPENDENCY_IDS_PATTERN.match(line["dependency_ids"]) is None:
+        errors["dependency_ids"] = ["String does not match expected pattern."]
+
+    is_deleted = line["is_deleted"]
+    if is_deleted not in TRUTHY and is_deleted not in FALSY:
+        errors["is_deleted"] = ["Not a valid boolean."]
+
+    if errors:
+        raise CSVFormatError(format_errors(line_num, errors))
+
+    dependency = None
+    if dependency_type != "none" and dependency_state != "none":
+        try:
+            dependency_ids = parse_dependency_ids(line["dependency_ids"])
+        except ValueError:
+            raise CSVFormatError(format_errors(line_num, {"dependency_ids": ["Not a valid list of job ids."]}))
+        dependency = Dependencies(dependency_type, dependency_state, dependency_ids)
+
+    # commits and sbatch files repeat across thousands of jobs, interned they are stored once
+    return Record(
+        job_id,
+        submitted_timestamp,
+        sys.intern(line["git_tag"]),
+        sys.intern(line["sbatch"]),
+        status,
+        line["description"],
+        last_updated,
+        dependency,
+        deleted=is_deleted == "True",
+    )
 
-file_entry_schema = Schema.from_dict(file_entry)
 
 class CsvRepository(AbstractRepository):
+    filename = ".slutil_job_history.csv"
+
     def __init__(self, csv_path: Optional[Path]=None):
+        # the file is only read once a command needs it
+        self._loaded = False
+        # jobs in file order along with their state as it is in the file, filled by _load
         self._jobs: list[Record] = []
-        
+        self._snapshots: list[tuple] = []
+        # jobs added since the last commit
+        self._new: list[Record] = []
+        # jobs read by streaming lookups before the whole file was loaded, keyed by (slurm_id, submitted_timestamp)
+        self._streamed: dict[tuple, tuple[Record, tuple]] = {}
+        # first visible and first hidden job for each slurm id, kept in step by add, hide and unhide
+        self._live: dict[int, Record] = {}
+        self._hidden: dict[int, Record] = {}
+        # every job sorted by a column, with the sorted keys alongside for bisecting, rebuilt when jobs are added
+        self._columns: dict[str, tuple[int, list, list[Record]]] = {}
+        # file scans made by find_many before loading the whole file
+        self._find_many_scans = 0
+
         if csv_path:
             self.csv_path = csv_path
         else:
             self.csv_path = self.find_file()
-        
-        if self.csv_path:
-            self._load()
 
     @staticmethod
     def create_file():
-        open(".slutil_job_history.csv", "a+").close() 
+        open(CsvRepository.filename, "a+").close()
 
     @staticmethod
     def find_file() -> Optional[Path]:
-        filename = ".slutil_job_history.csv"
+        filename = CsvRepository.filename
         file_path = Path.cwd() / filename
 
         if file_path.exists():
@@ -63,58 +231,323 @@ class CsvRepository(AbstractRepository):
 
     def get(self, job_id: int) -> Record:
         try:
-            return next(x for x in self._jobs if x.slurm_id == job_id and not x.deleted)
-        except StopIteration:
+            if self._loaded:
+                return self._live[job_id]
+            return self._find_streaming({job_id}, deleted=False)[job_id]
+        except KeyError:
             raise KeyError("No job exists with specified id")
 
     def get_deleted(self, job_id: int) -> Record:
         try:
-            return next(x for x in self._jobs if x.slurm_id == job_id and x.deleted)
-        except StopIteration:
+            if self._loaded:
+                return self._hidden[job_id]
+            return self._find_streaming({job_id}, deleted=True)[job_id]
+        except KeyError:
             raise KeyError("No job has been deleted with the specified id")
 
+    def get_many(self, job_ids: Iterable[int]) -> list[Record]:
+        job_ids = list(job_ids)
+        if self._loaded:
+            return [self.get(j) for j in job_ids]
+
+        found = self._find_streaming(set(job_ids), deleted=False)
+        if any(j not in found for j in job_ids):
+            raise KeyError("No job exists with specified id")
+        return [found[j] for j in job_ids]
+
+    def find_many(self, job_ids: Iterable[int]) -> dict[int, Record]:
+        job_ids = set(job_ids)
+        if not self._loaded and self._find_many_scans >= STREAMING_SCAN_LIMIT:
+            # callers walking a dependency graph look up one level at a time, past a few levels loading is cheaper
+            self._load()
+        if self._loaded:
+            return {j: self._live[j] for j in job_ids if j in self._live}
+
+        self._find_many_scans += 1
+        return self._find_streaming(job_ids, deleted=False)
+
     def add(self, job: Record):
-        self._jobs.append(job)
+        self._new.append(job)
+        if self._loaded:
+            self._index(job)
+
+    def hide(self, job_id: int) -> Record:
+        job = self.get(job_id)
+        job.deleted = True
+        self._reindex(job_id)
+        return job
+
+    def unhide(self, job_id: int) -> Record:
+        job = self.get_deleted(job_id)
+        job.deleted = False
+        self._reindex(job_id)
+        return job
+
+    def _index(self, job: Record):
+        if job.deleted:
+            self._hidden.setdefault(job.slurm_id, job)
+        else:
+            self._live.setdefault(job.slurm_id, job)
+
+    def _reindex(self, job_id: int):
+        if not self._loaded:
+            return
+        # slurm ids can repeat in hand edited files, so rebuild the entries from file order
+        self._live.pop(job_id, None)
+        self._hidden.pop(job_id, None)
+        for job in self.list_all():
+            if job.slurm_id == job_id:
+                self._index(job)
+
+    def _ensure_loaded(self):
+        if not self._loaded and self.csv_path:
+            self._load()
+
+    @property
+    def journal_path(self) -> Optional[Path]:
+        return journal_path_for(self.csv_path) if self.csv_path else None
+
+    @property
+    def lock_path(self) -> Optional[Path]:
+        return lock_path_for(self.csv_path) if self.csv_path else None
+
+    def _read_journal(self) -> dict[tuple, dict]:
+        """The last journal line for each job, in the order the jobs first appear in the journal"""
+        try:
+            with open(self.journal_path, mode="r") as journal:  # type: ignore
+                text = journal.read()
+        except FileNotFoundError:
+            return {}
+
+        if not text.endswith("\n"):
+            # a writer is part way through appending, or stopped before finishing, either way the change isn't committed
+            logging.debug("ignoring incomplete last line of %s", self.journal_path)
+            text = text[:text.rfind("\n") + 1]
+
+        lines = {}
+        for line in csv.DictReader(io.StringIO(text), FIELD_NAMES, restval="error", restkey="error"):
+            lines[journal_key(line)] = line
+        return lines
+
+    def _read_lines(self) -> Iterator[tuple[int, dict]]:
+        """Lines of the csv file with the journal replayed over them, followed by the jobs only in the journal"""
+        if self.csv_path is None:
+            raise ValueError("csv_repository attempting to load from csv_path=None")
+
+        # the journal and csv file must be read as a pair, a compaction in between would replay journal lines older
+        # than the compacted file over it. Once open, the csv file is read as it was even if it is replaced
+        with FileLock(self.lock_path, shared=True):  # type: ignore
+            journal = self._read_journal()
+            csvfile = open(self.csv_path, mode="r")
+
+        unmatched = dict(journal)
+        journal_ids = {job_id for job_id, _ in journal}
+        rows = 0
+        try:
+            with csvfile:
+                reader = csv.DictReader(csvfile, FIELD_NAMES, restval="error", restkey="error")
+                for rows, line in enumerate(reader, 1):
+                    # only lines for jobs in the journal pay for parsing the timestamp
+                    if line["job_id"] in journal_ids:
+                        key = journal_key(line)
+                        if key in journal:
+                            line = journal[key]
+                            unmatched.pop(key, None)
+                    yield rows, line
+
+            for line in unmatched.values():
+                rows += 1
+                yield rows, line
+        finally:
+            profiler.count("rows_read", rows)
+
+    def _decode(self, line_num: int, line: dict) -> Record:
+        return decode_line(line_num, line)
+
+    def check(self) -> list[str]:
+        """Run the full schema validation over every line of the file, returning a description of each problem"""
+        problems = []
+        for line_num, line in self._read_lines():
+            try:
+                check_line_length(line_num, line)
+            except CSVFormatError as e:
+                problems.append(str(e))
+                continue
+
+            schema_line = {k: (None if k in ("dependency_state", "dependency_type") and v == "none" else v) for k, v in line.items()}
+            errors = file_entry_schema().validate(schema_line)
+            if errors:
+                problems.append(format_errors(line_num, errors))
+                continue
+
+            try:
+                decode_line(line_num, line)
+            except CSVFormatError as e:
+                problems.append(str(e))
+        return problems
+
+    def _materialise(self, line_num: int, line: dict) -> Record:
+        """Decode a line, reusing the job if it has already been handed out"""
+        record = self._decode(line_num, line)
+        key = (record.slurm_id, record.submitted_timestamp)
+        if key not in self._streamed:
+            self._streamed[key] = (record, tracked_state(record))
+        return self._streamed[key][0]
+
+    @staticmethod
+    def _line_job_id(line: dict) -> Optional[int]:
+        try:
+            return int(line["job_id"])
+        except (TypeError, ValueError):
+            return None
+
+    def _find_streaming(self, job_ids: set[int], deleted: bool) -> dict[int, Record]:
+        """Find the first job for each id, only decoding lines with a matching id and stopping once all are found"""
+        found: dict[int, Record] = {}
+        if self.csv_path is not None:
+            for line_num, line in self._read_lines():
+                job_id = self._line_job_id(line)
+                if job_id is None or (job_id in job_ids and job_id not in found):
+                    record = self._materialise(line_num, line)
+                    if record.deleted == deleted:
+                        found[record.slurm_id] = record
+                        if len(found) == len(job_ids):
+                            return found
+
+        for record in self._new:
+            if record.slurm_id in job_ids and record.slurm_id not in found and record.deleted == deleted:
+                found[record.slurm_id] = record
+        return found
 
     def _load(self):
         if self.csv_path is None:
             raise ValueError("csv_repository attempting to load from csv_path=None")
-        
-        with open(self.csv_path, mode="r") as csvfile:
-            reader = csv.DictReader(csvfile, list(file_entry.keys()), restval="error", restkey="error")
-            for line_num, line in enumerate(reader, 1):
-                if line["dependency_state"] == "none":
-                    line["dependency_state"] = None
-                if line["dependency_type"] == "none":
-                    line["dependency_type"] = None
-                
-                if "error" in line.keys() or "error" in line.values():
-                    raise CSVFormatError(f"CSV format error: line number {line_num} is of an incorrect length, please fix the csv before trying again")
-                
-                errors = file_entry_schema().validate(line)
-                if errors:
-                    error_fmt = "\n".join("{} {}".format(k, v) for k, v in errors.items())
-                    raise CSVFormatError(f"CSV record has errors, line {line_num}: {error_fmt}")
-
-                dependency = None
-                if line["dependency_type"] != None and line["dependency_state"] != None:
-                    dependency = Dependencies(DependencyType[line["dependency_type"]], DependencyState[line["dependency_state"]], [int(i) for i in ast.literal_eval(line["dependency_ids"])])
-                
-                record = Record(
-                    int(line["job_id"]),
-                    datetime.strptime(line["submitted_timestamp"], "%Y-%m-%d %H:%M:%S"),
-                    line["git_tag"],
-                    line["sbatch"],
-                    JobStatus[line["status"]],
-                    line["description"],
-                    datetime.strptime(line["last_updated"], "%Y-%m-%d %H:%M:%S"),
-                    dependency,
-                    deleted=line["is_deleted"] == "True",
-                )
+
+        with profiler.phase("csv_load"):
+            for line_num, line in self._read_lines():
+                record = self._decode(line_num, line)
+                state = tracked_state(record)
+                # jobs already handed out by streaming lookups keep their identity and any changes made to them
+                record, state = self._streamed.get((record.slurm_id, record.submitted_timestamp), (record, state))
                 self._jobs.append(record)
+                self._snapshots.append(state)
+
+        self._streamed = {}
+        self._loaded = True
+        for record in self.list_all():
+            self._index(record)
+
+    def iter_records(self) -> Iterator[Record]:
+        if self._loaded:
+            yield from self.list_all()
+            return
+
+        if self.csv_path is not None:
+            for line_num, line in self._read_lines():
+                yield self._materialise(line_num, line)
+        yield from self._new
+
+    def latest(self, count: int) -> list[Record]:
+        """The count visible jobs with the highest ids, only decoding the lines which are returned"""
+        if self._loaded or self._streamed or self.csv_path is None:
+            return heapq.nlargest(count, self.list())
+
+        def candidates():
+            for line_num, line in self._read_lines():
+                job_id = self._line_job_id(line)
+                if job_id is None:
+                    self._decode(line_num, line)
+                if line["is_deleted"] != "True":
+                    yield job_id, line_num, line
+
+        # nlargest is stable, so equal ids keep file order like sorting the full list would
+        top_lines = heapq.nlargest(count, candidates(), key=lambda c: c[0])
+        records = [self._materialise(line_num, line) for _, line_num, line in top_lines]
+        return heapq.nlargest(count, records + [j for j in self._new if not j.deleted])
+
+    def _changes(self) -> list[tuple[Record, tuple]]:
+        """Changed jobs along with their state as it was read"""
+        if not self._loaded:
+            return [(record, state) for record, state in self._streamed.values() if tracked_state(record) != state]
+        return [(j, state) for j, state in zip(self._jobs, self._snapshots) if tracked_state(j) != state]
+
+    def changed(self) -> list[Record]:
+        return [record for record, _ in self._changes()]
+
+    def read_jobs(self, keys: set[tuple]) -> dict[tuple, Record]:
+        """The jobs with the given (slurm_id, submitted_timestamp) keys as they are in the file, without tracking them"""
+        job_ids = {job_id for job_id, _ in keys}
+        found: dict[tuple, Record] = {}
+        if self.csv_path is not None:
+            for line_num, line in self._read_lines():
+                if self._line_job_id(line) in job_ids:
+                    record = self._decode(line_num, line)
+                    key = (record.slurm_id, record.submitted_timestamp)
+                    if key in keys:
+                        found.setdefault(key, record)
+        return found
+
+    def merge(self, current: CsvRepository):
+        """Rebase the changes made since the jobs were read onto current, the history as another process left it"""
+        changes = self._changes()
+        if not changes:
+            return
+
+        latest = current.read_jobs({(record.slurm_id, record.submitted_timestamp) for record, _ in changes})
+        for record, state in changes:
+            key = (record.slurm_id, record.submitted_timestamp)
+            if key in latest:
+                was_deleted = record.deleted
+                merge_changes(record, state, latest[key])
+                if record.deleted != was_deleted:
+                    self._reindex(record.slurm_id)
+
+    def added(self) -> list[Record]:
+        return self._new
+
+    def mark_clean(self):
+        if self._loaded:
+            self._jobs.extend(self._new)
+            self._snapshots = [tracked_state(j) for j in self._jobs]
+        else:
+            for record in [r for r, _ in self._streamed.values()] + self._new:
+                self._streamed[(record.slurm_id, record.submitted_timestamp)] = (record, tracked_state(record))
+        self._new = []
 
     def list(self) -> list[Record]:
-        return [j for j in self._jobs if not j.deleted]
+        return [j for j in self.list_all() if not j.deleted]
+
+    def _sorted_column(self, column: str) -> tuple[list, list[Record]]:
+        self._ensure_loaded()
+        # ids and submit times never change, so the order only goes stale when jobs are added
+        count = len(self._jobs) + len(self._new)
+        cached = self._columns.get(column)
+        if cached is None or cached[0] != count:
+            key = attrgetter(column)
+            ordered = sorted(self.list_all(), key=key)
+            cached = self._columns[column] = (count, [key(j) for j in ordered], ordered)
+        return cached[1], cached[2]
+
+    def list_in_range(self, id_range: Range = (None, None), submitted_range: Range = (None, None)) -> list[Record]:
+        """Binary search the sorted id and submit time columns, scanning only the narrower of the two spans"""
+        spans = []
+        for column, (low, high) in (("slurm_id", id_range), ("submitted_timestamp", submitted_range)):
+            if low is None and high is None:
+                continue
+            keys, ordered = self._sorted_column(column)
+            start = 0 if low is None else bisect_left(keys, low)
+            end = len(keys) if high is None else bisect_left(keys, high)
+            spans.append((end - start, ordered, start, end))
+
+        if not spans:
+            return self.list()
+
+        _, ordered, start, end = min(spans, key=lambda s: s[0])
+        return [
+            j for j in ordered[start:end]
+            if not j.deleted and in_range(j.slurm_id, id_range) and in_range(j.submitted_timestamp, submitted_range)
+        ]
 
     def list_all(self):
-        return [j for j in self._jobs]
+        self._ensure_loaded()
+        return self._jobs + self._new
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+from pathlib import Path
+import threading
+
+
+class FileLock:
+    """An advisory lock held on a separate file, so the locked file itself can be replaced
+
+    Writers take it exclusively. Readers take it shared while they open the files they read, so they never pair a
+    journal with a csv file compacted after it was read. Acquiring it again in a thread which holds it, through any
+    FileLock for the same path, only counts the nesting, flock is per open file so a new descriptor would wait on
+    the thread's own lock. Other threads open their own descriptor and wait like another process would. A nested
+    acquire can't turn a shared lock into an exclusive one, that would let another reader's view change under it.
+    """
+
+    # (process id, thread id, path): (descriptor, depth, shared) for every lock held, a forked child doesn't hold its
+    # parent's locks
+    _held: dict[tuple[int, int, str], tuple[int, int, bool]] = {}
+    _held_lock = threading.Lock()
+
+    def __init__(self, path: Path, shared: bool = False):
+        self.path = path
+        self.shared = shared
+
+    def _key(self) -> tuple[int, int, str]:
+        return (os.getpid(), threading.get_ident(), str(self.path))
+
+    def __enter__(self):
+        key = self._key()
+        with FileLock._held_lock:
+            held = FileLock._held.get(key)
+            if held is not None:
+                fd, depth, shared = held
+                if shared and not self.shared:
+                    raise RuntimeError(f"{self.path} is already locked shared, it can't be locked exclusively inside that")
+                FileLock._held[key] = (fd, depth + 1, shared)
+                return self
+
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        except PermissionError:
+            if not self.shared:
+                raise
+            # a reader of a history it can't write to, there's no writer to wait for unless one made the lock file
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                logging.debug("reading %s without a lock, it can't be created", self.path)
+                fd = -1
+        if fd >= 0:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+        with FileLock._held_lock:
+            FileLock._held[key] = (fd, 1, self.shared)
+        return self
+
+    def __exit__(self, *args):
+        key = self._key()
+        with FileLock._held_lock:
+            fd, depth, shared = FileLock._held[key]
+            if depth > 1:
+                FileLock._held[key] = (fd, depth - 1, shared)
+                return
+            del FileLock._held[key]
+        if fd >= 0:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
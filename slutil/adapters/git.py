@@ -1,6 +1,38 @@
+from __future__ import annotations
+
 import logging
-from slutil.adapters.abstract_vcs import AbstractVCS
+import os
 import subprocess
+from slutil.adapters.abstract_vcs import AbstractVCS
+
+# passed to `git status --untracked-files`, "normal" is git's own default, "all" also lists the files inside untracked
+# directories and "no" only looks at tracked files, override with SLUTIL_GIT_UNTRACKED
+DEFAULT_UNTRACKED = "normal"
+UNTRACKED_MODES = ("normal", "all", "no")
+
+
+def untracked_mode() -> str:
+    mode = os.getenv("SLUTIL_GIT_UNTRACKED", DEFAULT_UNTRACKED).lower()
+    if mode not in UNTRACKED_MODES:
+        logging.warning("invalid SLUTIL_GIT_UNTRACKED, using default of %s", DEFAULT_UNTRACKED)
+        return DEFAULT_UNTRACKED
+    return mode
+
+
+def is_slutil_file(path: str) -> bool:
+    # slutil writes its history, journal, lock and temp files and debug.log, they don't make the checkout dirty
+    name = os.path.basename(path.rstrip("/"))
+    return name.startswith(".slutil_") or name == "debug.log"
+
+
+def status_paths(porcelain: str) -> list[str]:
+    paths = []
+    for line in porcelain.splitlines():
+        if len(line) < 4:
+            continue
+        path = line[3:].split(" -> ")[-1]
+        paths.append(path.strip('"'))
+    return paths
 
 
 class Git(AbstractVCS):
@@ -13,18 +45,14 @@ class Git(AbstractVCS):
                 .decode()
             )
 
-            status = (
-                subprocess.check_output(["git", "status", "--porcelain"])
-                .decode()
-            )
-
-            # slutil writes to two files (.slutil_job_hisotry.csv and debug.log) 
-            # they show up as updated or untracked so we allow them to be changed
-            if status.count("\n") > 2:
+            command = ["git", "status", "--porcelain", f"--untracked-files={untracked_mode()}"]
+            logging.debug("running command: `%s`", " ".join(command))
+            status = subprocess.check_output(command).decode()
+            if any(not is_slutil_file(path) for path in status_paths(status)):
                 logging.debug("git directory dirty, adding [d] to commit tag")
                 output += "[d]"
 
             return output
         except subprocess.CalledProcessError as e:
             logging.debug("error running %s, stderr: %s, stdout: %s", e.cmd, e.stderr, e.stdout)
-            return "UNKNOWN"
\ No newline at end of file
+            return "UNKNOWN"
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Optional
+import logging
+from slutil.adapters.abstract_slurm_service import AbstractSlurmService, SlurmNotAccessibleError
+from slutil.model.Record import JobStatus
+
+
+class PolledSlurmService(AbstractSlurmService):
+    """Answers status lookups from the results of the last bulk poll, only asking slurm about jobs it has not seen
+
+    Used by the daemon, which calls poll on a schedule so queries never wait on sacct for jobs it already knows
+    """
+
+    def __init__(self, slurm_service: AbstractSlurmService):
+        self.slurm_service = slurm_service
+        # None records that sacct had nothing for the job yet, which is normal for recently submitted jobs
+        self._statuses: dict[int, Optional[str]] = {}
+        self._accessible: Optional[bool] = None
+
+    def poll(self, job_ids: list[int]):
+        job_ids = list(dict.fromkeys(job_ids))
+        if not job_ids:
+            self._accessible = self.slurm_service.test_slurm_accessible()
+            return
+
+        try:
+            statuses = self.slurm_service.get_job_statuses(job_ids)
+        except SlurmNotAccessibleError:
+            logging.warning("slurm not accessible when polling %d jobs", len(job_ids))
+            self._accessible = False
+            return
+
+        self._accessible = True
+        for job_id in job_ids:
+            self._statuses[job_id] = statuses.get(job_id)
+
+    def needs_polling(self, job_id: int) -> bool:
+        """Whether a job with an unfinished status in the history could still change in slurm"""
+        status = self._statuses.get(job_id)
+        return status is None or not JobStatus[status].is_terminal
+
+    def get_job_status(self, job_id: int, allow_none: bool) -> Optional[str]:
+        status = self.get_job_statuses([job_id]).get(job_id)
+        if status is None and not allow_none:
+            raise OSError(f"sacct command has unexpected output, no status returned for job {job_id}")
+        return status
+
+    def get_job_statuses(self, job_ids: list[int]) -> dict[int, str]:
+        if self._accessible is False:
+            raise SlurmNotAccessibleError("Slurm accessed required but cannot access Slurm")
+
+        unseen = [j for j in dict.fromkeys(job_ids) if j not in self._statuses]
+        if unseen:
+            self.poll(unseen)
+            if self._accessible is False:
+                raise SlurmNotAccessibleError("Slurm accessed required but cannot access Slurm")
+
+        return {j: self._statuses[j] for j in job_ids if self._statuses.get(j) is not None}  # type: ignore
+
+    def submit_job(self, sbatch: str, dependency_type: Optional[str], dependency_list: list[int]) -> int:
+        return self.slurm_service.submit_job(sbatch, dependency_type, dependency_list)
+
+    def test_slurm_accessible(self) -> bool:
+        if self._accessible is None:
+            self._accessible = self.slurm_service.test_slurm_accessible()
+        return self._accessible
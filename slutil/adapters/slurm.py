@@ -3,11 +3,40 @@ from __future__ import annotations
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService, SlurmError, SlurmNotAccessibleError
 import subprocess
 import re
+import os
+import time
 from typing import Optional
 import logging
 
 
+# number of job ids passed to a single sacct call, keeps the argument list well under ARG_MAX
+SACCT_BATCH_SIZE = 500
+
+SACCT_STATES = r"PENDING|RUNNING|SUSPENDED|COMPLETED|CANCELLED by \d*|FAILED|TIMEOUT|NODE_FAIL|PREEMPTED|BOOT_FAIL|DEADLINE|OUT_OF_MEMORY"
+
+
+# seconds the result of the `sinfo` reachability check is reused for, override with SLUTIL_SLURM_CHECK_TTL
+DEFAULT_ACCESS_CHECK_TTL = 60.0
+
+
+def access_check_ttl() -> float:
+    try:
+        return float(os.getenv("SLUTIL_SLURM_CHECK_TTL", DEFAULT_ACCESS_CHECK_TTL))
+    except ValueError:
+        logging.warning("invalid SLUTIL_SLURM_CHECK_TTL, using default of %s seconds", DEFAULT_ACCESS_CHECK_TTL)
+        return DEFAULT_ACCESS_CHECK_TTL
+
+
 class SlurmService(AbstractSlurmService):
+    # reachability is cached per process, shared by every instance
+    _accessible: Optional[bool] = None
+    _accessible_checked_at: float = 0.0
+
+    @staticmethod
+    def _record_access(accessible: Optional[bool]):
+        SlurmService._accessible = accessible
+        SlurmService._accessible_checked_at = time.monotonic()
+
     @staticmethod
     def get_job_status(job_id: int, allow_none: bool):
         logging.debug(
@@ -16,7 +45,7 @@ class SlurmService(AbstractSlurmService):
         if not SlurmService.test_slurm_accessible():
             raise SlurmNotAccessibleError("Slurm accessed required but cannot access Slurm")
 
-        regex_pattern = rf"^(JobID\|State\|\n)({job_id})\|(PENDING|RUNNING|SUSPENDED|COMPLETED|CANCELLED by \d*|FAILED|TIMEOUT|NODE_FAIL|PREEMPTED|BOOT_FAIL|DEADLINE|OUT_OF_MEMORY)\|$"
+        regex_pattern = rf"^(JobID\|State\|\n)({job_id})\|({SACCT_STATES})\|$"
 
         command = ["sacct", "-j", str(job_id), "-o", "JOBID,State", "--parsable", "-X"]
         logging.debug("running command: , `%s`", " ".join(command))
@@ -25,6 +54,7 @@ class SlurmService(AbstractSlurmService):
             output = subprocess.check_output(command).strip().decode()
         except subprocess.CalledProcessError as e:
             logging.error("subprocess error when running command")
+            SlurmService._record_access(None)
             raise SlurmError(f"Error running {e.cmd}, process error message: {e.stderr}")
 
         logging.debug("command returned: %s", output)
@@ -49,6 +79,46 @@ class SlurmService(AbstractSlurmService):
             f"sacct command has unexpected output \nexpected:\n{regex_match}\ngot:\n{output}"
         )
 
+    @staticmethod
+    def get_job_statuses(job_ids: list[int]) -> dict[int, str]:
+        logging.debug("getting latest status of %d jobs", len(job_ids))
+        if not job_ids:
+            return {}
+
+        if not SlurmService.test_slurm_accessible():
+            raise SlurmNotAccessibleError("Slurm accessed required but cannot access Slurm")
+
+        line_pattern = re.compile(rf"^(\d+)\|({SACCT_STATES})\|$")
+        unique_ids = list(dict.fromkeys(job_ids))
+        statuses: dict[int, str] = {}
+
+        for start in range(0, len(unique_ids), SACCT_BATCH_SIZE):
+            batch = unique_ids[start:start + SACCT_BATCH_SIZE]
+            command = ["sacct", "-j", ",".join(map(str, batch)), "-o", "JOBID,State", "--parsable", "-X"]
+            logging.debug("running command: , `%s`", " ".join(command))
+
+            try:
+                output = subprocess.check_output(command).strip().decode()
+            except subprocess.CalledProcessError as e:
+                logging.error("subprocess error when running command")
+                SlurmService._record_access(None)
+                raise SlurmError(f"Error running {e.cmd}, process error message: {e.stderr}")
+
+            logging.debug("command returned: %s", output)
+
+            for line in output.splitlines()[1:]:
+                regex_match = line_pattern.fullmatch(line.strip())
+                if regex_match is None:
+                    logging.debug("skipping unrecognised sacct line: %s", line)
+                    continue
+                status = regex_match.group(2)
+                if "CANCELLED by" in status:
+                    status = status[:9]
+                statuses[int(regex_match.group(1))] = status
+
+        logging.debug("extracted statuses: %s", statuses)
+        return statuses
+
     @staticmethod
     def submit_job(
         sbatch: str, dependency_type: Optional[str], dependency_list: list[int]
@@ -58,26 +128,25 @@ class SlurmService(AbstractSlurmService):
 
         logging.debug("submitting slurm job")
 
-        command = f"sbatch"
+        # an argument list rather than a shell command, the sbatch path can come from a manifest
+        command = ["sbatch"]
         if dependency_type:
-            dependency = ""
             if dependency_type == "singleton":
-                dependency = f" --dependency={dependency_type}"
+                dependency = f"--dependency={dependency_type}"
             else:
-                dependency = f" --dependency={dependency_type}:{':'.join(map(str, dependency_list))}"
+                dependency = f"--dependency={dependency_type}:{':'.join(map(str, dependency_list))}"
             logging.debug("adding dependency section: %s", dependency)
-            command += dependency
-        command += f" {sbatch}"
+            command.append(dependency)
+        command.append(sbatch)
         logging.debug("running command: %s", command)
 
         try:
-            proc = subprocess.run(command, check=True, capture_output=True, shell=True)
+            proc = subprocess.run(command, check=True, capture_output=True)
             logging.debug("command returned: %s", proc.stdout.decode("utf-8"))
         except subprocess.CalledProcessError as e:
             logging.error("subprocess error when running command")
-            raise SlurmError(f"Error running {e.cmd}, process error message: {e.stderr}")
-
-
+            SlurmService._record_access(None)
+            raise SlurmError(f"Error running {' '.join(e.cmd)}, process error message: {e.stderr}")
 
         # proc.stdout should be "Submitted batch job XXXXXX"
         regex_match = re.match(
@@ -93,11 +162,18 @@ class SlurmService(AbstractSlurmService):
 
     @staticmethod
     def test_slurm_accessible():
+        cache_age = time.monotonic() - SlurmService._accessible_checked_at
+        if SlurmService._accessible is not None and cache_age < access_check_ttl():
+            logging.debug("using cached slurm access result: %s", SlurmService._accessible)
+            return SlurmService._accessible
+
         logging.debug("testing slurm access with `sinfo`")
         try:
             subprocess.run(["sinfo"], capture_output=True, check=True)
             logging.debug("successfully accessed slurm")
+            SlurmService._record_access(True)
             return True
         except:
             logging.warning("cannot access slurm")
+            SlurmService._record_access(False)
             return False
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+import heapq
+from slutil.adapters.abstract_repository import AbstractRepository, Range, in_range, merge_changes, tracked_state
+from slutil.model.Record import Record, Dependencies, DependencyType, JobStatus, DependencyState, TERMINAL_STATUSES
+from slutil.instrumentation import profiler
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    job_id INTEGER NOT NULL,
+    submitted_timestamp TEXT NOT NULL,
+    git_tag TEXT NOT NULL,
+    sbatch TEXT NOT NULL,
+    status TEXT NOT NULL,
+    description TEXT NOT NULL,
+    last_updated TEXT NOT NULL,
+    dependency_type TEXT,
+    dependency_state TEXT,
+    dependency_ids TEXT NOT NULL,
+    is_deleted INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_job_id ON jobs (job_id);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_submitted_timestamp ON jobs (submitted_timestamp);
+-- nearly every job is visible, so the index was never selective and led latest() to sort instead of using jobs_job_id
+DROP INDEX IF EXISTS jobs_is_deleted;
+"""
+
+COLUMNS = (
+    "job_id",
+    "submitted_timestamp",
+    "git_tag",
+    "sbatch",
+    "status",
+    "description",
+    "last_updated",
+    "dependency_type",
+    "dependency_state",
+    "dependency_ids",
+    "is_deleted",
+)
+
+
+def serialise_job(job: Record) -> tuple:
+    return (
+        job.slurm_id,
+        job.submitted_timestamp.strftime(TIMESTAMP_FORMAT),
+        job.git_tag,
+        job.sbatch,
+        job.status.name,
+        job.description,
+        job.last_updated.strftime(TIMESTAMP_FORMAT),
+        job.dependencies.type.name if job.dependencies else None,
+        job.dependencies.state.name if job.dependencies else None,
+        ",".join(map(str, job.dependencies.ids)) if job.dependencies else "",
+        int(job.deleted),
+    )
+
+
+def deserialise_job(row: sqlite3.Row) -> Record:
+    dependency = None
+    if row["dependency_type"] is not None and row["dependency_state"] is not None:
+        ids = [int(i) for i in row["dependency_ids"].split(",") if i]
+        dependency = Dependencies(DependencyType[row["dependency_type"]], DependencyState[row["dependency_state"]], ids)
+
+    submitted_timestamp = datetime.strptime(row["submitted_timestamp"], TIMESTAMP_FORMAT)
+    if row["last_updated"] == row["submitted_timestamp"]:
+        last_updated = submitted_timestamp
+    else:
+        last_updated = datetime.strptime(row["last_updated"], TIMESTAMP_FORMAT)
+
+    # commits and sbatch files repeat across thousands of jobs, interned they are stored once
+    return Record(
+        row["job_id"],
+        submitted_timestamp,
+        sys.intern(row["git_tag"]),
+        sys.intern(row["sbatch"]),
+        JobStatus[row["status"]],
+        row["description"],
+        last_updated,
+        dependency,
+        deleted=bool(row["is_deleted"]),
+    )
+
+
+class SqliteRepository(AbstractRepository):
+    filename = ".slutil_job_history.sqlite"
+
+    def __init__(self, db_path: Optional[Path]=None):
+        # rows read from the database, keyed by rowid, along with their state when they were read
+        self._rows: dict[int, Record] = {}
+        self._snapshots: dict[int, tuple] = {}
+        self._new: list[Record] = []
+        self._connection: Optional[sqlite3.Connection] = None
+
+        if db_path:
+            self.db_path = db_path
+        else:
+            self.db_path = self.find_file()
+
+    @staticmethod
+    def create_file(directory: Optional[Path]=None):
+        db_path = (directory or Path.cwd()) / SqliteRepository.filename
+        connection = sqlite3.connect(db_path)
+        try:
+            connection.executescript(SCHEMA)
+            connection.commit()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def find_file() -> Optional[Path]:
+        file_path = Path.cwd() / SqliteRepository.filename
+
+        if file_path.exists():
+            return file_path
+
+        for directory in Path.cwd().parents:
+            file_path = directory / SqliteRepository.filename
+            if file_path.exists():
+                return file_path
+
+        return None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if self.db_path is None:
+                raise ValueError("sqlite_repository attempting to connect to db_path=None")
+            self._connection = sqlite3.connect(self.db_path)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _track(self, row: sqlite3.Row) -> Record:
+        rowid = row["id"]
+        if rowid not in self._rows:
+            record = deserialise_job(row)
+            self._rows[rowid] = record
+            self._snapshots[rowid] = tracked_state(record)
+            profiler.count("rows_read")
+        return self._rows[rowid]
+
+    def _find(self, job_id: int, deleted: bool) -> Optional[Record]:
+        # changes made in this unit of work take precedence over the stored is_deleted flag
+        rows = self.connection.execute("SELECT * FROM jobs WHERE job_id = ? ORDER BY id", (job_id,))
+        for row in rows:
+            record = self._track(row)
+            if record.deleted == deleted:
+                return record
+
+        return next((x for x in self._new if x.slurm_id == job_id and x.deleted == deleted), None)
+
+    def get(self, job_id: int) -> Record:
+        record = self._find(job_id, False)
+        if record is None:
+            raise KeyError("No job exists with specified id")
+        return record
+
+    def get_deleted(self, job_id: int) -> Record:
+        record = self._find(job_id, True)
+        if record is None:
+            raise KeyError("No job has been deleted with the specified id")
+        return record
+
+    def get_many(self, job_ids: Iterable[int]) -> list[Record]:
+        return [self.get(j) for j in job_ids]
+
+    def find_many(self, job_ids: Iterable[int]) -> dict[int, Record]:
+        job_ids = list(dict.fromkeys(job_ids))
+        found: dict[int, Record] = {}
+        # older sqlite builds allow at most 999 parameters in a statement
+        for start in range(0, len(job_ids), 500):
+            batch = job_ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in batch)
+            for row in self.connection.execute(f"SELECT * FROM jobs WHERE job_id IN ({placeholders}) ORDER BY id", batch):
+                record = self._track(row)
+                if not record.deleted:
+                    found.setdefault(record.slurm_id, record)
+
+        for record in self._new:
+            if record.slurm_id in job_ids and not record.deleted:
+                found.setdefault(record.slurm_id, record)
+        return found
+
+    def add(self, job: Record):
+        self._new.append(job)
+
+    def hide(self, job_id: int) -> Record:
+        job = self.get(job_id)
+        job.deleted = True
+        return job
+
+    def unhide(self, job_id: int) -> Record:
+        job = self.get_deleted(job_id)
+        job.deleted = False
+        return job
+
+    def iter_records(self) -> Iterator[Record]:
+        for row in self.connection.execute("SELECT * FROM jobs ORDER BY id"):
+            yield self._track(row)
+        yield from self._new
+
+    def latest(self, count: int) -> list[Record]:
+        rows = self.connection.execute("SELECT * FROM jobs WHERE is_deleted = 0 ORDER BY job_id DESC, id LIMIT ?", (count,))
+        candidates = [self._track(row) for row in rows] + self._new
+        return heapq.nlargest(count, [j for j in candidates if not j.deleted])
+
+    def list_in_range(self, id_range: Range = (None, None), submitted_range: Range = (None, None)) -> list[Record]:
+        conditions = ["1 = 1"]
+        parameters: list = []
+        for column, (low, high) in (("job_id", id_range), ("submitted_timestamp", submitted_range)):
+            if column == "submitted_timestamp":
+                low, high = [b.strftime(TIMESTAMP_FORMAT) if b is not None else None for b in (low, high)]
+            if low is not None:
+                conditions.append(f"{column} >= ?")
+                parameters.append(low)
+            if high is not None:
+                conditions.append(f"{column} < ?")
+                parameters.append(high)
+
+        # the stored is_deleted flag can be out of date for jobs hidden or restored in this unit of work
+        rows = self.connection.execute(f"SELECT * FROM jobs WHERE {' AND '.join(conditions)} ORDER BY id", parameters)
+        candidates = [self._track(row) for row in rows] + [
+            j for j in self._new
+            if in_range(j.slurm_id, id_range) and in_range(j.submitted_timestamp, submitted_range)
+        ]
+        return [j for j in candidates if not j.deleted]
+
+    def _list_visible(self, condition: str, parameters: Iterable = ()) -> list[Record]:
+        """Visible jobs, from the rows matching condition which aren't stored as deleted
+
+        Rows read earlier in this unit of work are included when they still match in memory, which covers jobs
+        restored here but stored as deleted.
+        """
+        rows = self.connection.execute(f"SELECT * FROM jobs WHERE is_deleted = 0 AND {condition} ORDER BY id", parameters)
+        found = {row["id"]: self._track(row) for row in rows}
+        found.update((rowid, record) for rowid, record in self._rows.items() if rowid not in found)
+        return [found[rowid] for rowid in sorted(found) if not found[rowid].deleted] + [j for j in self._new if not j.deleted]
+
+    def list(self) -> list[Record]:
+        return self._list_visible("1 = 1")
+
+    def list_in_progress(self) -> list[Record]:
+        # listing the unfinished statuses lets sqlite use jobs_status, NOT IN would scan the table
+        unfinished = [s.name for s in JobStatus if s not in TERMINAL_STATUSES]
+        placeholders = ", ".join("?" for _ in unfinished)
+        # rows read earlier may have finished in memory since, so they are filtered again
+        candidates = self._list_visible(f"status IN ({placeholders})", unfinished)
+        return [j for j in candidates if j.in_progress]
+
+    def list_all(self):
+        rows = self.connection.execute("SELECT * FROM jobs ORDER BY id")
+        return [self._track(row) for row in rows] + self._new
+
+    def changed(self) -> dict[int, Record]:
+        return {
+            rowid: record
+            for rowid, record in self._rows.items()
+            if tracked_state(record) != self._snapshots[rowid]
+        }
+
+    def save(self):
+        """Write rows which were added or changed since they were read, then commit the transaction"""
+        changed = self.changed()
+        if not changed and not self._new:
+            return
+
+        connection = self.connection
+        if changed:
+            # take the write lock before reading, so no other process can write between the read and the update
+            if not connection.in_transaction:
+                connection.execute("BEGIN IMMEDIATE")
+            rowids = list(changed)
+            # older sqlite builds allow at most 999 parameters in a statement
+            for start in range(0, len(rowids), 500):
+                batch = rowids[start:start + 500]
+                placeholders = ", ".join("?" for _ in batch)
+                for row in connection.execute(f"SELECT * FROM jobs WHERE id IN ({placeholders})", batch):
+                    merge_changes(changed[row["id"]], self._snapshots[row["id"]], deserialise_job(row))
+
+        assignments = ", ".join(f"{c} = ?" for c in COLUMNS)
+        connection.executemany(
+            f"UPDATE jobs SET {assignments} WHERE id = ?",
+            [serialise_job(record) + (rowid,) for rowid, record in changed.items()],
+        )
+
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        for record in self._new:
+            cursor = connection.execute(f"INSERT INTO jobs ({', '.join(COLUMNS)}) VALUES ({placeholders})", serialise_job(record))
+            self._rows[cursor.lastrowid] = record
+            self._snapshots[cursor.lastrowid] = tracked_state(record)
+        connection.commit()
+        profiler.count("rows_written", len(changed) + len(self._new))
+
+        for rowid, record in changed.items():
+            self._snapshots[rowid] = tracked_state(record)
+        self._new = []
+
+    def rollback(self):
+        if self._connection is not None:
+            self._connection.rollback()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,22 @@
+from slutil.adapters.csv_repository import CsvRepository, CSVFormatError
+import click
+import logging
+
+def cmd_check():
+    """Validate every line of the slutil csv datafile
+
+    Reports all problems found rather than stopping at the first one.
+    """
+    logging.debug("cli: check requested")
+
+    csv_path = CsvRepository.find_file()
+    if csv_path is None:
+        raise FileNotFoundError("No .slutil_job_history.csv file found in current directory or parents. Please use 'slutil init' to create the file")
+
+    problems = CsvRepository(csv_path).check()
+    for problem in problems:
+        click.echo(problem)
+
+    if problems:
+        raise CSVFormatError(f"{len(problems)} problems found in {csv_path}")
+    click.echo(f"No problems found in {csv_path}")
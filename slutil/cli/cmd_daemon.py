@@ -0,0 +1,28 @@
+from slutil.services.abstract_uow import AbstractUnitOfWork
+from slutil.adapters.abstract_slurm_service import AbstractSlurmService
+import click
+import logging
+
+
+def cmd_daemon(uow: AbstractUnitOfWork, slurm: AbstractSlurmService, interval: float):
+    """Serve status, recent, filter and report from memory, polling Slurm in the background
+
+    While the daemon is running those commands are answered by it instead of reading the datafile and calling Slurm
+    themselves. Stop it with Ctrl+C.
+    """
+    logging.debug("cli: daemon requested, interval: %s", interval)
+    from slutil.services.daemon import DaemonServer
+
+    with uow:
+        history_path = uow.path
+    if history_path is None:
+        raise FileNotFoundError("No slutil datafile found in current directory or parents. Please use 'slutil init' to create the file")
+
+    server = DaemonServer(history_path, slurm, interval)
+    click.echo(f"slutil daemon serving {history_path} on {server.server_address}, press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,12 +1,16 @@
 from slutil.services.abstract_uow import AbstractUnitOfWork
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService
 from slutil.services.services import filter_jobs, FilterQuery
-from slutil.cli.formatter import create_jobs_table
-from rich.console import Console
+from slutil.services.dto import JobListResponse, Page
+from slutil.cli.paging import page_caption, resolve_page, show_in_pager
+import click
 import re
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 import logging
 
+if TYPE_CHECKING:
+    from slutil.services.daemon import DaemonClient
+
 def cmd_filter(
     uow: AbstractUnitOfWork,
     slurm: AbstractSlurmService,
@@ -16,7 +20,14 @@ def cmd_filter(
     timestamp: Optional[str],
     commit: Optional[str],
     sbatch: Optional[str],
+    expression: Optional[str],
     verbose: bool,
+    output_format: str = "table",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    page_number: Optional[int] = None,
+    pager: bool = False,
+    daemon: Optional["DaemonClient"] = None,
 ):
     """
     Display all jobs matching the specified regexes.
@@ -28,11 +39,18 @@ def cmd_filter(
     For a strict text search, use anchors: ^phrase to search strictly for$
     When writing regex make sure your shell parses them correctly, e.g. | (or) is often interpreted as a pipe. Make sure to escape or quote such characters
     For best results, wrap each regex string with double quotes
+
+    \b
+    QUERY EXPRESSIONS:
+    Compare fields id, submitted, status, description, commit and sbatch with = != < <= > >= or ~ (regex)
+    List values with 'in', e.g. status in (FAILED, TIMEOUT)
+    Combine comparisons with and, or, not and parentheses
+    Dates cover the whole day, so submitted <= 2024-01-31 includes the 31st. Quote times: submitted >= "2024-01-31 12:00"
     """
-    logging.debug("cli: filter requested fields: %s", (job_id, status, description, timestamp, commit, sbatch))
+    logging.debug("cli: filter requested fields: %s, query: %s", (job_id, status, description, timestamp, commit, sbatch), expression)
 
     fields = (job_id, status, description, timestamp, commit, sbatch)
-    if not any(fields):
+    if not any(fields) and not expression:
         raise ValueError("Please supply at least 1 filter")
 
     def null_safe_re_compile(field: Optional[str]) -> Optional[re.Pattern]:
@@ -44,7 +62,18 @@ def cmd_filter(
     filter_compiled = [null_safe_re_compile(field) for field in fields]
 
     query = FilterQuery(*filter_compiled)
-    matched_jobs_response = filter_jobs(uow, slurm, query)
+    if expression:
+        from slutil.services.query import Query
+        query.expression = Query(expression)
+    def fetch(page: Optional[Page]) -> JobListResponse:
+        response = daemon.filter_jobs(query, page) if daemon else None
+        if response is None:
+            response = filter_jobs(uow, slurm, query, page)
+        return response
+
+    if pager and output_format != "table":
+        raise click.UsageError("--pager can only be used with the table format")
+    page = resolve_page(limit, offset, page_number, pager)
 
     filter_description = []
     if job_id:
@@ -59,14 +88,37 @@ def cmd_filter(
         filter_description.append(f"commit matching '{commit}'")
     if sbatch:
         filter_description.append(f"sbatch file matching '{sbatch}'")
+    if expression:
+        filter_description.append(f"'{expression}'")
+
+    def title(response: JobListResponse) -> str:
+        total = response.total if response.total is not None else len(response.jobs)
+        title = f"{total} jobs with: {' and '.join(filter_description)}"
+        if not response.fresh:
+            title += f"\n[red](Slurm cannot be reached, showing cached data from {response.minimum_updated_time})[/red]"
+        return title
+
+    if pager:
+        show_in_pager(fetch, title, verbose)
+        return
+
+    matched_jobs_response = fetch(page)
+
+    if output_format != "table":
+        from slutil.cli.output import warn_if_stale, write_jobs
+        warn_if_stale(matched_jobs_response.fresh, matched_jobs_response.minimum_updated_time)
+        write_jobs(matched_jobs_response.jobs, output_format)
+        return
 
-    title = f"{(len(matched_jobs_response.jobs))} jobs with: {' and '.join(filter_description)}"
-    if not matched_jobs_response.fresh:
-        title += f"\n[red](Slurm cannot be reached, showing cached data from {matched_jobs_response.minimum_updated_time})[/red]"
+    from rich.console import Console
+    from slutil.cli.formatter import create_jobs_table
 
     console = Console()
+    caption = page_caption(matched_jobs_response, page)
     if len(matched_jobs_response.jobs) == 0:
-        console.print(title)
+        console.print(title(matched_jobs_response))
+        if caption is not None:
+            console.print(caption)
     else:
-        table = create_jobs_table(title, verbose, matched_jobs_response.jobs)
+        table = create_jobs_table(title(matched_jobs_response), verbose, matched_jobs_response.jobs, caption)
         console.print(table, overflow="ellipsis")
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import click
+from slutil.services.abstract_uow import AbstractUnitOfWork
+from slutil.adapters.abstract_slurm_service import AbstractSlurmService
+from slutil.services.services import dependency_graph
+from typing import Optional
+import logging
+
+TITLES = {
+    "downstream": "Jobs waiting on {}",
+    "upstream": "Jobs {} waits on",
+    "blocked": "Jobs blocked downstream of {}",
+    "critical-path": "Critical path to {}",
+}
+
+
+def cmd_graph(
+    uow: AbstractUnitOfWork, slurm: AbstractSlurmService, slurm_id: Optional[int], query: str, dot: bool
+):
+    """Show the jobs a job depends on or that depend on it.
+
+    SLURM_ID is the job to start from. Without it downstream shows every
+    pipeline in the history and blocked every blocked job.
+
+    \b
+    Queries:
+    downstream     the jobs waiting on the job (default)
+    upstream       the jobs the job waits on
+    blocked        jobs which can never run because a job they depend on
+                   ended the wrong way, under the jobs that caused it
+    critical-path  the longest chain of unfinished jobs the job waits on
+    """
+    logging.debug("cli: graph requested, job id: %s, query: %s", slurm_id, query)
+    if slurm_id is None and query in ("upstream", "critical-path"):
+        raise click.UsageError(f"SLURM_ID is required for the {query} query")
+
+    graph = dependency_graph(slurm, uow, slurm_id, query)
+
+    from slutil.cli.formatter import create_dot, dependency_tree_lines, print_styled_lines
+    if dot:
+        click.echo(create_dot(graph))
+        return
+
+    from rich.console import Console
+    if slurm_id is not None:
+        title = TITLES[query].format(slurm_id)
+    else:
+        title = "Blocked jobs" if query == "blocked" else "Pipelines"
+    if not graph.jobs:
+        title += " (No jobs found)"
+    if not graph.fresh:
+        title += f"\n[red](Slurm cannot be reached, showing cached data from {graph.minimum_updated_time})[/red]"
+
+    console = Console()
+    console.print(title)
+    print_styled_lines(console, dependency_tree_lines(graph))
@@ -1,7 +1,5 @@
-from rich.console import Console
 from slutil.services.abstract_uow import AbstractUnitOfWork
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService
-from slutil.cli.formatter import create_jobs_table
 from slutil.services.services import get_job, hide_job
 import click
 import logging
@@ -17,6 +15,9 @@ def cmd_hide(
     """
     logging.debug("cli: hide job %d requested", slurm_id)
 
+    from rich.console import Console
+    from slutil.cli.formatter import create_jobs_table
+
     job_details = get_job(slurm, uow, slurm_id)
     
     table = create_jobs_table(f"Job {slurm_id}", verbose, [job_details.job])
@@ -0,0 +1,40 @@
+from slutil.adapters.csv_repository import CsvRepository
+from slutil.adapters.sqlite_repository import SqliteRepository
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.sqlite_uow import SqliteUnitOfWork
+from slutil.services.services import migrate_history
+import click
+import logging
+import os
+
+def cmd_migrate():
+    """Import the slutil csv datafile into a sqlite datafile
+
+    The sqlite datafile is created next to the csv datafile and is used in its place from then on.
+    """
+    logging.debug("cli: migrate requested")
+
+    csv_path = CsvRepository.find_file()
+    if csv_path is None:
+        raise FileNotFoundError("No .slutil_job_history.csv file found in current directory or parents. Nothing to migrate")
+
+    db_path = csv_path.parent / SqliteRepository.filename
+    if db_path.exists():
+        raise FileExistsError(f"A sqlite datafile already exists at {db_path}, please remove that file before migrating again")
+
+    # built next to the datafile and moved into place once committed, a failed migration leaves no datafile behind
+    partial_path = db_path.with_name(f"{SqliteRepository.filename}.{os.getpid()}.partial")
+    if partial_path.exists():
+        partial_path.unlink()
+    target = SqliteUnitOfWork(partial_path)
+    try:
+        count = migrate_history(CsvUnitOfWork(csv_path), target)
+        target.jobs.close()
+        os.replace(partial_path, db_path)
+    except BaseException:
+        target.jobs.close()
+        if partial_path.exists():
+            partial_path.unlink()
+        raise
+    click.echo(f"Migrated {count} jobs to {db_path}")
+    click.echo(f"{csv_path} is no longer used and can be removed")
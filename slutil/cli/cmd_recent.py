@@ -1,24 +1,45 @@
 import time
-from rich.console import Console
-from rich.live import Live
+import click
 from slutil.services.abstract_uow import AbstractUnitOfWork
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService
-from slutil.services.services import recent
-from slutil.cli.formatter import create_jobs_table
+from slutil.services.services import recent, watch_recent
+from slutil.services.dto import JobListResponse, same_job_list
+from typing import Iterator, Optional, TYPE_CHECKING
+import itertools
 import logging
 
+if TYPE_CHECKING:
+    from slutil.services.daemon import DaemonClient
+
+# seconds between refreshes in live mode, doubled each time nothing changed up to the maximum
+LIVE_MIN_INTERVAL = 1.0
+LIVE_MAX_INTERVAL = 30.0
+
+
+def create_output(response: JobListResponse, count, verbose, row_cache=None):
+    from slutil.cli.formatter import create_jobs_table
 
-def create_output(slurm, uow, count, verbose):
-    response = recent(slurm, uow, count)
     jobs = response.jobs
     if len(jobs) > 0:
         caption = f"Showing last {count} jobs"
-    else:   
+    else:
         caption = "(No jobs found)"
     if response.fresh:
-        return create_jobs_table("Slurm job status", verbose, jobs, caption)
+        return create_jobs_table("Slurm job status", verbose, jobs, caption, row_cache)
     else:
-        return create_jobs_table(f"Slurm job status\n[red](Slurm cannot be reached, showing cached data from {response.minimum_updated_time})[/red]", verbose, jobs, caption)
+        return create_jobs_table(f"Slurm job status\n[red](Slurm cannot be reached, showing cached data from {response.minimum_updated_time})[/red]", verbose, jobs, caption, row_cache)
+
+
+def daemon_updates(daemon: "DaemonClient", count: int) -> Iterator[Optional[JobListResponse]]:
+    """The daemon's listing on each next(), None while it is unchanged, stopping if the daemon goes away"""
+    previous = None
+    while True:
+        response = daemon.recent(count)
+        if response is None:
+            return
+        yield None if same_job_list(previous, response) else response
+        previous = response
+
 
 def cmd_recent(
     uow: AbstractUnitOfWork,
@@ -26,18 +47,46 @@ def cmd_recent(
     count: int,
     live: bool,
     verbose: bool,
+    output_format: str = "table",
+    daemon: Optional["DaemonClient"] = None,
 ):
     """Get status of the most recent jobs. Defaults to 10"""
     logging.debug(
         "cli: report requested, count: %d, verbose: %s, live: %s", count, verbose, live
     )
 
+    if output_format != "table":
+        if live:
+            raise click.UsageError("--live can only be used with the table format")
+        response = daemon.recent(count) if daemon else None
+        if response is None:
+            response = recent(slurm, uow, count)
+        from slutil.cli.output import warn_if_stale, write_jobs
+        warn_if_stale(response.fresh, response.minimum_updated_time)
+        write_jobs(response.jobs, output_format)
+        return
+
+    from rich.console import Console
+    from rich.live import Live
+
     if live:
-        with Live(
-            create_output(slurm, uow, count, verbose), auto_refresh=False
-        ) as view:
+        updates = watch_recent(slurm, uow, count)
+        if daemon:
+            updates = itertools.chain(daemon_updates(daemon, count), updates)
+
+        row_cache: dict = {}
+        interval = LIVE_MIN_INTERVAL
+        with Live(create_output(next(updates), count, verbose, row_cache), auto_refresh=False) as view:
             while True:
-                time.sleep(1)
-                view.update(create_output(slurm, uow, count, verbose), refresh=True)
+                time.sleep(interval)
+                response = next(updates)
+                if response is None:
+                    interval = min(interval * 2, LIVE_MAX_INTERVAL)
+                else:
+                    interval = LIVE_MIN_INTERVAL
+                    view.update(create_output(response, count, verbose, row_cache), refresh=True)
     else:
-        Console().print(create_output(slurm, uow, count, verbose), overflow="ellipsis")
+        response = daemon.recent(count) if daemon else None
+        if response is None:
+            response = recent(slurm, uow, count)
+        Console().print(create_output(response, count, verbose), overflow="ellipsis")
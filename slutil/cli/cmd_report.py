@@ -1,33 +1,67 @@
-from rich.console import Console
 from slutil.services.abstract_uow import AbstractUnitOfWork
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService
 from slutil.services.services import report
-from slutil.cli.formatter import create_jobs_table
+from slutil.services.dto import JobListResponse
+from slutil.cli.paging import page_caption, page_response, resolve_page, show_in_pager
+from typing import Optional, TYPE_CHECKING
+import click
 import logging
 
+if TYPE_CHECKING:
+    from slutil.services.daemon import DaemonClient
+
 def cmd_report(
     uow: AbstractUnitOfWork,
     slurm: AbstractSlurmService,
     verbose: bool,
+    output_format: str = "table",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    page_number: Optional[int] = None,
+    pager: bool = False,
+    daemon: Optional["DaemonClient"] = None,
 ):
     """Display all jobs with changed state since the last time they were checked by slutil"""
     logging.debug(
         "cli: report requested, verbose: %s", verbose
     )
+    if pager and output_format != "table":
+        raise click.UsageError("--pager can only be used with the table format")
+    page = resolve_page(limit, offset, page_number, pager)
+
+    # the changes are only reported once, so the pager pages through a single report
+    response = daemon.report(page) if daemon else None
+    if response is None:
+        response = report(slurm, uow, page)
+
+    if output_format != "table":
+        from slutil.cli.output import warn_if_stale, write_jobs
+        warn_if_stale(response.fresh, response.minimum_updated_time)
+        write_jobs(response.jobs, output_format)
+        return
+
+    def title(response: JobListResponse) -> str:
+        title = "Slurm job status"
+        if not response.fresh:
+            title += f"\n[red](Slurm cannot be reached, showing cached data from {response.minimum_updated_time})[/red]"
+        return title
+
+    if pager:
+        show_in_pager(lambda page: page_response(response, page), title, verbose)
+        return
+
+    from rich.console import Console
+    from slutil.cli.formatter import create_jobs_table
 
-    response = report(slurm, uow)
     jobs = response.jobs
-    caption = ""
-    if len(jobs) > 0:
-        caption = f"Showing jobs with changed state since last check"
-    else:   
-        caption = "(No jobs found with changed state, is Slurm accessible?)"
-
-    title = "Slurm job status"
-    if not response.fresh:
-        title += f"\n[red](Slurm cannot be reached, showing cached data from {response.minimum_updated_time})[/red]"
-    
-    table = create_jobs_table(title, verbose, jobs, caption)
+    caption = page_caption(response, page)
+    if caption is None:
+        if len(jobs) > 0:
+            caption = f"Showing jobs with changed state since last check"
+        else:
+            caption = "(No jobs found with changed state, is Slurm accessible?)"
+
+    table = create_jobs_table(title(response), verbose, jobs, caption)
 
     console = Console()
     console.print(table, overflow="ellipsis")
@@ -1,19 +1,37 @@
-from rich.console import Console
 from slutil.services.abstract_uow import AbstractUnitOfWork
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService
-from slutil.cli.formatter import create_job_table_detailed
 from slutil.services.services import get_job
+from typing import Optional, TYPE_CHECKING
 import logging
 
+if TYPE_CHECKING:
+    from slutil.services.daemon import DaemonClient
+
 def cmd_status(
-    uow: AbstractUnitOfWork, slurm: AbstractSlurmService, slurm_id: int, verbose: bool
+    uow: AbstractUnitOfWork,
+    slurm: AbstractSlurmService,
+    slurm_id: int,
+    verbose: bool,
+    output_format: str = "table",
+    daemon: Optional["DaemonClient"] = None,
 ):
     """Get status of a slurm job.
 
     SLURM_ID is the id of the job to check.
     """
     logging.debug("cli: status requested job id: %d", slurm_id)
-    job_response = get_job(slurm, uow, slurm_id)
+    job_response = daemon.get_job(slurm_id) if daemon else None
+    if job_response is None:
+        job_response = get_job(slurm, uow, slurm_id)
+
+    if output_format != "table":
+        from slutil.cli.output import warn_if_stale, write_jobs
+        warn_if_stale(job_response.fresh, job_response.updated_time)
+        write_jobs([job_response.job], output_format)
+        return
+
+    from rich.console import Console
+    from slutil.cli.formatter import create_job_table_detailed
 
     title = f"Job {slurm_id}"
     if not job_response.fresh:
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import click
+from slutil.services.abstract_uow import AbstractUnitOfWork
+from slutil.adapters.abstract_vcs import AbstractVCS
+from slutil.adapters.abstract_slurm_service import AbstractSlurmService
+from slutil.services.manifest import read_manifests
+from slutil.services.services import submit_many
+from typing import Optional
+import logging
+
+
+def cmd_submit_many(
+    uow: AbstractUnitOfWork,
+    slurm: AbstractSlurmService,
+    vcs: AbstractVCS,
+    manifest: tuple[str, ...],
+    description: Optional[str],
+    jobs: int,
+):
+    """Submit many slurm jobs at once.
+
+    MANIFEST is a .csv or .json file listing jobs with sbatch, description and optional name and dependency fields,
+    or sbatch files or globs of them (e.g. 'sweep/*.sbatch') which are submitted with DESCRIPTION
+
+    A dependency can refer to entries of the same manifest by name or by position as @name or @2, e.g.
+    afterok:@preprocess. Those jobs are submitted first and their slurm ids substituted
+    """
+    logging.debug("cli: submit-many requested, manifest: %s, description: %s, jobs: %d", manifest, description, jobs)
+
+    requests = read_manifests(list(manifest), description)
+    results = submit_many(slurm, uow, vcs, requests, jobs)
+
+    failed = 0
+    for result in results:
+        if result.slurm_id is not None:
+            click.echo(f"Submitted job {result.slurm_id}: {result.request.sbatch}")
+        else:
+            failed += 1
+            click.echo(f"Failed to submit {result.request.sbatch}: {result.error}", err=True)
+
+    if failed:
+        raise click.ClickException(f"{failed} of {len(results)} jobs could not be submitted")
+    click.echo(f"Successfully submitted {len(results)} jobs")
@@ -1,23 +1,34 @@
 from __future__ import annotations
 
 import functools
+import importlib
 import inspect
+import os
 from dataclasses import dataclass
 import click
-from slutil.cli.cmd_hide import cmd_hide
-from slutil.cli.cmd_filter import cmd_filter
-from slutil.cli.cmd_report import cmd_report
-from slutil.cli.cmd_unhide import cmd_unhide
-from slutil.cli.cmd_submit import cmd_submit
-from slutil.cli.cmd_status import cmd_status
-from slutil.cli.cmd_recent import cmd_recent
-from slutil.cli.cmd_edit import cmd_edit
-from slutil.cli.cmd_init import cmd_init
 import re
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Generic, Optional, TypeVar
+from slutil.instrumentation import profiler
 
+T = TypeVar("T")
 
-def inject_dependencies(function, dependencies: dict[str, Callable]):
+
+class Lazy(Generic[T]):
+    """A dependency which is only constructed when a command that uses it is invoked"""
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._value: Optional[T] = None
+        self._created = False
+
+    def get(self) -> T:
+        if not self._created:
+            self._value = self.factory()
+            self._created = True
+        return self._value  # type: ignore
+
+
+def inject_dependencies(function, dependencies: dict[str, Any]):
     params = inspect.signature(function).parameters
 
     deps = {
@@ -26,18 +37,68 @@ def inject_dependencies(function, dependencies: dict[str, Callable]):
         if name in params
     }
 
-    return functools.partial(function, **deps)
+    @functools.wraps(function)
+    def inject(*args, **kwargs):
+        resolved = {
+            name: dependency.get() if isinstance(dependency, Lazy) else dependency
+            for name, dependency in deps.items()
+        }
+        return function(*args, **resolved, **kwargs)
+
+    return inject
 
 @dataclass
 class CommandSpec:
     name: str
-    func: Callable
+    # "module:function", only imported when the command is looked up so startup doesn't pay for every command
+    func: str
     params: list[click.Parameter]
 
+    def load(self) -> Callable:
+        module_name, func_name = self.func.split(":")
+        return getattr(importlib.import_module(module_name), func_name)
+
+
+def enable_profiling(ctx: click.Context, param: click.Parameter, value: bool):
+    if value:
+        profiler.start(os.getenv("SLUTIL_PROFILE_OUTPUT"))
+
+
+class LazyGroup(click.Group):
+    def __init__(self, specs: list[CommandSpec], dependencies: dict[str, Any], **kwargs):
+        kwargs.setdefault("params", [
+            click.Option(
+                ["--profile"],
+                is_flag=True,
+                is_eager=True,
+                expose_value=False,
+                callback=enable_profiling,
+                help="print phase timings and subprocess counts to stderr when the command finishes",
+            )
+        ])
+        super().__init__(**kwargs)
+        self.specs = {spec.name: spec for spec in specs}
+        self.dependencies = dependencies
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted(set(self.specs) | set(self.commands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in self.commands and cmd_name in self.specs:
+            spec = self.specs[cmd_name]
+            func = spec.load()
+            self.add_command(
+                click.Command(
+                    name=spec.name,
+                    callback=inject_dependencies(func, self.dependencies),
+                    params=spec.params,
+                    help=func.__doc__,
+                )
+            )
+        return super().get_command(ctx, cmd_name)
 
-def command_factory(dependencies: dict[str, Any]) -> click.Group:
-    parent_cmd = click.Group()
 
+def command_factory(dependencies: dict[str, Any]) -> click.Group:
     def validate_dependency_str(ctx, param, value) -> tuple[Optional[str], list[int]]:
         if value:
             if re.match(
@@ -48,10 +109,36 @@ def command_factory(dependencies: dict[str, Any]) -> click.Group:
             raise click.BadParameter("not a supported dependency option")
         return (None, [])
 
+    def format_option() -> click.Option:
+        return click.Option(
+            ["-f", "--format", "output_format"],
+            help="table for reading, or json, jsonl, csv or tsv to print the jobs one per row for scripts",
+            type=click.Choice(["table", "json", "jsonl", "csv", "tsv"]),
+            default="table",
+        )
+
+    def paging_options() -> list[click.Parameter]:
+        return [
+            click.Option(["--limit"], help="show at most this many jobs, newest first", type=click.IntRange(min=1), default=None),
+            click.Option(["--offset"], help="skip this many of the newest jobs", type=click.IntRange(min=0), default=0),
+            click.Option(
+                ["--page", "page_number"],
+                help="show this page of --limit jobs (50 by default), newest first",
+                type=click.IntRange(min=1),
+                default=None,
+            ),
+            click.Option(
+                ["--pager"],
+                help="page through the jobs a screen at a time, only fetching and drawing the screens viewed",
+                is_flag=True,
+                default=False,
+            ),
+        ]
+
     commands = [
         CommandSpec(
             name="submit",
-            func=cmd_submit,
+            func="slutil.cli.cmd_submit:cmd_submit",
             params=[
                 click.Argument(
                     ["sbatch_file"], required=True, type=click.Path(exists=True)
@@ -64,31 +151,71 @@ def command_factory(dependencies: dict[str, Any]) -> click.Group:
                     callback=validate_dependency_str,
                     help="The job's dependencies. In the form ('<type>(:[dependent_id])+' type:=after|afterany|afternotok|afterok) or 'singleton' e.g. 'afterok:123456:345678'"
                 )]),
+        CommandSpec(
+            name="submit-many",
+            func="slutil.cli.cmd_submit_many:cmd_submit_many",
+            params=[
+                click.Argument(["manifest"], nargs=-1, required=True, type=str),
+                click.Option(
+                    ["-d", "--description"],
+                    help="description for jobs given as sbatch files or globs, defaults to the file name",
+                    type=str,
+                    default=None,
+                ),
+                click.Option(
+                    ["-j", "--jobs"],
+                    help="number of submissions to run at once",
+                    type=click.IntRange(min=1),
+                    default=8,
+                ),
+            ]),
         CommandSpec(
             name="report",
-            func=cmd_report,
+            func="slutil.cli.cmd_report:cmd_report",
             params=[
-                click.Option(["-v", "--verbose"], is_flag=True, default=False)
+                click.Option(["-v", "--verbose"], is_flag=True, default=False),
+                format_option(),
+                *paging_options(),
             ]),
         CommandSpec(
             name="recent",
-            func=cmd_recent,
+            func="slutil.cli.cmd_recent:cmd_recent",
             params=[
                 click.Option(["-c", "--count"], default=10),
                 click.Option(["-v", "--verbose"], is_flag=True, default=False),
                 click.Option(
                     ["-l", "--live"], help="infinitely refresh the display with new data", is_flag=True, default=False),
+                format_option(),
             ]),
         CommandSpec(
             name="status",
-            func=cmd_status,
+            func="slutil.cli.cmd_status:cmd_status",
             params=[
                 click.Argument(["slurm_id"], type=int),
                 click.Option(["-v", "--verbose"], is_flag=True, default=False),
+                format_option(),
+            ]),
+        CommandSpec(
+            name="graph",
+            func="slutil.cli.cmd_graph:cmd_graph",
+            params=[
+                click.Argument(["slurm_id"], type=int, required=False),
+                click.Option(
+                    ["-q", "--query"],
+                    help="which jobs to show, see below",
+                    type=click.Choice(["downstream", "upstream", "blocked", "critical-path"]),
+                    default="downstream",
+                ),
+                click.Option(
+                    ["--dot"],
+                    help="print the jobs and their dependencies in graphviz DOT instead of a tree",
+                    is_flag=True,
+                    default=False,
+                ),
             ]),
         CommandSpec(
             name="delete",
-            func=cmd_hide,
+            func="slutil.cli.cmd_hide:cmd_hide",
             params=[
                 click.Argument(["slurm_id"], type=int),
                 click.Option(["-v", "--verbose"], is_flag=True, default=False),
@@ -96,21 +223,21 @@ def command_factory(dependencies: dict[str, Any]) -> click.Group:
         ),
         CommandSpec(
             name="restore",
-            func=cmd_unhide,
+            func="slutil.cli.cmd_unhide:cmd_unhide",
             params=[
                 click.Argument(["slurm_id"], type=int),
             ],
         ),
         CommandSpec(
             name="edit",
-            func=cmd_edit,
+            func="slutil.cli.cmd_edit:cmd_edit",
             params=[
                 click.Argument(["slurm_id"], type=int),
             ]
         ),
         CommandSpec(
             name="filter",
-            func=cmd_filter,
+            func="slutil.cli.cmd_filter:cmd_filter",
             params=[
                 click.Option(
                     ["-j", "--job-id"],
@@ -131,7 +258,7 @@ def command_factory(dependencies: dict[str, Any]) -> click.Group:
                     default=None,
                 ),
                 click.Option(
-                    ["-t", "--submit-time"],
+                    ["-t", "--submit-time", "timestamp"],
                     help="regex to match against string representation of submit timestamp (e.g. '2023-02-06 14:32:38')",
                     type=str,
                     default=None,
@@ -148,24 +275,44 @@ def command_factory(dependencies: dict[str, Any]) -> click.Group:
                     type=str,
                     default=None,
                 ),
+                click.Option(
+                    ["-q", "--query", "expression"],
+                    help="query expression, e.g. 'status in (FAILED, TIMEOUT) and submitted >= 2024-01-01 and id > 1200000'",
+                    type=str,
+                    default=None,
+                ),
                 click.Option(["-v", "--verbose"], is_flag=True, default=False),
+                format_option(),
+                *paging_options(),
             ],
         ),
         CommandSpec(
             name="init",
-            func=cmd_init,
+            func="slutil.cli.cmd_init:cmd_init",
             params=[]
-        )
+        ),
+        CommandSpec(
+            name="migrate",
+            func="slutil.cli.cmd_migrate:cmd_migrate",
+            params=[]
+        ),
+        CommandSpec(
+            name="check",
+            func="slutil.cli.cmd_check:cmd_check",
+            params=[]
+        ),
+        CommandSpec(
+            name="daemon",
+            func="slutil.cli.cmd_daemon:cmd_daemon",
+            params=[
+                click.Option(
+                    ["-i", "--interval"],
+                    help="seconds between polls of Slurm for unfinished jobs",
+                    type=float,
+                    default=30.0,
+                ),
+            ]
+        ),
     ]
 
-    for c in commands:
-        parent_cmd.add_command(
-            click.Command(
-                name=c.name,
-                callback=inject_dependencies(c.func, dependencies),
-                params=c.params,
-                help=c.func.__doc__,
-            )
-        )
-
-    return parent_cmd
+    return LazyGroup(commands, dependencies)
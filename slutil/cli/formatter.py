@@ -1,55 +1,59 @@
 from __future__ import annotations
 
+from rich.console import COLOR_SYSTEMS, Console
+from rich.style import Style
 from rich.table import Table
 from rich.text import Text
 from rich import box
-from slutil.services.dto import JobDTO
-from typing import Optional, Iterable
+from slutil.services.dto import GraphResponse, JobDTO
+from typing import Iterator, Optional, Iterable
+
+# also valid graphviz colour names, so the DOT export matches the terminal
+STATUS_COLORS = {
+    "PENDING": "blue3",
+    "RUNNING": "yellow3",
+    "SUSPENDED": "orange3",
+    "COMPLETED": "green3",
+    "CANCELLED": "grey54",
+    "FAILED": "red3",
+    "TIMEOUT": "red3",
+    "NODE_FAIL": "red3",
+    "PREEMPTED": "red3",
+    "BOOT_FAIL": "red3",
+    "DEADLINE": "red3",
+    "OUT_OF_MEMORY": "red3",
+    "COMPLETING": "chartreuse3",
+    "STOPPED": "red3",
+    "UNKNOWN": "grey54",
+    "NONE": "grey54"
+}
+
+
+def ellipsis_text(text: str, style: str = "") -> Text:
+    return Text(text, overflow="ellipsis", no_wrap=True, style=style)
 
 
 def jobDTO_to_rich_text(
     job: JobDTO, verbose: bool
 ) -> tuple[Text, Text, Text, Text, Text, Text, Text]:
-    status_color_map = {
-        "PENDING": "blue3",
-        "RUNNING": "yellow3",
-        "SUSPENDED": "orange3",
-        "COMPLETED": "green3",
-        "CANCELLED": "grey54",
-        "FAILED": "red3",
-        "TIMEOUT": "red3",
-        "NODE_FAIL": "red3",
-        "PREEMPTED": "red3",
-        "BOOT_FAIL": "red3",
-        "DEADLINE": "red3",
-        "OUT_OF_MEMORY": "red3",
-        "COMPLETING": "chartreuse3",
-        "STOPPED": "red3",
-        "UNKNOWN": "grey54",
-        "NONE": "grey54"
-    }
-
-    def ellipsis_text(text: str, style: str = ""):
-        return Text(text, overflow="ellipsis", no_wrap=True, style=style)
-
     if verbose:
         return (
             Text(str(job.slurm_id)),
-            Text(job.status, status_color_map[job.status]),
+            Text(job.status, STATUS_COLORS[job.status]),
             Text(job.description),
             Text(job.submitted_timestamp),
             Text(job.git_tag),
-            Text(job.dependency_state, status_color_map[job.dependency_state]),
+            Text(job.dependency_state, STATUS_COLORS[job.dependency_state]),
             Text(job.sbatch),
         )
     else:
         return (
             ellipsis_text(str(job.slurm_id)),
-            ellipsis_text(job.status, status_color_map[job.status]),
+            ellipsis_text(job.status, STATUS_COLORS[job.status]),
             ellipsis_text(job.description),
             ellipsis_text(job.submitted_timestamp),
             ellipsis_text(job.git_tag),
-            ellipsis_text(job.dependency_state, status_color_map[job.dependency_state]),
+            ellipsis_text(job.dependency_state, STATUS_COLORS[job.dependency_state]),
             ellipsis_text(job.sbatch),
         )
 
@@ -57,51 +61,39 @@ def jobDTO_to_rich_text(
 def jobDTO_to_rich_text_detailed(
     job: JobDTO, verbose: bool
 ) -> tuple[Text, Text, Text, Text, Text, Text, Text, Text, Text]:
-    status_color_map = {
-        "COMPLETED": "green3",
-        "COMPLETING": "chartreuse3",
-        "FAILED": "red3",
-        "CANCELLED": "grey54",
-        "PENDING": "blue3",
-        "PREEMPTED": "red3",
-        "RUNNING": "yellow3",
-        "SUSPENDED": "orange3",
-        "STOPPED": "red3",
-        "UNKNOWN": "grey54",
-        "NONE": "grey54"
-    }
-
-    def ellipsis_text(text: str, style: str = ""):
-        return Text(text, overflow="ellipsis", no_wrap=True, style=style)
-
     if verbose:
         return (
             Text(str(job.slurm_id)),
-            Text(job.status, status_color_map[job.status]),
+            Text(job.status, STATUS_COLORS[job.status]),
             Text(job.description),
             Text(job.submitted_timestamp),
             Text(job.git_tag),
             Text(job.sbatch),
-            Text(job.dependency_state, status_color_map[job.dependency_state]),
+            Text(job.dependency_state, STATUS_COLORS[job.dependency_state]),
             Text(job.dependency_type),
             Text(", ".join(map(str, job.dependency_ids)))
         )
     else:
         return (
             ellipsis_text(str(job.slurm_id)),
-            ellipsis_text(job.status, status_color_map[job.status]),
+            ellipsis_text(job.status, STATUS_COLORS[job.status]),
             ellipsis_text(job.description),
             ellipsis_text(job.submitted_timestamp),
             ellipsis_text(job.git_tag),
             ellipsis_text(job.sbatch),
-            ellipsis_text(job.dependency_state, status_color_map[job.dependency_state]),
+            ellipsis_text(job.dependency_state, STATUS_COLORS[job.dependency_state]),
             ellipsis_text(job.dependency_type),
             ellipsis_text(", ".join(map(str, job.dependency_ids)))
         )
 
 def create_jobs_table(
-    title: str, verbose: bool, jobs: Iterable[JobDTO], caption: Optional[str] = None
+    title: str,
+    verbose: bool,
+    jobs: Iterable[JobDTO],
+    caption: Optional[str] = None,
+    row_cache: Optional[dict[int, tuple[JobDTO, tuple]]] = None,
 ) -> Table:
+    """row_cache keeps the cells built for each job between calls, so only rows whose job changed are rebuilt"""
     table = Table(title=title, caption=caption, box=box.ROUNDED, expand=True)
     table.add_column("ID")
     table.add_column("Status")
@@ -112,7 +104,14 @@ def create_jobs_table(
     table.add_column("sbatch File")
 
     for j in sorted(jobs, reverse=True):
-        table.add_row(*jobDTO_to_rich_text(j, verbose))
+        if row_cache is None:
+            table.add_row(*jobDTO_to_rich_text(j, verbose))
+            continue
+
+        cached = row_cache.get(j.slurm_id)
+        if cached is None or cached[0] != j:
+            cached = row_cache[j.slurm_id] = (j, jobDTO_to_rich_text(j, verbose))
+        table.add_row(*cached[1])
 
     return table
 
@@ -134,3 +133,62 @@ def create_job_table_detailed(
         table.add_row(*jobDTO_to_rich_text_detailed(j, verbose))
 
     return table
+
+
+# indentation stops growing past this many levels, so lines stay short however deep a pipeline is
+MAX_TREE_INDENT = 32
+
+
+def dependency_tree_lines(graph: GraphResponse) -> Iterator[list[tuple[str, str]]]:
+    """The tree as lines of (text, style) pieces, each job drawn once with everything beneath it
+
+    Jobs shared by several branches of a pipeline refer back to where they were first drawn instead of repeating their
+    whole subtree. Lines are produced one at a time rather than laid out as a rich Tree, which takes seconds for tens
+    of thousands of jobs before printing anything.
+    """
+    jobs = {j.slurm_id: j for j in graph.jobs}
+    drawn: set[int] = set()
+    # (job, guides of the levels above, whether it is the last child), depth first without recursion
+    stack: list[tuple[int, Optional[str], bool]] = [(r, None, True) for r in reversed(graph.roots)]
+    while stack:
+        slurm_id, prefix, last = stack.pop()
+        if prefix is None:
+            guide = beneath = ""
+        else:
+            guide = prefix + ("└── " if last else "├── ")
+            beneath = prefix if len(prefix) >= 4 * MAX_TREE_INDENT else prefix + ("    " if last else "│   ")
+
+        if slurm_id in drawn:
+            yield [(guide, "grey54"), (str(slurm_id), "bold"), (" (shown above)", "grey54")]
+            continue
+        drawn.add(slurm_id)
+        job = jobs[slurm_id]
+        yield [(guide, "grey54"), (str(slurm_id), "bold"), ("  ", ""), (job.status, STATUS_COLORS[job.status]), ("  " + job.description, "")]
+
+        children = graph.children.get(slurm_id, [])
+        stack.extend((c, beneath, i == len(children) - 1) for i, c in reversed(list(enumerate(children))))
+
+
+def print_styled_lines(console: Console, lines: Iterable[list[tuple[str, str]]]):
+    """Write lines of (text, style) pieces straight to the console's file, styled for its colour system"""
+    color_system = COLOR_SYSTEMS.get(console.color_system) if console.color_system else None
+    for pieces in lines:
+        # Style.parse caches, each distinct style is only parsed once
+        text = "".join(Style.parse(style).render(piece, color_system=color_system) for piece, style in pieces)
+        console.file.write(text + "\n")
+
+
+def dot_string(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def create_dot(graph: GraphResponse) -> str:
+    """The jobs and their dependencies in graphviz DOT, edges point from a job to the jobs waiting on it"""
+    lines = ["digraph slutil {", "    node [shape=box];"]
+    for job in graph.jobs:
+        label = dot_string(f"{job.slurm_id}\n{job.status}\n{job.description}")
+        lines.append(f'    {job.slurm_id} [label={label}, color={dot_string(STATUS_COLORS[job.status])}];')
+    for depended_on, dependent, dependency_type in sorted(graph.edges):
+        lines.append(f"    {depended_on} -> {dependent} [label={dot_string(dependency_type)}];")
+    lines.append("}")
+    return "\n".join(lines)
@@ -0,0 +1,61 @@
+"""Job listings for scripts and dashboards, written a row at a time as json, jsonl, csv or tsv
+
+Nothing here imports rich, so machine readable output doesn't pay for loading it or laying out a table.
+"""
+from __future__ import annotations
+
+import csv
+import dataclasses
+import json
+import sys
+from typing import Iterable, Optional, TextIO
+from slutil.services.dto import JobDTO
+
+MACHINE_FORMATS = ("json", "jsonl", "csv", "tsv")
+
+FIELDS = tuple(f.name for f in dataclasses.fields(JobDTO))
+
+
+def dependency_ids(job: JobDTO) -> list[int]:
+    return [int(i) for i in job.dependency_ids if i != "NONE"]
+
+
+def job_object(job: JobDTO) -> dict:
+    fields = {name: getattr(job, name) for name in FIELDS}
+    fields["dependency_ids"] = dependency_ids(job)
+    return fields
+
+
+def job_row(job: JobDTO) -> list:
+    row = [getattr(job, name) for name in FIELDS]
+    row[-1] = ",".join(map(str, dependency_ids(job)))
+    return row
+
+
+def write_jobs(jobs: Iterable[JobDTO], output_format: str, out: Optional[TextIO] = None):
+    """Write each job as soon as it is taken from jobs, in the order given"""
+    if output_format not in MACHINE_FORMATS:
+        raise ValueError(f"unknown output format {output_format}, expected one of {', '.join(MACHINE_FORMATS)}")
+    out = out or sys.stdout
+
+    if output_format == "jsonl":
+        for job in jobs:
+            out.write(json.dumps(job_object(job)) + "\n")
+    elif output_format == "json":
+        separator = "\n"
+        out.write("[")
+        for job in jobs:
+            out.write(separator + json.dumps(job_object(job)))
+            separator = ",\n"
+        out.write("\n]\n")
+    else:
+        writer = csv.writer(out, delimiter="," if output_format == "csv" else "\t", lineterminator="\n")
+        writer.writerow(FIELDS)
+        for job in jobs:
+            writer.writerow(job_row(job))
+
+
+def warn_if_stale(fresh: bool, updated_time: str):
+    # stdout is only the data, so scripts parsing it still learn the data is cached
+    if not fresh:
+        sys.stderr.write(f"Slurm cannot be reached, showing cached data from {updated_time}\n")
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import io
+import shutil
+from typing import Callable, Iterator, Optional
+import click
+from slutil.services.dto import JobListResponse, Page
+
+# jobs per page when --page is given without --limit
+DEFAULT_PAGE_SIZE = 50
+
+# lines each screen of the pager spends on the table's title, header, borders and caption rather than jobs
+PAGER_TABLE_LINES = 7
+
+
+def resolve_page(limit: Optional[int], offset: int, page_number: Optional[int], pager: bool = False) -> Optional[Page]:
+    """The page asked for with --limit, --offset and --page, None for every job"""
+    if pager and (limit is not None or offset or page_number is not None):
+        raise click.UsageError("--pager shows every job a screen at a time, it can't be used with --limit, --offset or --page")
+    if page_number is not None:
+        if offset:
+            raise click.UsageError("--page and --offset can't be used together")
+        limit = limit or DEFAULT_PAGE_SIZE
+        return Page(limit, (page_number - 1) * limit)
+    if limit is None and not offset:
+        return None
+    return Page(limit, offset)
+
+
+def page_caption(response: JobListResponse, page: Optional[Page]) -> Optional[str]:
+    """Which of the matching jobs are shown, None when they all are"""
+    if page is None or response.total is None:
+        return None
+    if not response.jobs:
+        return f"(No jobs on this page, {response.total} jobs in total)"
+    return f"Showing jobs {page.offset + 1}-{page.offset + len(response.jobs)} of {response.total}"
+
+
+def page_response(response: JobListResponse, page: Page) -> JobListResponse:
+    """A page of a listing already fetched in full, for listings which can't be fetched again a page at a time"""
+    jobs = sorted(response.jobs, reverse=True)
+    end = None if page.limit is None else page.offset + page.limit
+    return JobListResponse(response.fresh, response.minimum_updated_time, jobs[page.offset:end], len(jobs))
+
+
+def show_in_pager(fetch: Callable[[Page], JobListResponse], title: Callable[[JobListResponse], str], verbose: bool):
+    """Page through every job in the terminal's pager
+
+    Each screen of jobs is fetched and laid out only when the pager reads that far, so the time before the first screen
+    and the memory used don't grow with the number of jobs
+    """
+    from rich.console import Console
+    from slutil.cli.formatter import create_jobs_table
+
+    width, height = shutil.get_terminal_size()
+    screen = max(height - PAGER_TABLE_LINES, 1)
+
+    def screens() -> Iterator[str]:
+        offset = 0
+        while True:
+            page = Page(screen, offset)
+            response = fetch(page)
+            console = Console(file=io.StringIO(), width=width, force_terminal=True)
+            table = create_jobs_table(title(response), verbose, response.jobs, page_caption(response, page))
+            console.print(table, overflow="ellipsis")
+            yield console.file.getvalue()  # type: ignore
+
+            offset += screen
+            if response.total is None or offset >= response.total:
+                return
+
+    click.echo_via_pager(screens())
@@ -0,0 +1,185 @@
+"""Per-command timing and subprocess accounting, enabled with SLUTIL_PROFILE=1 or `slutil --profile`
+
+Time is attributed to the innermost active phase, so the phase timings of a command add up to its total.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from contextlib import contextmanager
+import functools
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Iterator, Optional, TextIO
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.phase_seconds: dict[str, float] = defaultdict(float)
+        self.phase_calls: dict[str, int] = defaultdict(int)
+        self.fork_count: dict[str, int] = defaultdict(int)
+        self.fork_seconds: dict[str, float] = defaultdict(float)
+        self.counters: dict[str, int] = defaultdict(int)
+        self._stack: list[str] = []
+        self._mark = 0.0
+        self._started = 0.0
+        self._cprofile = None
+        self._patched: dict[str, Any] = {}
+        # concurrent slurm polling forks from worker threads
+        self._fork_lock = threading.Lock()
+        self._forking = threading.local()
+
+    def start(self, pstats_path: Optional[str] = None):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._started = self._mark = time.perf_counter()
+        self._stack = ["cli"]
+        self.phase_calls["cli"] += 1
+        self._patch_subprocess()
+
+        if pstats_path:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop(self, pstats_path: Optional[str] = None) -> dict:
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            if pstats_path:
+                self._cprofile.dump_stats(pstats_path)
+
+        self._switch(None)
+        self._unpatch_subprocess()
+        self.enabled = False
+        return self.summary()
+
+    def _switch(self, phase: Optional[str]):
+        now = time.perf_counter()
+        if self._stack:
+            self.phase_seconds[self._stack[-1]] += now - self._mark
+        self._mark = now
+        if phase is not None:
+            self._stack.append(phase)
+            self.phase_calls[phase] += 1
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        # phases nest on the main thread, work on other threads counts towards whatever the main thread is waiting in
+        if not self.enabled or threading.current_thread() is not threading.main_thread():
+            yield
+            return
+
+        self._switch(name)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.phase_seconds[self._stack.pop()] += now - self._mark
+            self._mark = now
+
+    def count(self, counter: str, amount: int = 1):
+        if self.enabled:
+            self.counters[counter] += amount
+
+    def instrument(self, target: Any, phase: str, children: Optional[dict[str, str]] = None) -> Any:
+        """Wrap target so calls to its methods are timed as phase, children maps attributes to wrap in turn"""
+        if not self.enabled:
+            return target
+        return Instrumented(target, self, phase, children or {})
+
+    def _patch_subprocess(self):
+        for name in ("run", "check_output"):
+            original = getattr(subprocess, name)
+            self._patched[name] = original
+            setattr(subprocess, name, self._count_forks(original))
+
+    def _unpatch_subprocess(self):
+        for name, original in self._patched.items():
+            setattr(subprocess, name, original)
+        self._patched = {}
+
+    def _count_forks(self, function):
+        @functools.wraps(function)
+        def counted(args, *rest, **kwargs):
+            # check_output is implemented with run, only count the outermost call
+            if getattr(self._forking, "active", False):
+                return function(args, *rest, **kwargs)
+
+            command = args.split()[0] if isinstance(args, str) else args[0]
+            program = os.path.basename(str(command))
+            start = time.perf_counter()
+            self._forking.active = True
+            try:
+                return function(args, *rest, **kwargs)
+            finally:
+                self._forking.active = False
+                elapsed = time.perf_counter() - start
+                with self._fork_lock:
+                    self.fork_count[program] += 1
+                    self.fork_seconds[program] += elapsed
+        return counted
+
+    def summary(self) -> dict:
+        return {
+            "total_seconds": round(sum(self.phase_seconds.values()), 6),
+            "phases": {
+                name: {"seconds": round(seconds, 6), "calls": self.phase_calls.get(name, 0)}
+                for name, seconds in sorted(self.phase_seconds.items(), key=lambda p: -p[1])
+            },
+            "subprocesses": {
+                program: {"count": count, "seconds": round(self.fork_seconds[program], 6)}
+                for program, count in sorted(self.fork_count.items())
+            },
+            "counters": dict(self.counters),
+        }
+
+    def report(self, stream: TextIO = sys.stderr, pstats_path: Optional[str] = None):
+        summary = self.stop(pstats_path)
+        logging.debug("profile: %s", summary)
+        stream.write(json.dumps({"slutil_profile": summary}, indent=2) + "\n")
+
+
+class Instrumented:
+    """Proxy timing every method call on the wrapped object"""
+
+    def __init__(self, target: Any, profiler: Profiler, phase: str, children: dict[str, str]):
+        self._target = target
+        self._profiler = profiler
+        self._phase = phase
+        self._children = children
+        self._wrapped_children: dict[str, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+
+        if name in self._children:
+            if name not in self._wrapped_children or self._wrapped_children[name]._target is not value:
+                self._wrapped_children[name] = Instrumented(value, self._profiler, self._children[name], {})
+            return self._wrapped_children[name]
+
+        if callable(value):
+            @functools.wraps(value)
+            def timed(*args, **kwargs):
+                with self._profiler.phase(self._phase):
+                    return value(*args, **kwargs)
+            return timed
+
+        return value
+
+    def __enter__(self):
+        with self._profiler.phase(self._phase):
+            entered = self._target.__enter__()
+        return self if entered is self._target else entered
+
+    def __exit__(self, *args):
+        with self._profiler.phase(self._phase):
+            return self._target.__exit__(*args)
+
+
+profiler = Profiler()
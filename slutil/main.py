@@ -1,16 +1,49 @@
 import os
-from rich.console import Console
+from pathlib import Path
 from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.sqlite_uow import SqliteUnitOfWork
 from slutil.services.abstract_uow import AbstractUnitOfWork
+from slutil.adapters.csv_repository import CsvRepository
+from slutil.adapters.sqlite_repository import SqliteRepository
 from slutil.adapters.slurm import SlurmService
+from slutil.adapters.concurrent_slurm import ConcurrentSlurmService
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService
 from slutil.adapters.abstract_vcs import AbstractVCS
 from slutil.adapters.git import Git
-from slutil.cli.command_factory import command_factory
-from dataclasses import dataclass
+from slutil.cli.command_factory import command_factory, Lazy
+from slutil.instrumentation import profiler
 import logging
 
 
+def find_unit_of_work() -> AbstractUnitOfWork:
+    """Use the history file closest to the current directory, preferring sqlite over csv within a directory"""
+    for directory in [Path.cwd(), *Path.cwd().parents]:
+        if (directory / SqliteRepository.filename).exists():
+            return SqliteUnitOfWork(directory / SqliteRepository.filename)
+        if (directory / CsvRepository.filename).exists():
+            return CsvUnitOfWork(directory / CsvRepository.filename)
+
+    return CsvUnitOfWork()
+
+
+def find_daemon():
+    """A client for the daemon serving the history file, None if no daemon is running"""
+    from slutil.services.daemon import DaemonClient
+    return DaemonClient.find(find_unit_of_work().path)
+
+
+def create_slurm_service() -> AbstractSlurmService:
+    """Poll jobs one call at a time over SLUTIL_SLURM_CONCURRENCY workers when set, otherwise in bulk"""
+    concurrency = os.getenv("SLUTIL_SLURM_CONCURRENCY")
+    if concurrency:
+        try:
+            workers = int(concurrency)
+        except ValueError:
+            workers = 0
+        if workers >= 1:
+            return ConcurrentSlurmService(SlurmService(), workers)
+        logging.warning("invalid SLUTIL_SLURM_CONCURRENCY, polling jobs in bulk")
+    return SlurmService()
 
 
 def start_cli():
@@ -19,15 +52,20 @@ def start_cli():
     logging.basicConfig(
         level=logging.DEBUG,
         format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=[logging.FileHandler("debug.log", "w")],
+        handlers=[logging.FileHandler("debug.log", "w", delay=True)],
     )
 
     logging.debug("starting cli")
 
+    if os.getenv("SLUTIL_PROFILE", 'False').lower() in ('true', '1', 't'):
+        profiler.start(os.getenv("SLUTIL_PROFILE_OUTPUT"))
+
+    # wrapped when the command runs, by which point --profile has been parsed
     dependencies = {
-        "uow": CsvUnitOfWork(),
-        "slurm_service": SlurmService(),
-        "vcs": Git()
+        "uow": Lazy(lambda: profiler.instrument(find_unit_of_work(), "uow", {"jobs": "repository"})),
+        "slurm": Lazy(lambda: profiler.instrument(create_slurm_service(), "slurm")),
+        "vcs": Lazy(lambda: profiler.instrument(Git(), "git")),
+        "daemon": Lazy(find_daemon),
     }
 
     c = command_factory(dependencies)
@@ -39,8 +77,12 @@ def start_cli():
             raise e
         else:
             logging.exception("error inside command group")
+            from rich.console import Console
             console = Console()
             console.print(f"[red]Error: {str(e)}[/red]")
+    finally:
+        if profiler.enabled:
+            profiler.report(pstats_path=os.getenv("SLUTIL_PROFILE_OUTPUT"))
 
 
 if __name__ == "__main__":
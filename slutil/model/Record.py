@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
 from functools import total_ordering
 from datetime import datetime
 from typing import Iterable, Optional
@@ -24,11 +23,24 @@ class DependencyState(Enum):
     FAILED = 6
 
 
-@dataclass
 class Dependencies:
-    type: DependencyType
-    state: DependencyState
-    ids: list[int]
+    # slotted rather than a dataclass, a history holds one of these for every job submitted with dependencies
+    __slots__ = ("type", "state", "ids")
+
+    def __init__(self, type: DependencyType, state: DependencyState, ids: list[int]):
+        self.type = type
+        self.state = state
+        self.ids = ids
+
+    def __eq__(self, other):
+        if not isinstance(other, Dependencies):
+            return NotImplemented
+        return (self.type, self.state, self.ids) == (other.type, other.state, other.ids)
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self):
+        return f"Dependencies(type={self.type!r}, state={self.state!r}, ids={self.ids!r})"
 
 
 class JobStatus(Enum):
@@ -47,20 +59,67 @@ class JobStatus(Enum):
     COMPLETING = 13
     STOPPED = 14
 
-@dataclass
+    @property
+    def is_terminal(self) -> bool:
+        """A job in a terminal state will not change state again"""
+        return self in TERMINAL_STATUSES
+
+
+TERMINAL_STATUSES = frozenset({
+    JobStatus.COMPLETED,
+    JobStatus.CANCELLED,
+    JobStatus.FAILED,
+    JobStatus.TIMEOUT,
+    JobStatus.NODE_FAIL,
+    JobStatus.PREEMPTED,
+    JobStatus.BOOT_FAIL,
+    JobStatus.DEADLINE,
+    JobStatus.OUT_OF_MEMORY,
+})
+
 @total_ordering
 class Record:
-    slurm_id: int
-    submitted_timestamp: datetime
-    git_tag: str
-    sbatch: str
-    status: JobStatus
-    description: str
-    last_updated: datetime
-
-    dependencies: Optional[Dependencies] = None
-    fresh_read: bool = False
-    deleted: bool = False
+    # slotted so a loaded history doesn't carry a __dict__ per job, the daemon keeps every job in memory
+    __slots__ = (
+        "slurm_id",
+        "submitted_timestamp",
+        "git_tag",
+        "sbatch",
+        "status",
+        "description",
+        "last_updated",
+        "dependencies",
+        "fresh_read",
+        "deleted",
+    )
+
+    def __init__(
+        self,
+        slurm_id: int,
+        submitted_timestamp: datetime,
+        git_tag: str,
+        sbatch: str,
+        status: JobStatus,
+        description: str,
+        last_updated: datetime,
+        dependencies: Optional[Dependencies] = None,
+        fresh_read: bool = False,
+        deleted: bool = False,
+    ):
+        self.slurm_id = slurm_id
+        self.submitted_timestamp = submitted_timestamp
+        self.git_tag = git_tag
+        self.sbatch = sbatch
+        self.status = status
+        self.description = description
+        self.last_updated = last_updated
+        self.dependencies = dependencies
+        self.fresh_read = fresh_read
+        self.deleted = deleted
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in Record.__slots__)
+        return f"Record({fields})"
 
     def __hash__(self):
         return hash((self.slurm_id, self.submitted_timestamp))
@@ -74,24 +133,64 @@ class Record:
 
     @property
     def is_finished(self) -> bool:
-        return self.status in [
-            JobStatus.COMPLETED,
-            JobStatus.FAILED,
-            JobStatus.PREEMPTED,
-        ]
+        return self.status.is_terminal
     
     @property
     def in_progress(self) -> bool:
-        return self.status not in [
-            JobStatus.COMPLETED,
-            JobStatus.FAILED,
-            JobStatus.PREEMPTED,
-        ]
+        return not self.status.is_terminal
 
     def __gt__(self, other):
         return self.slurm_id > other.slurm_id
 
 
+def _dependency_states(failed: Iterable[JobStatus], completed: Iterable[JobStatus], running: Iterable[JobStatus], pending: Iterable[JobStatus]):
+    # (state, statuses, whether every job must have one of the statuses rather than any job)
+    return (
+        (DependencyState.FAILED, frozenset(failed), False),
+        (DependencyState.COMPLETED, frozenset(completed), True),
+        (DependencyState.RUNNING, frozenset(running), False),
+        (DependencyState.PENDING, frozenset(pending), True),
+    )
+
+
+NOT_OK_STATUSES = (JobStatus.FAILED, JobStatus.CANCELLED, JobStatus.PREEMPTED, JobStatus.SUSPENDED, JobStatus.STOPPED)
+
+# statuses of the jobs depended on which make a dependency failed, completed, running or pending, checked in that order
+DEPENDENCY_STATE_TABLES: dict[DependencyType, tuple[tuple[DependencyState, frozenset[JobStatus], bool], ...]] = {
+    DependencyType.after: _dependency_states(
+        failed=(),
+        completed=(s for s in JobStatus if s != JobStatus.PENDING),
+        running=(),
+        pending=(JobStatus.PENDING,),
+    ),
+    DependencyType.afterok: _dependency_states(
+        failed=NOT_OK_STATUSES,
+        completed=(JobStatus.COMPLETED,),
+        running=(JobStatus.RUNNING, JobStatus.COMPLETING),
+        pending=(JobStatus.PENDING,),
+    ),
+    DependencyType.afterany: _dependency_states(
+        failed=(),
+        completed=(s for s in JobStatus if s not in (JobStatus.PENDING, JobStatus.RUNNING)),
+        running=(JobStatus.RUNNING,),
+        pending=(JobStatus.PENDING,),
+    ),
+    DependencyType.afternotok: _dependency_states(
+        failed=(JobStatus.COMPLETED,),
+        completed=NOT_OK_STATUSES,
+        running=(JobStatus.RUNNING, JobStatus.COMPLETING),
+        pending=(JobStatus.PENDING,),
+    ),
+}
+
+
+def failed_dependency_statuses(dependency_type: DependencyType) -> frozenset[JobStatus]:
+    """Statuses of a job depended on which mean the dependency can never be satisfied"""
+    if dependency_type not in DEPENDENCY_STATE_TABLES:
+        return frozenset()
+    return DEPENDENCY_STATE_TABLES[dependency_type][0][1]
+
+
 def aggregate_depedencies(job: Record, dependent_jobs: Iterable[Record]) -> DependencyState:
     if job.dependencies is None:
         return DependencyState.NONE
@@ -102,40 +201,8 @@ def aggregate_depedencies(job: Record, dependent_jobs: Iterable[Record]) -> Depe
         else:
             return DependencyState.PENDING
 
-    dependency_state_mapping = {
-        DependencyType.after: {
-            "completed": [s for s in JobStatus if s != JobStatus.PENDING],
-            "failed": [],
-            "runnning": [],
-            "pending": [JobStatus.PENDING]
-        },
-        DependencyType.afterok: {
-            "completed": [JobStatus.COMPLETED],
-            "failed": [JobStatus.FAILED, JobStatus.CANCELLED, JobStatus.PREEMPTED, JobStatus.SUSPENDED, JobStatus.STOPPED],
-            "running": [JobStatus.RUNNING, JobStatus.COMPLETING],
-            "pending": [JobStatus.PENDING]
-        },
-        DependencyType.afterany: {
-            "completed": [s for s in JobStatus if s not in [JobStatus.PENDING, JobStatus.RUNNING]],
-            "failed": [],
-            "running": [JobStatus.RUNNING],
-            "pending": [JobStatus.PENDING]
-        },
-        DependencyType.afternotok: {
-            "completed": [JobStatus.FAILED, JobStatus.CANCELLED, JobStatus.PREEMPTED, JobStatus.SUSPENDED, JobStatus.STOPPED],
-            "failed": [JobStatus.COMPLETED],
-            "running": [JobStatus.RUNNING, JobStatus.COMPLETING],
-            "pending": [JobStatus.PENDING]
-        }
-    }
-    state_map = dependency_state_mapping[job.dependencies.type]
-    if any(s.status in state_map["failed"] for s in dependent_jobs):
-        return DependencyState.FAILED
-    elif all(s.status in state_map["completed"] for s in dependent_jobs):
-        return DependencyState.COMPLETED
-    elif any(s.status in state_map["running"] for s in dependent_jobs):
-        return DependencyState.RUNNING
-    elif all(s.status in state_map["pending"] for s in dependent_jobs):
-        return DependencyState.PENDING
-    else:
-        return DependencyState.UNKNOWN
\ No newline at end of file
+    statuses = {j.status for j in dependent_jobs}
+    for state, table, every in DEPENDENCY_STATE_TABLES[job.dependencies.type]:
+        if (statuses <= table) if every else not statuses.isdisjoint(table):
+            return state
+    return DependencyState.UNKNOWN
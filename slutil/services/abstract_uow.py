@@ -1,4 +1,9 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
+import os
+from pathlib import Path
+from typing import Optional
 from slutil.adapters.abstract_repository import AbstractRepository
 
 
@@ -11,6 +16,33 @@ class AbstractUnitOfWork(ABC):
     def __exit__(self, *args):
         self.rollback()
 
+    @property
+    def path(self) -> Optional[Path]:
+        """The history file this unit of work reads and writes, if it has one"""
+        return None
+
+    def version(self) -> Optional[tuple]:
+        """Changes whenever the history file is written, by this or any other process"""
+        if self.path is None:
+            return None
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def known_version(self) -> Optional[tuple]:
+        """The version as of this unit of work's last read or own commit
+
+        Stays behind version() once another process writes, until reload, so a caller can tell that write apart
+        from its own commits
+        """
+        return self.version()
+
+    def reload(self):
+        """Forget every job read so far, so the next lookup sees changes made by other processes"""
+        pass
+
     def commit(self):
         self._commit()
 
@@ -1,10 +1,20 @@
+from __future__ import annotations
+
 import os
 from pathlib import Path
 from typing import Optional
 from slutil.adapters.csv_repository import CsvRepository
+from slutil.adapters.file_lock import FileLock
 from slutil.model.Record import Record
 from slutil.services.abstract_uow import AbstractUnitOfWork
+from slutil.instrumentation import profiler
 import csv
+import io
+import tempfile
+
+# the journal is folded into the csv file once it is larger than this and a quarter of the csv file
+JOURNAL_MIN_COMPACT_SIZE = 64 * 1024
+JOURNAL_COMPACT_RATIO = 4
 
 
 class CsvUnitOfWork(AbstractUnitOfWork):
@@ -12,6 +22,20 @@ class CsvUnitOfWork(AbstractUnitOfWork):
 
     def __init__(self, csv_path: Optional[Path]=None):
         self.jobs = CsvRepository(csv_path)
+        # taken before anything is read, so a commit can tell whether another process wrote in the meantime
+        self._read_version = self.version()
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self.jobs.csv_path
+
+    def reload(self):
+        self.jobs = CsvRepository(self.jobs.csv_path)
+        self._read_version = self.version()
+
+    def _lock(self) -> FileLock:
+        """Held while writing, every write re-reads what it depends on under the lock"""
+        return FileLock(self.jobs.lock_path)  # type: ignore
 
     def __enter__(self):
         if self.jobs.csv_path:
@@ -40,20 +64,92 @@ class CsvUnitOfWork(AbstractUnitOfWork):
     def _commit(self):
         if self.jobs.csv_path is None:
             raise ValueError("csv_repository attempting to load from csv_path=None")
-        
-        temp_path = os.path.join(
-            os.path.dirname(self.jobs.csv_path), ".slutil_temp.csv"
-        )
+
+        with self._lock():
+            unchanged = self.version() == self._read_version
+            if not unchanged:
+                # another process wrote since the jobs were read, keep its changes to fields this one didn't touch
+                self.jobs.merge(CsvRepository(self.jobs.csv_path))
+
+            jobs = self.jobs.changed() + self.jobs.added()
+            if jobs:
+                self._append_journal(jobs)
+            self.jobs.mark_clean()
+
+            if self._journal_size() > max(JOURNAL_MIN_COMPACT_SIZE, os.stat(self.jobs.csv_path).st_size // JOURNAL_COMPACT_RATIO):
+                self._compact()
+
+            # jobs read before another process wrote may be out of date, so keep merging from then on
+            if unchanged:
+                self._read_version = self.version()
+
+    def _journal_size(self) -> int:
+        try:
+            return os.stat(self.jobs.journal_path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _append_journal(self, jobs: list[Record]):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(self.serialise_job(j) for j in jobs)
+
+        # a single write to an O_APPEND descriptor, so readers never see part of another commit's lines
+        fd = os.open(self.jobs.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        try:
+            os.write(fd, buffer.getvalue().encode())
+        finally:
+            os.close(fd)
+        profiler.count("rows_written", len(jobs))
+
+    def compact(self):
+        """Fold the journal into the csv file"""
+        if self.jobs.csv_path is None:
+            raise ValueError("csv_repository attempting to load from csv_path=None")
+
+        with self._lock():
+            self._compact()
+
+    def _compact(self):
+        if self._journal_size() == 0:
+            return
+
+        # read afresh so changes committed by other processes since this unit of work read the file are kept
+        self._rewrite(CsvRepository(self.jobs.csv_path).list_all())
+        # readers wait for the lock, so none pairs this journal with the csv file written from it
+        os.remove(self.jobs.journal_path)
+
+    def _rewrite(self, jobs: list[Record]):
+        directory = os.path.dirname(self.jobs.csv_path)
+        fd, temp_path = tempfile.mkstemp(prefix=".slutil_temp", suffix=".csv", dir=directory)
         try:
-            data = [self.serialise_job(j) for j in self.jobs.list_all()]
-            with open(temp_path, "w", newline="") as f:
+            data = [self.serialise_job(j) for j in jobs]
+            with open(fd, "w", newline="") as f:
                 writer = csv.writer(f)
                 writer.writerows(data)
 
+            # mkstemp creates the file readable only by its owner
+            os.chmod(temp_path, os.stat(self.jobs.csv_path).st_mode & 0o777)
             os.replace(temp_path, self.jobs.csv_path)
-        except Exception as e:
+            profiler.count("rows_written", len(data))
+        except BaseException:
             os.remove(temp_path)
-            raise e
+            raise
+
+    def known_version(self) -> Optional[tuple]:
+        return self._read_version
+
+    def version(self) -> Optional[tuple]:
+        if self.path is None:
+            return None
+
+        versions = []
+        for path in (self.path, self.jobs.journal_path):
+            try:
+                stat = os.stat(path)
+                versions.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                versions.append(None)
+        return tuple(versions)
 
     def rollback(self):
         pass
@@ -0,0 +1,273 @@
+"""A long running process holding the job history in memory and polling slurm in bulk, queried over a unix socket
+
+Each request and response is a single line of json. Only read-mostly commands are served, anything that submits
+or edits jobs writes the history file directly and the daemon picks the change up before its next query.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import re
+import socket
+import socketserver
+import stat
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+from slutil.adapters.abstract_slurm_service import AbstractSlurmService, SlurmError, SlurmNotAccessibleError
+from slutil.adapters.csv_repository import CSVFormatError
+from slutil.adapters.polled_slurm import PolledSlurmService
+from slutil.adapters.sqlite_repository import SqliteRepository
+from slutil.services import services
+from slutil.services.abstract_uow import AbstractUnitOfWork
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.dto import FilterQuery, JobDTO, JobListResponse, JobResponse, Page
+from slutil.services.query import Query
+from slutil.services.sqlite_uow import SqliteUnitOfWork
+
+DEFAULT_POLL_INTERVAL = 30.0
+
+# errors raised by the services which are passed back to the cli as themselves
+ERRORS: dict[str, type] = {
+    e.__name__: e
+    for e in (KeyError, ValueError, OSError, FileNotFoundError, SlurmError, SlurmNotAccessibleError, CSVFormatError)
+}
+
+FILTER_FIELDS = ("id_filter", "status_filter", "description_filter", "timestamp_filter", "commit_filter", "sbatch_filter")
+
+
+class DaemonError(Exception):
+    pass
+
+
+def socket_directory() -> Path:
+    """A directory only this user can use, so no one else can put a socket where the cli will look for the daemon"""
+    base = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(base) / f"slutil-{os.getuid()}"
+
+
+def socket_path(history_path: Path) -> Path:
+    """The socket of the daemon serving a history file, kept out of the project directory and short enough to bind"""
+    digest = hashlib.sha1(str(history_path.resolve()).encode()).hexdigest()[:16]
+    return socket_directory() / f"{digest}.sock"
+
+
+def is_private(path: Path, file_type: Callable[[int], bool]) -> bool:
+    """Whether path is of file_type, belongs to this user and no one else can use it, without following symlinks"""
+    try:
+        status = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    return file_type(status.st_mode) and status.st_uid == os.getuid() and not status.st_mode & 0o077
+
+
+def unit_of_work_for(history_path: Path) -> AbstractUnitOfWork:
+    if history_path.name == SqliteRepository.filename:
+        return SqliteUnitOfWork(history_path)
+    return CsvUnitOfWork(history_path)
+
+
+def encode_query(query: FilterQuery) -> dict[str, Optional[str]]:
+    fields = {field: getattr(query, field).pattern if getattr(query, field) else None for field in FILTER_FIELDS}
+    fields["expression"] = query.expression.text if query.expression else None
+    return fields
+
+
+def decode_query(fields: dict[str, Optional[str]]) -> FilterQuery:
+    query = FilterQuery(**{field: re.compile(fields[field]) if fields.get(field) else None for field in FILTER_FIELDS})
+    if fields.get("expression"):
+        query.expression = Query(fields["expression"])  # type: ignore
+    return query
+
+
+def encode_job_list(response: JobListResponse) -> dict:
+    # asdict would deep copy the records behind a lazily mapped listing rather than build its DTOs
+    return {
+        "fresh": response.fresh,
+        "minimum_updated_time": response.minimum_updated_time,
+        "jobs": [asdict(j) for j in response.jobs],
+        "total": response.total,
+    }
+
+
+def decode_job_list(result: dict) -> JobListResponse:
+    return JobListResponse(
+        result["fresh"], result["minimum_updated_time"], [JobDTO(**j) for j in result["jobs"]], result.get("total")
+    )
+
+
+def decode_page(page: Optional[dict]) -> Optional[Page]:
+    return Page(**page) if page is not None else None
+
+
+def decode_job(result: dict) -> JobResponse:
+    return JobResponse(result["fresh"], result["updated_time"], JobDTO(**result["job"]))
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """Serves one request at a time, polling slurm between requests once the poll interval has passed"""
+
+    def __init__(self, history_path: Path, slurm: AbstractSlurmService, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.history_path = history_path
+        self.slurm = PolledSlurmService(slurm)
+        self.poll_interval = poll_interval
+        self.uow = unit_of_work_for(history_path)
+        self._history_version = self.uow.known_version()
+        self._next_poll = 0.0
+
+        self.commands: dict[str, Callable[..., Any]] = {
+            "get_job": lambda slurm_id: asdict(services.get_job(self.slurm, self.uow, slurm_id)),
+            "recent": lambda count: encode_job_list(services.recent(self.slurm, self.uow, count)),
+            "report": lambda page=None: encode_job_list(services.report(self.slurm, self.uow, decode_page(page))),
+            "filter_jobs": lambda query, page=None: encode_job_list(
+                services.filter_jobs(self.uow, self.slurm, decode_query(query), decode_page(page))
+            ),
+        }
+
+        path = socket_path(history_path)
+        try:
+            path.parent.mkdir(mode=0o700)
+        except FileExistsError:
+            pass
+        if not is_private(path.parent, stat.S_ISDIR):
+            raise DaemonError(f"{path.parent} must be a directory only you can access, please remove it")
+        if path.exists():
+            if DaemonClient(path).ping():
+                raise DaemonError(f"A slutil daemon is already running for {history_path}")
+            path.unlink()
+
+        # the socket is only ever accessible to this user, rather than for a moment after it is bound
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(path), DaemonRequestHandler)
+        finally:
+            os.umask(umask)
+
+    def reload_if_changed(self):
+        """Start again from the file if another process has written to it since the daemon last looked"""
+        if self.uow.version() != self._history_version:
+            logging.debug("daemon: %s changed, reloading", self.history_path)
+            self.uow.reload()
+            self._history_version = self.uow.known_version()
+            self._next_poll = 0.0
+
+    def poll(self):
+        self.reload_if_changed()
+        with self.uow:
+            job_ids = [j.slurm_id for j in self.uow.jobs.list_in_progress() if self.slurm.needs_polling(j.slurm_id)]
+        logging.debug("daemon: polling %d jobs", len(job_ids))
+        self.slurm.poll(job_ids)
+        self._next_poll = time.monotonic() + self.poll_interval
+
+    def service_actions(self):
+        if time.monotonic() >= self._next_poll:
+            try:
+                self.poll()
+            except Exception:
+                logging.exception("daemon: poll failed")
+                self._next_poll = time.monotonic() + self.poll_interval
+
+    def handle_command(self, request: dict) -> dict:
+        command = request.get("command")
+        if command == "ping":
+            return {"result": None}
+        if command not in self.commands:
+            return {"error": "ValueError", "message": f"unknown daemon command {command!r}"}
+
+        try:
+            self.reload_if_changed()
+            return {"result": self.commands[command](**request.get("arguments", {}))}
+        except Exception as e:
+            logging.debug("daemon: %s failed", command, exc_info=True)
+            return {"error": type(e).__name__, "message": e.args[0] if len(e.args) == 1 else str(e)}
+        finally:
+            # the command's own commit isn't a change by another process, but a write made while it ran is
+            self._history_version = self.uow.known_version()
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)  # type: ignore
+        except FileNotFoundError:
+            pass
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    # a client which stops talking must not hold up everyone else
+    timeout = 5
+    server: DaemonServer
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except (ValueError, socket.timeout):
+            return
+        self.wfile.write(json.dumps(self.server.handle_command(request)).encode() + b"\n")
+
+
+class DaemonClient:
+    """Sends queries to a running daemon, each method returns None if the daemon could not be reached"""
+
+    def __init__(self, path: Path, timeout: float = 60.0):
+        self.path = path
+        self.timeout = timeout
+
+    @staticmethod
+    def find(history_path: Optional[Path]) -> Optional[DaemonClient]:
+        if history_path is None:
+            return None
+        path = socket_path(history_path)
+        if not os.path.lexists(path):
+            return None
+        # another user's socket could answer with made up jobs
+        if not (is_private(path.parent, stat.S_ISDIR) and is_private(path, stat.S_ISSOCK)):
+            logging.warning("ignoring daemon socket %s, it isn't a socket only you can access", path)
+            return None
+        return DaemonClient(path)
+
+    def request(self, command: str, **arguments) -> Optional[dict]:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.timeout)
+                connection.connect(str(self.path))
+                connection.sendall(json.dumps({"command": command, "arguments": arguments}).encode() + b"\n")
+                with connection.makefile("rb") as reader:
+                    line = reader.readline()
+        except OSError as e:
+            logging.debug("daemon at %s not reachable: %s", self.path, e)
+            return None
+
+        if not line:
+            return None
+
+        response = json.loads(line)
+        if "error" in response:
+            raise ERRORS.get(response["error"], DaemonError)(response["message"])
+        return response
+
+    def ping(self) -> bool:
+        return self.request("ping") is not None
+
+    def get_job(self, slurm_id: int) -> Optional[JobResponse]:
+        response = self.request("get_job", slurm_id=slurm_id)
+        return decode_job(response["result"]) if response else None
+
+    def recent(self, count: int) -> Optional[JobListResponse]:
+        response = self.request("recent", count=count)
+        return decode_job_list(response["result"]) if response else None
+
+    def report(self, page: Optional[Page] = None) -> Optional[JobListResponse]:
+        # only sent when set, so a daemon started before paging existed still answers unpaged requests
+        arguments = {"page": asdict(page)} if page is not None else {}
+        response = self.request("report", **arguments)
+        return decode_job_list(response["result"]) if response else None
+
+    def filter_jobs(self, query: FilterQuery, page: Optional[Page] = None) -> Optional[JobListResponse]:
+        arguments = {"page": asdict(page)} if page is not None else {}
+        response = self.request("filter_jobs", query=encode_query(query), **arguments)
+        return decode_job_list(response["result"]) if response else None
@@ -0,0 +1,122 @@
+"""The jobs a command refreshes together with the jobs they depend on, built once per command
+
+Jobs depended on are looked up a level at a time in batches, every job whose state can still change is refreshed with
+one slurm call, and dependency states are aggregated in topological order so each sees its upstream jobs' new states.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Iterable
+from slutil.adapters.abstract_repository import AbstractRepository
+from slutil.model.Record import DependencyState, Record, aggregate_depedencies
+
+
+class DependencyGraph:
+    def __init__(self, roots: list[Record], jobs: dict[int, Record], missing: set[int], planned: list[Record]):
+        # the jobs the command asked about, and every job looked at through their dependencies
+        self.roots = roots
+        self.jobs = jobs
+        # ids depended on which have no visible job
+        self.missing = missing
+        # jobs whose state can still change, those depended on before those depending on them
+        self.planned, self.cyclic = self._order(planned)
+
+    @staticmethod
+    def build(roots: Iterable[Record], repository: AbstractRepository) -> DependencyGraph:
+        roots = list(roots)
+        jobs: dict[int, Record] = {}
+        for job in roots:
+            jobs.setdefault(job.slurm_id, job)
+        missing: set[int] = set()
+        planned: list[Record] = []
+
+        seen = set(roots)
+        level = list(dict.fromkeys(roots))
+        while level:
+            wanted = {
+                d for job in level if job.dependencies is not None
+                for d in job.dependencies.ids if d not in jobs and d not in missing
+            }
+            if wanted:
+                found = repository.find_many(wanted)
+                jobs.update(found)
+                missing.update(wanted - found.keys())
+
+            # only the jobs depended on by a job being refreshed need their own dependencies looked at
+            next_level = []
+            for job in level:
+                if not DependencyGraph._needs_refresh(job, jobs, missing):
+                    continue
+                planned.append(job)
+                for d in job.dependencies.ids if job.dependencies is not None else ():
+                    upstream = jobs.get(d)
+                    if upstream is not None and upstream not in seen:
+                        seen.add(upstream)
+                        next_level.append(upstream)
+            level = next_level
+
+        return DependencyGraph(roots, jobs, missing, planned)
+
+    @staticmethod
+    def _needs_refresh(job: Record, jobs: dict[int, Record], missing: set[int]) -> bool:
+        """Unfinished jobs and jobs depending on unfinished jobs"""
+        if job.in_progress:
+            return True
+        if job.dependencies is None:
+            return False
+        if any(d in missing for d in job.dependencies.ids):
+            return job.dependencies.state != DependencyState.UNKNOWN
+        return any(jobs[d].in_progress for d in job.dependencies.ids)
+
+    def _order(self, planned: list[Record]) -> tuple[list[Record], set[int]]:
+        """Sort depth first so each job follows the planned jobs it depends on, collecting the ids on any cycle"""
+        planned_ids: dict[int, Record] = {}
+        for job in planned:
+            planned_ids.setdefault(job.slurm_id, job)
+        visited: set[int] = set()
+        on_path: dict[int, int] = {}
+        order: list[Record] = []
+        cyclic: set[int] = set()
+
+        for start in planned:
+            if start.slurm_id in visited:
+                continue
+            # iterative, a pipeline can be longer than the recursion limit
+            path: list[tuple[Record, list[int]]] = [(start, self._upstream(start, planned_ids))]
+            on_path[start.slurm_id] = 0
+            visited.add(start.slurm_id)
+            while path:
+                job, pending = path[-1]
+                if pending:
+                    d = pending.pop()
+                    if d in on_path:
+                        cyclic.update(j.slurm_id for j, _ in path[on_path[d]:])
+                    elif d not in visited:
+                        visited.add(d)
+                        on_path[d] = len(path)
+                        path.append((planned_ids[d], self._upstream(planned_ids[d], planned_ids)))
+                    continue
+                path.pop()
+                del on_path[job.slurm_id]
+                order.append(job)
+
+        # a slurm id reused in a hand edited history leaves a second job under the same id, it goes last
+        ordered = {id(j) for j in order}
+        order.extend(j for j in planned if id(j) not in ordered)
+
+        if cyclic:
+            logging.warning("jobs %s depend on each other, their dependency state is unknown", sorted(cyclic))
+        return order, cyclic
+
+    @staticmethod
+    def _upstream(job: Record, planned_ids: dict[int, Record]) -> list[int]:
+        if job.dependencies is None:
+            return []
+        return [d for d in job.dependencies.ids if d in planned_ids]
+
+    def dependency_state(self, job: Record) -> DependencyState:
+        """Aggregated from the current state of the jobs depended on, which must already have been refreshed"""
+        assert job.dependencies is not None
+        if job.slurm_id in self.cyclic or any(d in self.missing for d in job.dependencies.ids):
+            return DependencyState.UNKNOWN
+        return aggregate_depedencies(job, [self.jobs[d] for d in job.dependencies.ids])
@@ -0,0 +1,124 @@
+"""Dependencies between every job in a history, indexed in both directions
+
+Built with one pass over the history, after which a query only follows the edges of the jobs it reaches, so finding
+what a job waits on or what waits on it costs the size of the answer rather than the size of the history.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable, Optional
+from slutil.model.Record import DependencyState, Record, aggregate_depedencies, failed_dependency_statuses
+
+
+class DependencyIndex:
+    def __init__(self, jobs: Iterable[Record]):
+        self.jobs: dict[int, Record] = {}
+        # the ids each job depends on, and the ids of the jobs depending on each job
+        self.upstream: dict[int, tuple[int, ...]] = {}
+        self.downstream: dict[int, list[int]] = {}
+
+        for job in jobs:
+            # a slurm id reused in a hand edited history, the first job listed keeps the id
+            if job.slurm_id in self.jobs:
+                continue
+            self.jobs[job.slurm_id] = job
+            if job.dependencies is None or not job.dependencies.ids:
+                continue
+            ids = tuple(dict.fromkeys(job.dependencies.ids))
+            self.upstream[job.slurm_id] = ids
+            for d in ids:
+                self.downstream.setdefault(d, []).append(job.slurm_id)
+
+    def _walk(self, starts: Iterable[int], adjacency: dict) -> list[int]:
+        """Breadth first from starts, each id once, ids with no visible job are skipped"""
+        order = [s for s in dict.fromkeys(starts) if s in self.jobs]
+        seen = set(order)
+        queue = deque(order)
+        while queue:
+            for d in adjacency.get(queue.popleft(), ()):
+                if d not in seen and d in self.jobs:
+                    seen.add(d)
+                    order.append(d)
+                    queue.append(d)
+        return order
+
+    def upstream_of(self, slurm_id: int) -> list[int]:
+        """The job and every job it waits on, directly or through other jobs"""
+        return self._walk([slurm_id], self.upstream)
+
+    def downstream_of(self, slurm_ids: Iterable[int]) -> list[int]:
+        """The jobs and every job waiting on them, directly or through other jobs"""
+        return self._walk(slurm_ids, self.downstream)
+
+    def roots(self) -> list[int]:
+        """Jobs other jobs depend on which don't depend on any job themselves"""
+        return [d for d in self.downstream if d in self.jobs and d not in self.upstream]
+
+    def edges(self, slurm_ids: Iterable[int]) -> list[tuple[int, int, str]]:
+        """(depended on, dependent, dependency type) for every dependency between the given jobs"""
+        wanted = set(slurm_ids)
+        return [
+            (d, j, self.jobs[j].dependencies.type.name)  # type: ignore
+            for j in wanted if j in self.upstream
+            for d in self.upstream[j] if d in wanted
+        ]
+
+    def blocked(self, within: Optional[Iterable[int]] = None) -> tuple[list[int], list[int]]:
+        """The jobs which can never run because a job they depend on ended the wrong way, and those jobs
+
+        Returns (jobs that caused it, blocked jobs). A job waiting on a blocked job is blocked too, whatever its
+        dependency type, since the job it waits on never starts. Only the given jobs are checked when within is set.
+        """
+        candidates = self.upstream.keys() if within is None else [j for j in within if j in self.upstream]
+        causes: dict[int, None] = {}
+        directly_blocked = []
+        for j in candidates:
+            job = self.jobs[j]
+            upstream = [self.jobs[d] for d in self.upstream[j] if d in self.jobs]
+            if aggregate_depedencies(job, upstream) != DependencyState.FAILED:
+                continue
+            directly_blocked.append(j)
+            failing = failed_dependency_statuses(job.dependencies.type)  # type: ignore
+            causes.update((u.slurm_id, None) for u in upstream if u.status in failing)
+
+        blocked = self.downstream_of(sorted(directly_blocked))
+        return sorted(causes), blocked
+
+    def critical_path(self, slurm_id: int) -> list[int]:
+        """The longest chain of unfinished jobs the job waits on, ending with the job
+
+        This is the order jobs still have to finish in before it can run, the job alone when nothing it waits on is
+        unfinished. Dependencies forming a cycle are not followed back round the cycle.
+        """
+        if slurm_id not in self.jobs:
+            return []
+        # longest chain ending at each job, found depth first without recursion, a pipeline can be deeper than the limit
+        longest: dict[int, tuple[int, Optional[int]]] = {}
+        on_path = {slurm_id}
+        path: list[tuple[int, list[int]]] = [(slurm_id, self._unfinished_upstream(slurm_id))]
+        while path:
+            job, pending = path[-1]
+            if pending:
+                d = pending.pop()
+                if d not in longest and d not in on_path:
+                    on_path.add(d)
+                    path.append((d, self._unfinished_upstream(d)))
+                continue
+            path.pop()
+            on_path.discard(job)
+            best: tuple[int, Optional[int]] = (1, None)
+            # the lowest id wins a tie so the path doesn't depend on the order dependencies were given in
+            for d in sorted(self._unfinished_upstream(job)):
+                if d in longest and longest[d][0] + 1 > best[0]:
+                    best = (longest[d][0] + 1, d)
+            longest[job] = best
+
+        chain: list[int] = []
+        current: Optional[int] = slurm_id
+        while current is not None:
+            chain.append(current)
+            current = longest[current][1]
+        return chain[::-1]
+
+    def _unfinished_upstream(self, slurm_id: int) -> list[int]:
+        return [d for d in self.upstream.get(slurm_id, ()) if d in self.jobs and self.jobs[d].in_progress]
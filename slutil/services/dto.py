@@ -1,18 +1,27 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
 from datetime import datetime
-from typing import Optional, Iterable, Union
+from typing import Optional, Iterable, Iterator, Union, TYPE_CHECKING
 from slutil.model.Record import DependencyState, Record, Dependencies, DependencyType, JobStatus, aggregate_depedencies
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService
 from slutil.adapters.abstract_vcs import AbstractVCS
 from slutil.services.abstract_uow import AbstractUnitOfWork
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import re
 from functools import total_ordering
 
+if TYPE_CHECKING:
+    from slutil.services.query import Query
+
 @dataclass(frozen=True)
 @total_ordering
 class JobDTO:
+    __slots__ = (
+        "slurm_id", "submitted_timestamp", "git_tag", "sbatch", "status", "description", "dependency_type",
+        "dependency_state", "dependency_ids",
+    )
+
     slurm_id: int
     submitted_timestamp: str
     git_tag: str
@@ -32,11 +41,62 @@ class JobResponse:
     updated_time: str
     job: JobDTO
 
+class JobDTOList(Sequence):
+    """JobDTOs mapped from records as they are read rather than all up front
+
+    Only the rows actually rendered or written are built and none are kept, so a listing costs little more memory than
+    the records it was made from. Each DTO shows its record as it is when read, copy to a list for a snapshot.
+    """
+    __slots__ = ("_records",)
+
+    def __init__(self, records: list[Record]):
+        self._records = records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [map_job_to_jobDTO(j) for j in self._records[index]]
+        return map_job_to_jobDTO(self._records[index])
+
+    def __iter__(self) -> Iterator[JobDTO]:
+        return map(map_job_to_jobDTO, self._records)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self):
+        return f"JobDTOList({list(self)!r})"
+
 @dataclass
 class JobListResponse:
+    fresh: bool
+    minimum_updated_time: str
+    jobs: Sequence[JobDTO]
+    # how many jobs matched, more than len(jobs) when only a page of them was asked for
+    total: Optional[int] = None
+
+@dataclass
+class Page:
+    """The jobs from offset onwards, newest first, at most limit of them when it is set"""
+    limit: Optional[int] = None
+    offset: int = 0
+
+@dataclass
+class GraphResponse:
     fresh: bool
     minimum_updated_time: str
     jobs: list[JobDTO]
+    # where the tree is drawn from, and the jobs drawn beneath each job
+    roots: list[int]
+    children: dict[int, list[int]]
+    # (depended on, dependent, dependency type) for every dependency between the jobs
+    edges: list[tuple[int, int, str]]
 
 @dataclass
 class JobRequestDTO:
@@ -44,6 +104,15 @@ class JobRequestDTO:
     description: str
     dependency_type: Optional[str]
     dependency_list: list[int]
+    # positions of other requests in the same batch this job depends on, their slurm ids are added once submitted
+    dependency_requests: list[int] = field(default_factory=list)
+
+@dataclass
+class SubmitResult:
+    request: JobRequestDTO
+    # set when slurm accepted the job, otherwise error says why it didn't
+    slurm_id: Optional[int] = None
+    error: Optional[str] = None
 
 
 def map_job_to_jobDTO(job: Record) -> JobDTO:
@@ -67,11 +136,19 @@ def map_job_to_jobResponse(job: Record) -> JobResponse:
         job=map_job_to_jobDTO(job)
     )
 
-def map_jobs_to_job_list(jobs: list[Record]) -> JobListResponse:
+def same_job_list(previous: Optional[JobListResponse], response: JobListResponse) -> bool:
+    """Whether two responses would be displayed the same, ignoring the timestamp of a fully fresh list"""
+    if previous is None or previous.fresh != response.fresh or previous.jobs != response.jobs:
+        return False
+    return response.fresh or previous.minimum_updated_time == response.minimum_updated_time
+
+
+def map_jobs_to_job_list(jobs: list[Record], total: Optional[int] = None) -> JobListResponse:
     return JobListResponse(
         fresh=all(j.fresh_read for j in jobs), 
-        minimum_updated_time=datetime.strftime(min([j.last_updated for j in jobs], default=datetime.now()), "%y-%m-%d %H:%M:%S"),
-        jobs=[map_job_to_jobDTO(j) for j in jobs])
+        minimum_updated_time=datetime.strftime(min([j.last_updated for j in jobs if not j.fresh_read], default=datetime.now()), "%y-%m-%d %H:%M:%S"),
+        jobs=JobDTOList(jobs),
+        total=len(jobs) if total is None else total)
 
 
 
@@ -82,4 +159,6 @@ class FilterQuery:
     description_filter: Optional[re.Pattern] = None
     timestamp_filter: Optional[re.Pattern] = None
     commit_filter: Optional[re.Pattern] = None
-    sbatch_filter: Optional[re.Pattern] = None
\ No newline at end of file
+    sbatch_filter: Optional[re.Pattern] = None
+    # a parsed query expression, combined with the regexes above
+    expression: Optional[Query] = None
\ No newline at end of file
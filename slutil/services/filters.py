@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Callable, Optional
+import re
+from slutil.model.Record import Record
+from slutil.services.dto import FilterQuery
+
+Predicate = Callable[[Record], bool]
+
+
+def submitted_timestamp_text(job: Record) -> str:
+    # same text as strftime("%Y-%m-%d %H:%M:%S"), without going through the format string parser
+    return job.submitted_timestamp.isoformat(" ", "seconds")
+
+
+def compile_predicate(checks: list[tuple[Optional[re.Pattern], Callable[[Record], str]]]) -> Optional[Predicate]:
+    """A single predicate requiring every set pattern to match its field, checked in the order given"""
+    searches = [(pattern.search, field) for pattern, field in checks if pattern is not None]
+    if not searches:
+        return None
+
+    def predicate(job: Record) -> bool:
+        for search, field in searches:
+            if search(field(job)) is None:
+                return False
+        return True
+
+    return predicate
+
+
+def compile_static_predicate(query: FilterQuery) -> Optional[Predicate]:
+    """The filters on fields slurm never changes, cheapest fields first so most jobs are rejected early"""
+    return compile_predicate([
+        (query.id_filter, lambda j: str(j.slurm_id)),
+        (query.commit_filter, lambda j: j.git_tag),
+        (query.sbatch_filter, lambda j: j.sbatch),
+        (query.description_filter, lambda j: j.description),
+        (query.timestamp_filter, submitted_timestamp_text),
+    ])
+
+
+def compile_status_predicate(query: FilterQuery) -> Optional[Predicate]:
+    return compile_predicate([(query.status_filter, lambda j: j.status.name)])
@@ -0,0 +1,134 @@
+"""Reading the jobs for submit-many
+
+A manifest is a .csv file with a header row or a .json file holding a list of objects, either way with the fields
+sbatch, description and optionally name and dependency. A dependency is in the same form as `submit --dependency`,
+e.g. afterok:123:456, and can also refer to entries of the same manifest as @name, or @number for the entry's
+position counting from 1, e.g. afterok:@preprocess. Relative sbatch paths in a manifest are relative to the
+manifest's directory. Anything else is an sbatch file or a glob of them, submitted with the description given on the
+command line.
+"""
+from __future__ import annotations
+
+import csv
+import glob
+import json
+import os
+import re
+from typing import Optional
+from slutil.services.dto import JobRequestDTO
+
+DEPENDENCY_PATTERN = re.compile(r"^(((after|afterany|afternotok|afterok)(:(\d*|@[\w.-]+))+)|singleton)$")
+
+MANIFEST_FIELDS = {"sbatch", "description", "dependency", "name"}
+
+GLOB_CHARACTERS = "*?["
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def parse_dependency(value: Optional[str]) -> tuple[Optional[str], list[int], list[str]]:
+    """The dependency type, the slurm ids depended on and the names of the manifest entries depended on"""
+    if not value:
+        return (None, [], [])
+    if not DEPENDENCY_PATTERN.match(value):
+        raise ManifestError(f"'{value}' is not a supported dependency option")
+    dependency_type, *parts = value.split(":")
+    return (
+        dependency_type,
+        [int(p) for p in parts if p and not p.startswith("@")],
+        [p[1:] for p in parts if p.startswith("@")],
+    )
+
+
+def is_glob(source: str) -> bool:
+    return any(c in source for c in GLOB_CHARACTERS)
+
+
+def request_from_entry(source: str, number: int, entry: dict) -> tuple[JobRequestDTO, list[str]]:
+    """The request for an entry, and the names of the entries it depends on which are yet to be resolved"""
+    if not isinstance(entry, dict):
+        raise ManifestError(f"{source} entry {number}: expected an object with sbatch and description")
+    unknown = {str(k) for k in entry if k not in MANIFEST_FIELDS}
+    if unknown:
+        raise ManifestError(f"{source} entry {number}: unknown fields {', '.join(sorted(unknown))}")
+    if not entry.get("sbatch"):
+        raise ManifestError(f"{source} entry {number}: missing sbatch")
+
+    if str(entry.get("name") or "").isdigit():
+        raise ManifestError(f"{source} entry {number}: name can't be a number, numbers refer to entries by position")
+
+    try:
+        dependency_type, dependency_list, references = parse_dependency(entry.get("dependency"))
+    except ManifestError as e:
+        raise ManifestError(f"{source} entry {number}: {e}")
+    # the manifest can be used from any directory, not only the one it is in
+    sbatch = os.path.join(os.path.dirname(source), str(entry["sbatch"]))
+    request = JobRequestDTO(sbatch, str(entry.get("description") or ""), dependency_type, dependency_list)
+    return request, references
+
+
+def resolve_references(source: str, entries: list[dict], references: list[list[str]]) -> list[list[int]]:
+    """The positions, counting from 0, of the entries each entry depends on"""
+    positions = {str(number): number - 1 for number in range(1, len(entries) + 1)}
+    for position, entry in enumerate(entries):
+        name = str(entry.get("name") or "")
+        if not name:
+            continue
+        if name in positions:
+            raise ManifestError(f"{source} entry {position + 1}: name {name} is used by more than one entry")
+        positions[name] = position
+
+    resolved = []
+    for number, names in enumerate(references, 1):
+        unknown = [n for n in names if n not in positions]
+        if unknown:
+            raise ManifestError(f"{source} entry {number}: no entry is called {', '.join(unknown)}")
+        if any(positions[n] == number - 1 for n in names):
+            raise ManifestError(f"{source} entry {number}: depends on itself")
+        resolved.append(list(dict.fromkeys(positions[n] for n in names)))
+    return resolved
+
+
+def read_manifest_file(path: str) -> list[JobRequestDTO]:
+    with open(path, newline="") as f:
+        if path.endswith(".json"):
+            try:
+                entries = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ManifestError(f"{path} is not valid json: {e}")
+            if not isinstance(entries, list):
+                raise ManifestError(f"{path} should hold a list of jobs")
+        else:
+            entries = list(csv.DictReader(f))
+
+    # numbered from 1 in the order written, the csv header doesn't count
+    parsed = [request_from_entry(path, number, entry) for number, entry in enumerate(entries, 1)]
+    requests = [request for request, _ in parsed]
+    for request, positions in zip(requests, resolve_references(path, entries, [names for _, names in parsed])):
+        request.dependency_requests = positions
+    return requests
+
+
+def read_manifests(sources: list[str], description: Optional[str] = None) -> list[JobRequestDTO]:
+    """Every job listed by the sources in order, checking each sbatch file exists before any job is submitted"""
+    requests: list[JobRequestDTO] = []
+    for source in sources:
+        if source.endswith((".csv", ".json")):
+            # entries refer to each other by position within their own manifest
+            offset = len(requests)
+            for request in read_manifest_file(source):
+                request.dependency_requests = [offset + p for p in request.dependency_requests]
+                requests.append(request)
+            continue
+
+        matches = sorted(glob.glob(source)) if is_glob(source) else [source]
+        if not matches:
+            raise ManifestError(f"no sbatch files match {source}")
+        requests.extend(JobRequestDTO(m, description or os.path.basename(m), None, []) for m in matches)
+
+    missing = [r.sbatch for r in requests if not os.path.isfile(r.sbatch)]
+    if missing:
+        raise ManifestError(f"sbatch files not found: {', '.join(missing)}")
+    return requests
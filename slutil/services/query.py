@@ -0,0 +1,309 @@
+"""A small expression language for filter, e.g. `status in (FAILED, TIMEOUT) and submitted >= 2024-01-01 and id > 1200000`
+
+    expression := term ("or" term)*
+    term       := factor ("and" factor)*
+    factor     := "not" factor | "(" expression ")" | comparison
+    comparison := field operator value | field "in" "(" value ("," value)* ")"
+    operator   := "=" | "!=" | "<" | "<=" | ">" | ">=" | "~"
+
+Every value stands for a span: an id for itself, a date for the whole day, "2024-01-01 12:30" for that minute. `=` matches
+within the span, `<` before it and `<=` up to its end, so `submitted <= 2024-01-31` includes the 31st. `~` is a regex search.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import re
+from typing import Any, Callable, Optional
+from slutil.adapters.abstract_repository import Range
+from slutil.model.Record import JobStatus, Record
+
+UNBOUNDED: Range = (None, None)
+
+TOKEN_PATTERN = re.compile(r"""\s*(?:("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(<=|>=|!=|=|<|>|~|\(|\)|,)|([^\s()<>=!~,"']+))""")
+
+KEYWORDS = {"and", "or", "not", "in"}
+
+ORDERED_OPERATORS = {"=", "!=", "<", "<=", ">", ">=", "in"}
+TEXT_OPERATORS = {"=", "!=", "~", "in"}
+
+TIMESTAMP_FORMATS = (
+    ("%Y-%m-%d", timedelta(days=1)),
+    ("%Y-%m-%d %H:%M", timedelta(minutes=1)),
+    ("%Y-%m-%d %H:%M:%S", timedelta(seconds=1)),
+    ("%Y-%m-%dT%H:%M", timedelta(minutes=1)),
+    ("%Y-%m-%dT%H:%M:%S", timedelta(seconds=1)),
+)
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+def parse_id(text: str) -> Range:
+    try:
+        value = int(text)
+    except ValueError:
+        raise QuerySyntaxError(f"'{text}' is not a job id")
+    return (value, value + 1)
+
+
+def parse_timestamp(text: str) -> Range:
+    for timestamp_format, width in TIMESTAMP_FORMATS:
+        try:
+            start = datetime.strptime(text, timestamp_format)
+        except ValueError:
+            continue
+        return (start, start + width)
+    raise QuerySyntaxError(f"'{text}' is not a date, use YYYY-MM-DD optionally followed by HH:MM or HH:MM:SS")
+
+
+def parse_status(text: str) -> str:
+    if text.upper() not in JobStatus.__members__:
+        raise QuerySyntaxError(f"'{text}' is not a job status, expected one of {', '.join(JobStatus.__members__)}")
+    return text.upper()
+
+
+# field name: (value on a job, operators allowed, converts a value in the query)
+FIELDS: dict[str, tuple[Callable[[Record], Any], set[str], Callable[[str], Any]]] = {
+    "id": (lambda j: j.slurm_id, ORDERED_OPERATORS, parse_id),
+    "submitted": (lambda j: j.submitted_timestamp, ORDERED_OPERATORS, parse_timestamp),
+    "status": (lambda j: j.status.name, TEXT_OPERATORS, parse_status),
+    "description": (lambda j: j.description, TEXT_OPERATORS, str),
+    "commit": (lambda j: j.git_tag, TEXT_OPERATORS, str),
+    "sbatch": (lambda j: j.sbatch, TEXT_OPERATORS, str),
+}
+
+# fields kept in sorted order by the repositories, used to narrow the jobs scanned with a binary search
+RANGE_FIELDS = ("id", "submitted")
+
+
+def intersect(a: Range, b: Range) -> Range:
+    low = b[0] if a[0] is None or (b[0] is not None and b[0] > a[0]) else a[0]
+    high = b[1] if a[1] is None or (b[1] is not None and b[1] < a[1]) else a[1]
+    return (low, high)
+
+
+class Comparison:
+    def __init__(self, field: str, operator: str, values: list):
+        self.field = field
+        self.operator = operator
+        self.values = values
+        self.value_of = FIELDS[field][0]
+        self.test = self._compile()
+
+    def _compile(self) -> Callable[[Any], bool]:
+        operator = self.operator
+        if operator == "~":
+            search = re.compile(self.values[0]).search
+            return lambda v: search(v) is not None
+        if self.field not in RANGE_FIELDS:
+            if operator == "!=":
+                return lambda v: v != self.values[0]
+            return frozenset(self.values).__contains__
+
+        low, high = self.values[0]
+        if operator == "=":
+            return lambda v: low <= v < high
+        if operator == "!=":
+            return lambda v: not low <= v < high
+        if operator == "<":
+            return lambda v: v < low
+        if operator == "<=":
+            return lambda v: v < high
+        if operator == ">":
+            return lambda v: v >= high
+        if operator == ">=":
+            return lambda v: v >= low
+        return lambda v: any(lo <= v < hi for lo, hi in self.values)
+
+    def evaluate(self, job: Record, settled: bool) -> Optional[bool]:
+        # the status of an unfinished job is unknown until it has been refreshed
+        if self.field == "status" and not settled and job.in_progress:
+            return None
+        return self.test(self.value_of(job))
+
+    def range(self, field: str) -> Range:
+        if field != self.field:
+            return UNBOUNDED
+        if self.operator == "in":
+            return (min(v[0] for v in self.values), max(v[1] for v in self.values))
+        low, high = self.values[0]
+        return {
+            "=": (low, high),
+            "<": (None, low),
+            "<=": (None, high),
+            ">": (high, None),
+            ">=": (low, None),
+        }.get(self.operator, UNBOUNDED)
+
+
+class And:
+    def __init__(self, terms: list):
+        self.terms = terms
+
+    def evaluate(self, job: Record, settled: bool) -> Optional[bool]:
+        result: Optional[bool] = True
+        for term in self.terms:
+            value = term.evaluate(job, settled)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    def range(self, field: str) -> Range:
+        result = UNBOUNDED
+        for term in self.terms:
+            result = intersect(result, term.range(field))
+        return result
+
+
+class Or:
+    def __init__(self, terms: list):
+        self.terms = terms
+
+    def evaluate(self, job: Record, settled: bool) -> Optional[bool]:
+        result: Optional[bool] = False
+        for term in self.terms:
+            value = term.evaluate(job, settled)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    def range(self, field: str) -> Range:
+        ranges = [term.range(field) for term in self.terms]
+        low = None if any(r[0] is None for r in ranges) else min(r[0] for r in ranges)
+        high = None if any(r[1] is None for r in ranges) else max(r[1] for r in ranges)
+        return (low, high)
+
+
+class Not:
+    def __init__(self, term):
+        self.term = term
+
+    def evaluate(self, job: Record, settled: bool) -> Optional[bool]:
+        value = self.term.evaluate(job, settled)
+        return None if value is None else not value
+
+    def range(self, field: str) -> Range:
+        return UNBOUNDED
+
+
+class Query:
+    """A parsed expression
+
+    evaluate is three valued when settled is False: None means the job may match once its status has been refreshed
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.root = Parser(text).parse()
+
+    def evaluate(self, job: Record, settled: bool = True) -> Optional[bool]:
+        return self.root.evaluate(job, settled)
+
+    def range(self, field: str) -> Range:
+        """The [low, high) span a job's field must be within to match, either end is None when unbounded"""
+        return self.root.range(field)
+
+
+class Parser:
+    def __init__(self, text: str):
+        self.tokens = self._tokenise(text)
+        self.position = 0
+
+    @staticmethod
+    def _tokenise(text: str) -> list[tuple[str, str]]:
+        tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = TOKEN_PATTERN.match(text, position)
+            if match is None or match.end() == position:
+                raise QuerySyntaxError(f"unexpected character at position {position}: '{text[position:]}'")
+            quoted, symbol, word = match.groups()
+            if quoted is not None:
+                tokens.append(("value", re.sub(r"\\(.)", r"\1", quoted[1:-1])))
+            elif symbol is not None:
+                tokens.append(("symbol", symbol))
+            elif word.lower() in KEYWORDS:
+                tokens.append(("keyword", word.lower()))
+            else:
+                tokens.append(("value", word))
+            position = match.end()
+        return tokens
+
+    def _peek(self) -> Optional[tuple[str, str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _accept(self, kind: str, text: Optional[str] = None) -> Optional[str]:
+        token = self._peek()
+        if token is not None and token[0] == kind and (text is None or token[1] == text):
+            self.position += 1
+            return token[1]
+        return None
+
+    def _expect(self, kind: str, text: Optional[str] = None) -> str:
+        value = self._accept(kind, text)
+        if value is None:
+            found = self._peek()
+            raise QuerySyntaxError(f"expected {text or kind} but found {found[1] if found else 'end of query'}")
+        return value
+
+    def parse(self):
+        if not self.tokens:
+            raise QuerySyntaxError("empty query")
+        node = self._expression()
+        if self._peek() is not None:
+            raise QuerySyntaxError(f"unexpected '{self._peek()[1]}'")  # type: ignore
+        return node
+
+    def _expression(self):
+        terms = [self._term()]
+        while self._accept("keyword", "or"):
+            terms.append(self._term())
+        return terms[0] if len(terms) == 1 else Or(terms)
+
+    def _term(self):
+        factors = [self._factor()]
+        while self._accept("keyword", "and"):
+            factors.append(self._factor())
+        return factors[0] if len(factors) == 1 else And(factors)
+
+    def _factor(self):
+        if self._accept("keyword", "not"):
+            return Not(self._factor())
+        if self._accept("symbol", "("):
+            node = self._expression()
+            self._expect("symbol", ")")
+            return node
+        return self._comparison()
+
+    def _comparison(self) -> Comparison:
+        field = self._expect("value").lower()
+        if field not in FIELDS:
+            raise QuerySyntaxError(f"unknown field '{field}', expected one of {', '.join(FIELDS)}")
+        _, operators, convert = FIELDS[field]
+
+        if self._accept("keyword", "in"):
+            operator = "in"
+            self._expect("symbol", "(")
+            raw = [self._expect("value")]
+            while self._accept("symbol", ","):
+                raw.append(self._expect("value"))
+            self._expect("symbol", ")")
+        else:
+            operator = self._expect("symbol")
+            raw = [self._expect("value")]
+
+        if operator not in operators:
+            raise QuerySyntaxError(f"'{operator}' can't be used with {field}")
+        if operator == "~":
+            try:
+                re.compile(raw[0])
+            except re.error as e:
+                raise QuerySyntaxError(f"invalid regex '{raw[0]}': {e}")
+            return Comparison(field, operator, raw)
+        return Comparison(field, operator, [convert(v) for v in raw])
@@ -1,23 +1,21 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Iterable
-from slutil.model.Record import DependencyState, Record, Dependencies, DependencyType, JobStatus, aggregate_depedencies
+import heapq
+import itertools
+from typing import Iterable, Iterator, Optional
+from slutil.model.Record import DependencyState, Record, Dependencies, DependencyType, JobStatus
 from slutil.adapters.abstract_slurm_service import AbstractSlurmService, SlurmNotAccessibleError
 from slutil.adapters.abstract_vcs import AbstractVCS
 from slutil.services.abstract_uow import AbstractUnitOfWork
-import re
-from slutil.services.dto import JobResponse, JobListResponse, JobRequestDTO, FilterQuery, map_job_to_jobResponse, map_jobs_to_job_list
+from slutil.services.dependency_graph import DependencyGraph
+from slutil.services.dependency_index import DependencyIndex
+from slutil.services.filters import compile_static_predicate, compile_status_predicate
+from slutil.instrumentation import profiler
+from slutil.services.dto import GraphResponse, JobResponse, JobListResponse, JobRequestDTO, Page, SubmitResult, FilterQuery, map_job_to_jobResponse, map_jobs_to_job_list, same_job_list
 
 
-def update_dependencies(slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork, job: Record):
-    if job.dependencies is not None:
-        try:
-            dependent_jobs = update_job_states_nc([uow.jobs.get(j) for j in job.dependencies.ids], slurm_service, uow)
-            job.dependencies.state = aggregate_depedencies(job, dependent_jobs)
-        except KeyError:
-            job.dependencies.state = DependencyState.UNKNOWN
-
 def get_job(
     slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork, slurm_id: int
 ) -> JobResponse:
@@ -30,15 +28,13 @@ def get_job(
     
 def hide_job(uow: AbstractUnitOfWork, slurm_id: int):
     with uow:
-        job = uow.jobs.get(slurm_id)
-        job.deleted = True
+        uow.jobs.hide(slurm_id)
         uow.commit()
 
 
 def unhide_job(uow: AbstractUnitOfWork, slurm_id: int):
     with uow:
-        job = uow.jobs.get_deleted(slurm_id)
-        job.deleted = False
+        uow.jobs.unhide(slurm_id)
         uow.commit()
 
 
@@ -46,15 +42,58 @@ def recent(
     slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork, count: int
 ) -> JobListResponse:
     with uow:
-        all_jobs = uow.jobs.list()
-        jobs = [j for j in sorted([j for j in all_jobs if not j.deleted], reverse=True)[:count]]
+        jobs = uow.jobs.latest(count)
         output = update_job_states_nc(jobs, slurm_service, uow)
         uow.commit()
 
         return map_jobs_to_job_list(output)
 
+def watch_recent(
+    slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork, count: int
+) -> Iterator[Optional[JobListResponse]]:
+    """Like recent, but each next() only refreshes the listed jobs which are unfinished, yielding None if nothing changed
+
+    The listing is only read again after another process writes to the history, e.g. to submit a job, and the
+    history is only written when the listing changes
+    """
+    jobs: list[Record] = []
+    previous: Optional[JobListResponse] = None
+    version = None
+
+    while True:
+        with uow:
+            if previous is None or uow.version() != version:
+                if previous is not None:
+                    uow.reload()
+                version = uow.known_version()
+                jobs = uow.jobs.latest(count)
+
+            for j in jobs:
+                j.fresh_read = False
+            update_job_states_nc(jobs, slurm_service, uow)
+            response = map_jobs_to_job_list(jobs)
+            # compared with the next listing once these jobs have been refreshed again, so it can't follow the records
+            response.jobs = list(response.jobs)
+
+            changed = not same_job_list(previous, response)
+            if changed:
+                uow.commit()
+                version = uow.known_version()
+                previous = response
+
+        yield response if changed else None
+
+def page_of(jobs: list[Record], page: Optional[Page]) -> list[Record]:
+    """The jobs on the page, newest first, only ordering as many jobs as the page reaches"""
+    if page is None:
+        return jobs
+    if page.limit is None:
+        return sorted(jobs, reverse=True)[page.offset:]
+    return heapq.nlargest(page.offset + page.limit, jobs)[page.offset:]
+
+
 def report(
-    slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork
+    slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork, page: Optional[Page] = None
 ) -> JobListResponse:
     with uow:
         if not slurm_service.test_slurm_accessible():
@@ -64,7 +103,17 @@ def report(
         output = update_job_states_nc_return_changed(jobs, slurm_service, uow)
         uow.commit()
 
-        return map_jobs_to_job_list(output)
+        return map_jobs_to_job_list(page_of(output, page), len(output))
+
+def new_job(slurm_id: int, timestamp: datetime, repo_stamp: str, req: JobRequestDTO) -> Record:
+    if req.dependency_type:
+        dependencies = Dependencies(DependencyType[req.dependency_type], DependencyState.PENDING, req.dependency_list)
+    else:
+        dependencies = None
+    return Record(
+        slurm_id, timestamp, repo_stamp, req.sbatch, JobStatus.PENDING, req.description, datetime.now(), dependencies
+    )
+
 
 def submit(
     slurm_service: AbstractSlurmService,
@@ -76,19 +125,99 @@ def submit(
         repo_stamp = vcs.get_current_commit()
         timestamp = datetime.now()
         slurm_id = slurm_service.submit_job(req.sbatch, req.dependency_type, req.dependency_list)
-        if req.dependency_type:
-            dependencies = Dependencies(DependencyType[req.dependency_type], DependencyState.PENDING, req.dependency_list)
-        else:
-            dependencies = None
-        new_job = Record(
-            slurm_id, timestamp, repo_stamp, req.sbatch, JobStatus.PENDING, req.description, datetime.now(), dependencies
-        )
-        uow.jobs.add(new_job)
+        uow.jobs.add(new_job(slurm_id, timestamp, repo_stamp, req))
         uow.commit()
 
         return str(slurm_id)
 
 
+def submission_waves(requests: list[JobRequestDTO]) -> list[list[int]]:
+    """The positions of the requests in the order they can be submitted, each wave only depending on earlier waves"""
+    waiting = {i: set(r.dependency_requests) for i, r in enumerate(requests)}
+    for i, depends_on in waiting.items():
+        if any(not 0 <= d < len(requests) for d in depends_on):
+            raise ValueError(f"{requests[i].sbatch} depends on a job which isn't being submitted")
+
+    waves = []
+    submitted: set[int] = set()
+    while waiting:
+        wave = [i for i, depends_on in waiting.items() if depends_on <= submitted]
+        if not wave:
+            cycle = ", ".join(requests[i].sbatch for i in waiting)
+            raise ValueError(f"jobs depend on each other in a cycle and can't be submitted: {cycle}")
+        for i in wave:
+            del waiting[i]
+        submitted.update(wave)
+        waves.append(wave)
+    return waves
+
+
+def submit_many(
+    slurm_service: AbstractSlurmService,
+    uow: AbstractUnitOfWork,
+    vcs: AbstractVCS,
+    requests: list[JobRequestDTO],
+    max_workers: int,
+) -> list[SubmitResult]:
+    """Submit every request, at most max_workers at a time, recording the accepted jobs with a single commit
+
+    Requests depending on other requests are submitted in waves once the jobs they depend on have slurm ids. A job
+    slurm refuses doesn't stop the others, only the jobs depending on it. Jobs slurm accepted are recorded even if the
+    submission is interrupted
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    waves = submission_waves(requests)
+
+    with uow:
+        if not slurm_service.test_slurm_accessible():
+            raise SlurmNotAccessibleError("cannot access slurm. Ensure slurm can be accessed before submitting a job.")
+        repo_stamp = vcs.get_current_commit()
+
+        def submit_one(req: JobRequestDTO) -> tuple[datetime, int]:
+            timestamp = datetime.now()
+            return timestamp, slurm_service.submit_job(req.sbatch, req.dependency_type, req.dependency_list)
+
+        results: list[Optional[SubmitResult]] = [None] * len(requests)
+        pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(requests))))
+        try:
+            for wave in waves:
+                futures = {}
+                for i in wave:
+                    req = requests[i]
+                    failed = [requests[d].sbatch for d in req.dependency_requests if results[d].slurm_id is None]  # type: ignore
+                    if failed:
+                        results[i] = SubmitResult(req, error=f"not submitted, depends on {', '.join(failed)} which wasn't submitted")
+                        continue
+                    dependency_list = req.dependency_list + [results[d].slurm_id for d in req.dependency_requests]  # type: ignore
+                    resolved = JobRequestDTO(req.sbatch, req.description, req.dependency_type, dependency_list)
+                    futures[i] = (resolved, pool.submit(submit_one, resolved))
+
+                try:
+                    with profiler.phase("slurm"):
+                        wait([future for _, future in futures.values()])
+                except BaseException:
+                    # submissions which haven't started are dropped, those in flight finish and are recorded below
+                    for _, future in futures.values():
+                        future.cancel()
+                    raise
+                finally:
+                    for i, (resolved, future) in futures.items():
+                        if future.cancelled():
+                            results[i] = SubmitResult(requests[i], error="not submitted, interrupted")
+                        elif future.exception() is not None:
+                            results[i] = SubmitResult(requests[i], error=str(future.exception()))
+                        else:
+                            timestamp, slurm_id = future.result()
+                            uow.jobs.add(new_job(slurm_id, timestamp, repo_stamp, resolved))
+                            results[i] = SubmitResult(requests[i], slurm_id=slurm_id)
+        finally:
+            pool.shutdown(wait=True)
+            uow.commit()
+
+        return results  # type: ignore
+
+
 def update_description(uow: AbstractUnitOfWork, slurm_id: int, new_description: str):
     with uow:
         j = uow.jobs.get(slurm_id)
@@ -96,97 +225,195 @@ def update_description(uow: AbstractUnitOfWork, slurm_id: int, new_description:
         uow.commit()
 
 
+def fetch_job_statuses(
+    jobs: list[Record], slurm_service: AbstractSlurmService
+) -> dict[int, JobStatus]:
+    in_progress = [j for j in jobs if j.in_progress]
+    if not in_progress:
+        return {}
+
+    statuses = slurm_service.get_job_statuses([j.slurm_id for j in in_progress])
+
+    missing = []
+    for j in in_progress:
+        if j.slurm_id not in statuses:
+            # pending jobs can take a while to show up in sacct
+            time_difference = (datetime.now() - j.submitted_timestamp).total_seconds()
+            if not (j.status == JobStatus.PENDING and time_difference < 60*30):
+                missing.append(j.slurm_id)
+    if missing:
+        raise OSError(f"sacct command has unexpected output, no status returned for jobs: {missing}")
+
+    return {job_id: JobStatus[status] for job_id, status in statuses.items()}
+
+
 def update_job_states_nc(
     jobs: list[Record], slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork
 ) -> list[Record]:
-    for j in jobs:
-        try:
-            if j.in_progress:
-                time_difference = (datetime.now() - j.submitted_timestamp).total_seconds() 
-                allow_none = j.status == JobStatus.PENDING and time_difference < 60*30
-                new_status = slurm_service.get_job_status(j.slurm_id, allow_none)
-                if new_status:  
-                    j.status = JobStatus[new_status]
-            j.last_updated = datetime.now()
-            j.fresh_read = True
-        except SlurmNotAccessibleError:
-            pass
-
-        update_dependencies(slurm_service, uow, j)
-
+    update_job_states_nc_return_changed(jobs, slurm_service, uow)
     return jobs
 
 def update_job_states_nc_return_changed(
     jobs: list[Record], slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork
 ) -> list[Record]:
-    changed_state = []
-    for j in jobs:
-        try:
-            if j.in_progress:
-                time_difference = (datetime.now() - j.submitted_timestamp).total_seconds() 
-                allow_none = j.status == JobStatus.PENDING and time_difference < 60*30
-
-                new_status = slurm_service.get_job_status(j.slurm_id, allow_none)
-                if new_status:
-                    if j.status != JobStatus[new_status]:
-                        changed_state.append(j)
-                    j.status = JobStatus[new_status]
+    with profiler.phase("dependencies"):
+        graph = DependencyGraph.build(jobs, uow.jobs)
+
+    # one slurm call covers the jobs asked about and every unfinished job they depend on, however deep
+    try:
+        new_statuses = fetch_job_statuses(graph.planned, slurm_service)
+        slurm_accessible = True
+    except SlurmNotAccessibleError:
+        new_statuses = {}
+        slurm_accessible = False
+
+    changed_state = set()
+    for j in graph.planned:
+        if slurm_accessible or not j.in_progress:
+            new_status = new_statuses.get(j.slurm_id)
+            if new_status:
+                if j.status != new_status:
+                    changed_state.add(id(j))
+                j.status = new_status
             j.last_updated = datetime.now()
             j.fresh_read = True
-        except SlurmNotAccessibleError:
-            pass
+        else:
+            # may still be marked fresh from an earlier refresh by a long running process
+            j.fresh_read = False
 
-        update_dependencies(slurm_service, uow, j)
+        # planned is in dependency order, so the jobs depended on already have their new state
+        if j.dependencies is not None:
+            j.dependencies.state = graph.dependency_state(j)
 
-    return changed_state
+    # finished jobs with finished dependencies are already up to date
+    planned = {id(j) for j in graph.planned}
+    for j in itertools.chain(jobs, graph.jobs.values()):
+        if id(j) not in planned:
+            j.fresh_read = True
 
+    return [j for j in jobs if id(j) in changed_state]
 
 
 def filter_jobs(
-    uow: AbstractUnitOfWork, slurm: AbstractSlurmService, query: FilterQuery
+    uow: AbstractUnitOfWork, slurm: AbstractSlurmService, query: FilterQuery, page: Optional[Page] = None
 ) -> JobListResponse:
+    """The jobs matching the query, only the page asked for when page is set
+
+    With a page, only the unfinished jobs whose status decides whether they match are refreshed before paging, the
+    rest of the jobs shown are refreshed afterwards, so jobs on other pages aren't looked up in slurm
+    """
+    static_predicate = compile_static_predicate(query)
+    status_predicate = compile_status_predicate(query)
+    expression = query.expression
+
     with uow:
-        matching_jobs = set(update_job_states_nc(uow.jobs.list(), slurm, uow))
-
-        if query.id_filter:
-            matching_jobs = {
-                j for j in matching_jobs if re.search(query.id_filter, str(j.slurm_id))
-            }
-
-        if query.description_filter:
-            matching_jobs = {
-                j
-                for j in matching_jobs
-                if re.search(query.description_filter, str(j.description))
-            }
-
-        if query.commit_filter:
-            matching_jobs = {
-                j for j in matching_jobs if re.search(query.commit_filter, j.git_tag)
-            }
-
-        if query.sbatch_filter:
-            matching_jobs = {
-                j for j in matching_jobs if re.search(query.sbatch_filter, j.sbatch)
-            }
-
-        if query.timestamp_filter:
-            matching_jobs = {
-                j
-                for j in matching_jobs
-                if re.search(
-                    query.timestamp_filter,
-                    datetime.strftime(j.submitted_timestamp, "%Y-%m-%d %H:%M:%S"),
-                )
-            }
-
-        if query.status_filter:
-            matching_jobs = {
-                j for j in matching_jobs if re.search(query.status_filter, j.status.name)
-            }
-
-    return map_jobs_to_job_list(list(matching_jobs))
+        if expression is None:
+            jobs = uow.jobs.list()
+        else:
+            jobs = uow.jobs.list_in_range(expression.range("id"), expression.range("submitted"))
+
+        # a finished job's status can't change, so only unfinished jobs need refreshing before the status is checked
+        candidates = [
+            j for j in jobs
+            if (static_predicate is None or static_predicate(j))
+            and (status_predicate is None or j.in_progress or status_predicate(j))
+            and (expression is None or expression.evaluate(j, settled=False) is not False)
+        ]
+        if page is None:
+            refreshed = candidates
+        else:
+            refreshed = [
+                j for j in candidates
+                if (status_predicate is not None and j.in_progress)
+                or (expression is not None and expression.evaluate(j, settled=False) is None)
+            ]
+        update_job_states_nc(refreshed, slurm, uow)
+
+        if status_predicate is not None:
+            candidates = [j for j in candidates if status_predicate(j)]
+        if expression is not None:
+            candidates = [j for j in candidates if expression.evaluate(j)]
+
+        shown = page_of(candidates, page)
+        if page is not None:
+            already = {id(j) for j in refreshed}
+            update_job_states_nc([j for j in shown if id(j) not in already], slurm, uow)
+
+    return map_jobs_to_job_list(shown, len(candidates))
+
+
+GRAPH_QUERIES = ("downstream", "upstream", "blocked", "critical-path")
+
+
+def dependency_graph(
+    slurm_service: AbstractSlurmService, uow: AbstractUnitOfWork, slurm_id: Optional[int], query: str
+) -> GraphResponse:
+    """The jobs a query over the dependencies reaches from slurm_id, refreshed, and the dependencies between them
+
+    downstream: the jobs waiting on the job, every pipeline when slurm_id is None
+    upstream: the jobs the job waits on
+    blocked: jobs which can never run because a job they depend on ended the wrong way, with the jobs that caused it,
+    limited to jobs downstream of slurm_id when it is set
+    critical-path: the longest chain of unfinished jobs the job waits on
+    """
+    if query not in GRAPH_QUERIES:
+        raise ValueError(f"unknown graph query {query}, expected one of {', '.join(GRAPH_QUERIES)}")
+    if slurm_id is None and query in ("upstream", "critical-path"):
+        raise ValueError(f"a job id is needed for the {query} query")
+
+    with uow:
+        with profiler.phase("dependencies"):
+            index = DependencyIndex(uow.jobs.list())
+        if slurm_id is not None and slurm_id not in index.jobs:
+            raise KeyError("No job exists with specified id")
+
+        def refresh(ids: list[int]):
+            update_job_states_nc([index.jobs[j] for j in ids], slurm_service, uow)
+
+        if query == "downstream":
+            roots = [slurm_id] if slurm_id is not None else index.roots()
+            ids = index.downstream_of(roots)
+            refresh(ids)
+            adjacency: dict = index.downstream
+        elif query == "upstream":
+            roots = [slurm_id]  # type: ignore
+            ids = index.upstream_of(slurm_id)  # type: ignore
+            refresh(ids)
+            adjacency = index.upstream
+        elif query == "blocked":
+            # statuses decide what is blocked, so every job with a dependency either way is refreshed first
+            scope = index.downstream_of([slurm_id]) if slurm_id is not None else None
+            refresh(scope if scope is not None else [j for j in index.jobs if j in index.upstream or j in index.downstream])
+            roots, blocked = index.blocked(scope)
+            ids = list(dict.fromkeys(roots + blocked))
+            adjacency = index.downstream
+        else:
+            refresh(index.upstream_of(slurm_id))  # type: ignore
+            ids = index.critical_path(slurm_id)  # type: ignore
+            roots = [slurm_id]  # type: ignore
+            # each job on the path is drawn above the one before it, which it waits on
+            adjacency = {later: [earlier] for earlier, later in zip(ids, ids[1:])}
+        uow.commit()
+
+        wanted = set(ids)
+        children = {j: [c for c in adjacency.get(j, ()) if c in wanted] for j in ids}
+        listing = map_jobs_to_job_list([index.jobs[j] for j in ids])
+        return GraphResponse(
+            listing.fresh, listing.minimum_updated_time, listing.jobs, roots, children, index.edges(ids)
+        )
 
 
 def create_repository_file(uow: AbstractUnitOfWork):
     uow.jobs.create_file()
+
+
+def migrate_history(source: AbstractUnitOfWork, target: AbstractUnitOfWork) -> int:
+    with source:
+        jobs = source.jobs.list_all()
+
+    with target:
+        for j in jobs:
+            target.jobs.add(j)
+        target.commit()
+
+    return len(jobs)
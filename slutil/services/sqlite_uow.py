@@ -0,0 +1,43 @@
+from pathlib import Path
+from typing import Optional
+from slutil.adapters.sqlite_repository import SqliteRepository
+from slutil.services.abstract_uow import AbstractUnitOfWork
+
+
+class SqliteUnitOfWork(AbstractUnitOfWork):
+    jobs: SqliteRepository
+
+    def __init__(self, db_path: Optional[Path]=None):
+        self.jobs = SqliteRepository(db_path)
+        self._read_version = self.version()
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self.jobs.db_path
+
+    def reload(self):
+        self.jobs.close()
+        self.jobs = SqliteRepository(self.jobs.db_path)
+        self._read_version = self.version()
+
+    def __enter__(self):
+        if self.jobs.db_path:
+            return self
+        else:
+            raise FileNotFoundError("No .slutil_job_history.sqlite file found in current directory or parents. Please use 'slutil migrate' to create the file")
+
+    def _commit(self):
+        if self.jobs.db_path is None:
+            raise ValueError("sqlite_repository attempting to write to db_path=None")
+
+        unchanged = self.version() == self._read_version
+        self.jobs.save()
+        # a write by another process before this one stays visible to known_version's callers
+        if unchanged:
+            self._read_version = self.version()
+
+    def known_version(self) -> Optional[tuple]:
+        return self._read_version
+
+    def rollback(self):
+        self.jobs.rollback()
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 import pytest
 from slutil.cli.command_factory import command_factory
 from slutil.model.Record import Record
 from slutil.adapters.abstract_repository import AbstractRepository
 from slutil.adapters.abstract_vcs import AbstractVCS
-from slutil.adapters.abstract_slurm_service import AbstractSlurmService
+from slutil.adapters.abstract_slurm_service import AbstractSlurmService, SlurmError, SlurmNotAccessibleError
 from slutil.services.abstract_uow import AbstractUnitOfWork
 import random
+import heapq
+import threading
+import time
+from typing import Callable, Optional, Union
 
 from slutil.services.csv_uow import CsvUnitOfWork
 
@@ -15,6 +20,8 @@ from slutil.services.csv_uow import CsvUnitOfWork
 class FakeRepository(AbstractRepository):
     def __init__(self):
         self._jobs: list[Record] = []
+        self._live: dict[int, Record] = {}
+        self._hidden: dict[int, Record] = {}
 
     @staticmethod
     def create_file():
@@ -26,18 +33,45 @@ class FakeRepository(AbstractRepository):
     
     def get(self, job_id):
         try:
-            return next(x for x in self._jobs if x.slurm_id == job_id and not x.deleted)
-        except StopIteration:
+            return self._live[job_id]
+        except KeyError:
             raise KeyError("No job exists with specified id")
 
     def get_deleted(self, job_id):
         try:
-            return next(x for x in self._jobs if x.slurm_id == job_id and x.deleted)
-        except StopIteration:
+            return self._hidden[job_id]
+        except KeyError:
             raise KeyError("No job exists with specified id")
 
+    def get_many(self, job_ids):
+        return [self.get(j) for j in job_ids]
+
     def add(self, job):
         self._jobs.append(job)
+        if job.deleted:
+            self._hidden.setdefault(job.slurm_id, job)
+        else:
+            self._live.setdefault(job.slurm_id, job)
+
+    def hide(self, job_id):
+        job = self.get(job_id)
+        del self._live[job_id]
+        job.deleted = True
+        self._hidden.setdefault(job_id, job)
+        return job
+
+    def unhide(self, job_id):
+        job = self.get_deleted(job_id)
+        del self._hidden[job_id]
+        job.deleted = False
+        self._live.setdefault(job_id, job)
+        return job
+
+    def iter_records(self):
+        yield from self._jobs
+
+    def latest(self, count):
+        return heapq.nlargest(count, self.list())
 
     def list(self) -> list[Record]:
         return [j for j in self._jobs if not j.deleted]
@@ -69,6 +103,10 @@ class FakeSlurm(AbstractSlurmService):
     def get_job_status(job_id: int, allow_none: bool):
         return "COMPLETED"
 
+    @staticmethod
+    def get_job_statuses(job_ids):
+        return {job_id: "COMPLETED" for job_id in job_ids}
+
     @staticmethod
     def submit_job(sbatch: str, dependency, depenency_list) -> int:
         return random.randrange(100000, 999999)
@@ -78,6 +116,88 @@ class FakeSlurm(AbstractSlurmService):
         return True
 
 
+class ScriptedSlurm(FakeSlurm):
+    """A slurm whose answers each test chooses, recording what it was asked
+
+    statuses maps a job id to its status, or is a function of the job id, jobs it doesn't cover have the default
+    status and a status of None means sacct has nothing for the job. Submitted jobs are numbered after first_id and
+    sbatch files in refuse are rejected. Every call takes delay seconds, so tests can see how many ran at once.
+    """
+
+    def __init__(
+        self,
+        statuses: Union[dict[int, Optional[str]], Callable[[int], Optional[str]], None] = None,
+        default: Optional[str] = "COMPLETED",
+        first_id: int = 1000,
+        refuse: tuple = (),
+        delay: float = 0.0,
+    ):
+        self.statuses = statuses if statuses is not None else {}
+        self.default = default
+        self.next_id = first_id
+        self.refuse = refuse
+        self.delay = delay
+        self.accessible = True
+
+        self.lock = threading.Lock()
+        # the job ids of each status lookup, and (sbatch, dependency type, dependency ids) of each submission
+        self.polled: list[list[int]] = []
+        self.submitted: list[tuple[str, Optional[str], list[int]]] = []
+        self.access_checks = 0
+        self.running = 0
+        self.most_running = 0
+
+    @property
+    def polled_ids(self) -> list[int]:
+        return [job_id for ids in self.polled for job_id in ids]
+
+    def status(self, job_id: int) -> Optional[str]:
+        if callable(self.statuses):
+            return self.statuses(job_id)
+        return self.statuses.get(job_id, self.default)
+
+    @contextmanager
+    def _call(self):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            time.sleep(self.delay)
+            if not self.accessible:
+                raise SlurmNotAccessibleError("Slurm accessed required but cannot access Slurm")
+            yield
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def get_job_status(self, job_id: int, allow_none: bool):
+        with self._call():
+            with self.lock:
+                self.polled.append([job_id])
+            return self.status(job_id)
+
+    def get_job_statuses(self, job_ids):
+        with self._call():
+            with self.lock:
+                self.polled.append(list(job_ids))
+            statuses = {job_id: self.status(job_id) for job_id in job_ids}
+            return {job_id: status for job_id, status in statuses.items() if status is not None}
+
+    def submit_job(self, sbatch: str, dependency_type, dependency_list) -> int:
+        with self._call():
+            if sbatch in self.refuse:
+                raise SlurmError(f"sbatch: error: invalid script {sbatch}")
+            with self.lock:
+                self.next_id += 1
+                self.submitted.append((sbatch, dependency_type, list(dependency_list)))
+                return self.next_id
+
+    def test_slurm_accessible(self):
+        with self.lock:
+            self.access_checks += 1
+        return self.accessible
+
+
 class FakeVCS(AbstractVCS):
     @staticmethod
     def get_current_commit():
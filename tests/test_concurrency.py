@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+from pathlib import Path
+import pytest
+from conftest import FakeVCS, ScriptedSlurm
+from slutil.adapters.csv_repository import CsvRepository
+from slutil.adapters.file_lock import FileLock
+from slutil.services import csv_uow
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.dto import JobRequestDTO
+from slutil.services.services import submit
+
+PROCESSES = 8
+SUBMITS_PER_PROCESS = 25
+
+
+def history_line(job_id: int) -> str:
+    return f"{job_id},2023-02-06 14:32:38,abc123,test.sbatch,COMPLETED,job {job_id},2023-02-06 14:32:38,none,none,[],False\n"
+
+
+def submit_many(csv_path: Path, worker: int):
+    # ids which can't collide between processes, forked processes share the random seed
+    slurm = ScriptedSlurm(first_id=1000000 + worker * 1000)
+    for i in range(SUBMITS_PER_PROCESS):
+        submit(slurm, CsvUnitOfWork(csv_path), FakeVCS(), JobRequestDTO("test.sbatch", f"worker {worker} job {i}", None, []))
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork to share the test setup")
+def test_parallel_submits_lose_no_jobs(tmp_path, monkeypatch):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i) for i in range(1, 11))
+    # compact on every commit, so appends race against rewrites as well as each other
+    monkeypatch.setattr(csv_uow, "JOURNAL_MIN_COMPACT_SIZE", 0)
+    monkeypatch.setattr(csv_uow, "JOURNAL_COMPACT_RATIO", 10 ** 9)
+
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=submit_many, args=(csv_path, w)) for w in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    uow = CsvUnitOfWork(csv_path)
+    with uow:
+        ids = [j.slurm_id for j in uow.jobs.list_all()]
+    assert len(ids) == 10 + PROCESSES * SUBMITS_PER_PROCESS
+    assert len(set(ids)) == len(ids)
+    assert sorted(os.listdir(tmp_path)) == [".slutil_job_history.csv", ".slutil_job_history.lock"]
+
+
+def test_commit_merges_changes_made_since_read(tmp_path):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i) for i in range(1, 11))
+
+    hiding = CsvUnitOfWork(csv_path)
+    editing = CsvUnitOfWork(csv_path)
+    with hiding, editing:
+        editing.jobs.get(4).description = "edited"
+        hiding.jobs.hide(4)
+        hiding.commit()
+        editing.commit()
+
+    uow = CsvUnitOfWork(csv_path)
+    with uow:
+        job = uow.jobs.get_deleted(4)
+        assert job.description == "edited"
+        assert len(uow.jobs.list_all()) == 10
+
+
+def test_sqlite_commit_merges_changes_made_since_read(tmp_path):
+    from slutil.adapters.sqlite_repository import SqliteRepository
+    from slutil.services.services import migrate_history
+    from slutil.services.sqlite_uow import SqliteUnitOfWork
+
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i) for i in range(1, 11))
+    SqliteRepository.create_file(tmp_path)
+    db_path = tmp_path / SqliteRepository.filename
+    migrate_history(CsvUnitOfWork(csv_path), SqliteUnitOfWork(db_path))
+
+    hiding = SqliteUnitOfWork(db_path)
+    editing = SqliteUnitOfWork(db_path)
+    with hiding, editing:
+        editing.jobs.get(4).description = "edited"
+        hiding.jobs.hide(4)
+        hiding.commit()
+        editing.commit()
+
+    uow = SqliteUnitOfWork(db_path)
+    with uow:
+        assert uow.jobs.get_deleted(4).description == "edited"
+
+
+def finish_jobs(csv_path: Path):
+    uow = CsvUnitOfWork(csv_path)
+    with uow:
+        uow.jobs.get(1).description = "finished"
+        uow.jobs.get(2).description = "finished"
+        uow.commit()
+
+
+def test_reader_never_pairs_journal_with_later_compaction(tmp_path, monkeypatch):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i) for i in range(1, 11))
+    uow = CsvUnitOfWork(csv_path)
+    with uow:
+        uow.jobs.get(1).description = "started"
+        uow.commit()
+    monkeypatch.setattr(csv_uow, "JOURNAL_MIN_COMPACT_SIZE", 0)
+    monkeypatch.setattr(csv_uow, "JOURNAL_COMPACT_RATIO", 10 ** 9)
+
+    # another process commits and compacts right after this one has read the journal
+    context = multiprocessing.get_context("fork")
+    writers = []
+    read_journal = CsvRepository._read_journal
+
+    def read_journal_then_write(self):
+        lines = read_journal(self)
+        if not writers:
+            writers.append(context.Process(target=finish_jobs, args=(csv_path,)))
+            writers[0].start()
+            writers[0].join(0.5)
+        return lines
+
+    monkeypatch.setattr(CsvRepository, "_read_journal", read_journal_then_write)
+    descriptions = {j.slurm_id: j.description for j in CsvRepository(csv_path).list_all()}
+    writers[0].join(60)
+    assert writers[0].exitcode == 0
+
+    # either the history before the other commit or after it, never the old journal over the compacted file
+    assert (descriptions[1], descriptions[2]) in [("started", "job 2"), ("finished", "finished")]
+
+
+def test_lock_is_not_shared_with_other_threads(tmp_path):
+    lock_path = tmp_path / ".slutil_job_history.lock"
+    events = []
+
+    def take_lock():
+        with FileLock(lock_path):
+            events.append("thread locked")
+
+    with FileLock(lock_path):
+        thread = threading.Thread(target=take_lock)
+        thread.start()
+        time.sleep(0.2)
+        events.append("main released")
+    thread.join(10)
+
+    assert events == ["main released", "thread locked"]
+
+
+def test_nested_lock_cannot_become_exclusive(tmp_path):
+    lock_path = tmp_path / ".slutil_job_history.lock"
+
+    with FileLock(lock_path, shared=True):
+        with pytest.raises(RuntimeError):
+            with FileLock(lock_path):
+                pass
+        # still held shared, and released once the outer lock exits
+        with FileLock(lock_path, shared=True):
+            pass
+    with FileLock(lock_path):
+        with FileLock(lock_path, shared=True):
+            pass
+    assert FileLock._held == {}
@@ -0,0 +1,159 @@
+from pathlib import Path
+import shutil
+from click.testing import CliRunner
+import pytest
+from slutil.adapters.csv_repository import CsvRepository, CSVFormatError
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.services import update_description, submit, hide_job
+from slutil.services.dto import JobRequestDTO
+from slutil.cli.command_factory import command_factory
+
+
+def history_line(job_id: int, deleted: bool = False) -> str:
+    return f"{job_id},2023-02-06 14:32:38,abc123,test.sbatch,COMPLETED,job {job_id},2023-02-06 14:32:38,none,none,[],{deleted}\n"
+
+
+CORRUPT_LINE = "999999,not a timestamp,abc123,test.sbatch,COMPLETED,corrupt,2023-02-06 14:32:38,none,none,[],False\n"
+
+
+@pytest.fixture
+def history(tmp_path) -> Path:
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i, deleted=(i == 3)) for i in range(1, 101))
+        f.write(CORRUPT_LINE)
+    return csv_path
+
+
+def test_file_read_on_first_access(history):
+    repository = CsvRepository(history)
+
+    with pytest.raises(CSVFormatError):
+        repository.list()
+
+
+def test_get_stops_at_first_match(history):
+    repository = CsvRepository(history)
+
+    assert repository.get(5).description == "job 5"
+    assert repository.get_deleted(3).description == "job 3"
+    assert [j.slurm_id for j in repository.get_many([7, 2])] == [7, 2]
+    with pytest.raises(KeyError):
+        repository.get(3)
+
+
+def test_latest_only_decodes_returned_lines(tmp_path):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.write(CORRUPT_LINE.replace("999999", "1"))
+        f.writelines(history_line(i, deleted=(i == 100)) for i in range(2, 101))
+
+    repository = CsvRepository(csv_path)
+
+    assert [j.slurm_id for j in repository.latest(3)] == [99, 98, 97]
+
+
+def test_streamed_changes_kept_when_file_rewritten(tmp_path):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i) for i in range(1, 11))
+
+    update_description(CsvUnitOfWork(csv_path), 4, "edited")
+
+    uow = CsvUnitOfWork(csv_path)
+    with uow:
+        assert uow.jobs.get(4).description == "edited"
+        assert len(uow.jobs.list()) == 10
+
+
+def test_submit_then_hide_in_one_unit_of_work(tmp_path, fake_slurm, fake_vcs):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i) for i in range(1, 11))
+
+    uow = CsvUnitOfWork(csv_path)
+    slurm_id = int(submit(fake_slurm, uow, fake_vcs, JobRequestDTO("test.sbatch", "new", None, [])))
+    hide_job(uow, slurm_id)
+
+    uow = CsvUnitOfWork(csv_path)
+    with uow:
+        assert len(uow.jobs.list_all()) == 11
+        assert uow.jobs.get_deleted(slurm_id).description == "new"
+
+
+def test_changes_replayed_from_journal(tmp_path):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i) for i in range(1, 11))
+    original = csv_path.read_text()
+
+    update_description(CsvUnitOfWork(csv_path), 4, "edited")
+    hide_job(CsvUnitOfWork(csv_path), 5)
+    with open(csv_path.with_suffix(".journal"), "a") as f:
+        f.write(history_line(11))
+        # a write cut short by a crash is ignored
+        f.write(history_line(12)[:20])
+
+    assert csv_path.read_text() == original
+    repository = CsvRepository(csv_path)
+    assert repository.get(4).description == "edited"
+    assert repository.get_deleted(5).deleted
+    assert [j.slurm_id for j in repository.list_all()] == list(range(1, 12))
+
+
+def test_compaction_folds_journal_into_csv(tmp_path):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.writelines(history_line(i) for i in range(1, 11))
+
+    update_description(CsvUnitOfWork(csv_path), 4, "edited")
+    CsvUnitOfWork(csv_path).compact()
+
+    assert not csv_path.with_suffix(".journal").exists()
+    lines = csv_path.read_text().splitlines()
+    assert len(lines) == 10
+    assert ",edited," in lines[3]
+
+
+def test_decode_errors_match_schema(tmp_path):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.write(history_line(1))
+        f.write("x2,2023-02-06 14:32:38,abc123,test.sbatch,DONE,job,2023-02-06 14:32:38,none,none,[],maybe\n")
+
+    with pytest.raises(CSVFormatError) as e:
+        CsvRepository(csv_path).list()
+
+    assert str(e.value) == (
+        "CSV record has errors, line 2: job_id ['Not a valid integer.']\n"
+        "status ['Must be one of: PENDING, RUNNING, SUSPENDED, COMPLETED, CANCELLED, FAILED, TIMEOUT, NODE_FAIL, "
+        "PREEMPTED, BOOT_FAIL, DEADLINE, OUT_OF_MEMORY, COMPLETING, STOPPED.']\n"
+        "is_deleted ['Not a valid boolean.']"
+    )
+
+
+def test_decode_dependencies(tmp_path):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    with open(csv_path, "w") as f:
+        f.write("5,2023-02-06 14:32:38,abc123,test.sbatch,PENDING,job,2023-2-6 4:32:38,afterok,RUNNING,\"[1, 2]\",False\n")
+
+    job = CsvRepository(csv_path).get(5)
+
+    assert job.dependencies.ids == [1, 2]
+    assert job.dependencies.type.name == "afterok"
+    assert job.last_updated.hour == 4
+
+
+def test_check_command(history):
+    runner = CliRunner()
+    with runner.isolated_filesystem(temp_dir=history.parent):
+        shutil.copy(history, ".slutil_job_history.csv")
+        with open(".slutil_job_history.csv", "a") as f:
+            f.write("1,2,3\n")
+
+        result = runner.invoke(command_factory({}), ["check"])
+
+        assert result.exit_code == 1
+        assert "line 101: submitted_timestamp ['Not a valid datetime.']" in result.output
+        assert "line number 102 is of an incorrect length" in result.output
+        assert str(result.exception).startswith("2 problems found")
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime
+import os
+import re
+import stat
+import threading
+from pathlib import Path
+import pytest
+from click.testing import CliRunner
+from conftest import FakeSlurm, ScriptedSlurm
+from slutil.main import command_factory
+from slutil.adapters.polled_slurm import PolledSlurmService
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.daemon import DaemonServer, DaemonClient, DaemonError, socket_path, socket_directory
+from slutil.services.dto import FilterQuery, Page
+from slutil.model.Record import Record, JobStatus
+from slutil.services.services import recent
+
+
+HISTORY = (
+    "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],False\n"
+    "400745,2023-02-06 14:33:38,abc123,README.md,RUNNING,second,2023-02-06 14:33:38,none,none,[],False\n"
+)
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    path = tmp_path / ".slutil_job_history.csv"
+    path.write_text(HISTORY)
+    return path
+
+
+@contextmanager
+def serving(history: Path, slurm: ScriptedSlurm):
+    server = DaemonServer(history, slurm, poll_interval=3600)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+@pytest.fixture
+def daemon(history):
+    slurm = ScriptedSlurm()
+    with serving(history, slurm) as server:
+        yield server, slurm
+
+
+def test_client_not_found_without_daemon(history):
+    assert DaemonClient.find(history) is None
+    assert DaemonClient.find(None) is None
+
+
+def test_recent_matches_direct_mode(daemon, history):
+    server, slurm = daemon
+    client = DaemonClient.find(history)
+    assert client is not None
+
+    response = client.recent(10)
+    direct = recent(FakeSlurm(), CsvUnitOfWork(history), 10)
+
+    assert response is not None
+    assert response.jobs == direct.jobs
+    assert response.fresh
+
+
+def test_queries_answered_from_poll(daemon, history):
+    server, slurm = daemon
+    client = DaemonClient(socket_path(history))
+
+    client.recent(10)
+    client.recent(10)
+    client.filter_jobs(FilterQuery(description_filter=re.compile("sec")))
+
+    # only the startup poll asked slurm, and only about the unfinished job
+    assert slurm.polled == [[400745]]
+
+
+def test_errors_are_raised_in_client(daemon, history):
+    client = DaemonClient(socket_path(history))
+
+    with pytest.raises(KeyError) as e:
+        client.get_job(123)
+    assert str(e.value) == "'No job exists with specified id'"
+
+
+def test_reloads_after_external_write(daemon, history):
+    client = DaemonClient(socket_path(history))
+    assert client.recent(10) is not None
+
+    with open(history, "a") as f:
+        f.write("400746,2023-02-06 14:34:38,abc123,README.md,COMPLETED,third,2023-02-06 14:34:38,none,none,[],False\n")
+
+    response = client.recent(10)
+    assert response is not None
+    assert [j.slurm_id for j in response.jobs] == [400746, 400745, 400744]
+
+
+def test_one_daemon_per_history(daemon, history):
+    with pytest.raises(DaemonError):
+        DaemonServer(history, FakeSlurm())
+
+
+def test_cli_uses_daemon(daemon, history, fake_vcs):
+    slurm = ScriptedSlurm()
+    runner = CliRunner()
+    cmd = command_factory({
+        "uow": CsvUnitOfWork(history),
+        "slurm": slurm,
+        "vcs": fake_vcs,
+        "daemon": DaemonClient(socket_path(history)),
+    })
+
+    result = runner.invoke(cmd, ["status", "400745"])
+    assert result.exit_code == 0, result.output
+    assert "400745" in result.output
+    # the cli doesn't poll slurm itself
+    assert slurm.polled == []
+
+
+def test_polled_slurm_service_caches_terminal_jobs():
+    slurm = ScriptedSlurm()
+    polled = PolledSlurmService(slurm)
+
+    polled.poll([1, 2])
+    assert polled.get_job_statuses([1, 2, 3]) == {1: "COMPLETED", 2: "COMPLETED", 3: "COMPLETED"}
+    assert slurm.polled == [[1, 2], [3]]
+    assert not polled.needs_polling(1)
+
+
+def test_filter_paged_through_daemon(daemon, history):
+    client = DaemonClient(socket_path(history))
+
+    response = client.filter_jobs(FilterQuery(description_filter=re.compile(".")), Page(limit=1, offset=1))
+
+    assert response is not None
+    assert [j.slurm_id for j in response.jobs] == [400744]
+    assert response.total == 2
+
+
+def test_jobs_are_stale_once_slurm_is_unreachable(history):
+    slurm = ScriptedSlurm(default="RUNNING")
+    with serving(history, slurm) as server:
+        client = DaemonClient(socket_path(history))
+        response = client.recent(10)
+        assert response is not None and response.fresh
+
+        slurm.accessible = False
+        server.poll()
+
+        # refreshed by the first request, but only the second request's refresh counts
+        response = client.recent(10)
+        assert response is not None
+        assert not response.fresh
+
+
+def test_reloads_after_write_during_command(daemon, history, monkeypatch):
+    server, slurm = daemon
+    client = DaemonClient(socket_path(history))
+    own_commit = server.uow._commit
+
+    def commit_after_another_process():
+        # e.g. a submit from another shell, which only appends to the history
+        other = CsvUnitOfWork(history)
+        time = datetime(2023, 2, 6, 14, 34, 38)
+        other.jobs.add(Record(400746, time, "abc123", "README.md", JobStatus.COMPLETED, "third", time))
+        other.commit()
+        monkeypatch.setattr(server.uow, "_commit", own_commit)
+        own_commit()
+
+    monkeypatch.setattr(server.uow, "_commit", commit_after_another_process)
+    assert client.report() is not None
+
+    response = client.filter_jobs(FilterQuery(description_filter=re.compile(".")))
+    assert response is not None
+    assert sorted(j.slurm_id for j in response.jobs) == [400744, 400745, 400746]
+
+
+def test_socket_is_private(daemon, history):
+    path = socket_path(history)
+
+    assert path.parent == socket_directory()
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+    assert stat.S_ISSOCK(os.stat(path).st_mode)
+    assert stat.S_IMODE(os.stat(path).st_mode) & 0o077 == 0
+
+
+def test_client_ignores_socket_others_can_reach(daemon, history):
+    assert DaemonClient.find(history) is not None
+
+    os.chmod(socket_directory(), 0o755)
+    assert DaemonClient.find(history) is None
+    os.chmod(socket_directory(), 0o700)
+
+
+def test_client_ignores_file_in_place_of_socket(history):
+    path = socket_path(history)
+    path.parent.mkdir(mode=0o700)
+    path.write_text("")
+
+    assert DaemonClient.find(history) is None
+
+
+def test_daemon_refuses_shared_socket_directory(history):
+    socket_directory().mkdir(mode=0o777)
+    os.chmod(socket_directory(), 0o777)
+
+    with pytest.raises(DaemonError):
+        DaemonServer(history, FakeSlurm())
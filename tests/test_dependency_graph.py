@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import pytest
+from conftest import ScriptedSlurm
+from slutil.adapters.csv_repository import CsvRepository
+from slutil.model.Record import Record, JobStatus, Dependencies, DependencyType, DependencyState, aggregate_depedencies
+from slutil.services import csv_uow
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.dependency_graph import DependencyGraph
+from slutil.services.services import get_job, recent
+
+
+def job(slurm_id: int, status: JobStatus = JobStatus.PENDING, depends_on: tuple = (), kind=DependencyType.afterok) -> Record:
+    time = datetime.now() - timedelta(hours=1)
+    dependencies = Dependencies(kind, DependencyState.PENDING, list(depends_on)) if depends_on else None
+    return Record(slurm_id, time, "cae42f", "test.sbatch", status, f"job {slurm_id}", time, dependencies)
+
+
+def test_pipeline_refreshed_in_one_pass(tmp_path, monkeypatch):
+    csv_path = tmp_path / ".slutil_job_history.csv"
+    csv_path.touch()
+    uow = CsvUnitOfWork(csv_path)
+    with uow:
+        # a chain where every job also waits on the job two before it, so upstream jobs are shared
+        for i in range(1, 1001):
+            uow.jobs.add(job(i, depends_on=tuple(d for d in (i - 1, i - 2) if d > 0)))
+        uow.commit()
+
+    monkeypatch.setattr(csv_uow, "JOURNAL_MIN_COMPACT_SIZE", 10 ** 9)
+    scans = []
+    read_lines = CsvRepository._read_lines
+    monkeypatch.setattr(CsvRepository, "_read_lines", lambda self: scans.append(1) or read_lines(self))
+    slurm = ScriptedSlurm()
+
+    response = get_job(slurm, CsvUnitOfWork(csv_path), 1000)
+
+    assert len(slurm.polled) == 1
+    assert sorted(slurm.polled[0]) == list(range(1, 1001))
+    # finding job 1000, two scans for the first levels of the chain, then one load for the rest of it
+    assert len(scans) == 4
+    assert response.job.status == "COMPLETED"
+    assert response.job.dependency_state == "COMPLETED"
+
+
+def test_dependency_states_follow_topological_order(in_memory_uow):
+    jobs = [job(1), job(2, depends_on=(1,)), job(3, depends_on=(2,))]
+    for j in reversed(jobs):
+        in_memory_uow.jobs.add(j)
+
+    graph = DependencyGraph.build([jobs[2]], in_memory_uow.jobs)
+    assert [j.slurm_id for j in graph.planned] == [1, 2, 3]
+
+    # each job sees the new status of the job before it, which it wouldn't if it were aggregated first
+    recent(ScriptedSlurm({1: "COMPLETED", 2: "RUNNING", 3: "PENDING"}), in_memory_uow, 10)
+    assert [j.dependencies.state for j in jobs[1:]] == [DependencyState.COMPLETED, DependencyState.RUNNING]
+
+
+def test_cycles_are_unknown(in_memory_uow):
+    jobs = [job(1, depends_on=(3,)), job(2, depends_on=(1,)), job(3, depends_on=(2,)), job(4, depends_on=(3,)), job(5, depends_on=(5,))]
+    for j in jobs:
+        in_memory_uow.jobs.add(j)
+
+    graph = DependencyGraph.build(jobs, in_memory_uow.jobs)
+    assert graph.cyclic == {1, 2, 3, 5}
+    assert len(graph.planned) == 5
+
+    recent(ScriptedSlurm(), in_memory_uow, 10)
+    assert [j.dependencies.state for j in jobs] == [DependencyState.UNKNOWN] * 3 + [DependencyState.COMPLETED, DependencyState.UNKNOWN]
+
+
+def test_missing_dependency_is_unknown(in_memory_uow, fake_slurm):
+    in_memory_uow.jobs.add(job(1, depends_on=(99,)))
+
+    assert get_job(fake_slurm, in_memory_uow, 1).job.dependency_state == "UNKNOWN"
+
+
+def test_finished_upstream_not_walked(in_memory_uow):
+    jobs = [job(1, JobStatus.COMPLETED), job(2, JobStatus.COMPLETED, (1,)), job(3, JobStatus.COMPLETED, (2,))]
+    for j in jobs:
+        in_memory_uow.jobs.add(j)
+
+    graph = DependencyGraph.build([jobs[2]], in_memory_uow.jobs)
+
+    assert graph.planned == []
+    assert set(graph.jobs) == {2, 3}
+
+
+@pytest.mark.parametrize("kind,statuses,expected", [
+    (DependencyType.after, [JobStatus.RUNNING, JobStatus.COMPLETED], DependencyState.COMPLETED),
+    (DependencyType.after, [JobStatus.PENDING], DependencyState.PENDING),
+    (DependencyType.afterok, [JobStatus.COMPLETED, JobStatus.FAILED], DependencyState.FAILED),
+    (DependencyType.afterok, [JobStatus.COMPLETED, JobStatus.RUNNING], DependencyState.RUNNING),
+    (DependencyType.afterok, [JobStatus.COMPLETED, JobStatus.PENDING], DependencyState.UNKNOWN),
+    (DependencyType.afterany, [JobStatus.TIMEOUT, JobStatus.COMPLETED], DependencyState.COMPLETED),
+    (DependencyType.afternotok, [JobStatus.COMPLETED], DependencyState.FAILED),
+    (DependencyType.afternotok, [JobStatus.CANCELLED], DependencyState.COMPLETED),
+])
+def test_aggregate_dependencies(kind, statuses, expected):
+    upstream = [job(i, status) for i, status in enumerate(statuses, 1)]
+    downstream = job(10, depends_on=tuple(range(1, len(statuses) + 1)), kind=kind)
+
+    assert aggregate_depedencies(downstream, upstream) == expected
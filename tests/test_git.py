@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+from pathlib import Path
+import pytest
+from slutil.adapters import git
+from slutil.adapters.git import Git
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def run_git(*args: str) -> str:
+    return subprocess.check_output(["git", *args], stderr=subprocess.DEVNULL).decode().strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GIT_DIR", raising=False)
+    run_git("init", "-q")
+    run_git("config", "user.email", "test@example.com")
+    run_git("config", "user.name", "test")
+    for i in range(5):
+        Path(f"file_{i}.txt").write_text(f"{i}\n")
+    Path("sub").mkdir()
+    Path("sub/nested.txt").write_text("nested\n")
+    run_git("add", ".")
+    run_git("commit", "-q", "-m", "first")
+    return tmp_path
+
+
+def expected_commit() -> str:
+    return run_git("rev-parse", "--short", "HEAD")
+
+
+class CountingSubprocess:
+    CalledProcessError = subprocess.CalledProcessError
+    STDOUT = subprocess.STDOUT
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def check_output(self, command, **kwargs):
+        self.calls.append(command)
+        return subprocess.check_output(command, **kwargs)
+
+
+def test_clean_checkout(repo):
+    assert Git.get_current_commit() == expected_commit()
+
+
+def test_slutil_files_do_not_make_checkout_dirty(repo):
+    for name in (".slutil_job_history.csv", ".slutil_job_history.journal", ".slutil_job_history.lock", "debug.log"):
+        Path(name).write_text("x\n")
+
+    assert Git.get_current_commit() == expected_commit()
+
+    Path("untracked.txt").write_text("x\n")
+    assert Git.get_current_commit() == expected_commit() + "[d]"
+
+
+def test_tracked_mode_ignores_untracked_files(repo, monkeypatch):
+    monkeypatch.setenv("SLUTIL_GIT_UNTRACKED", "no")
+    Path("untracked.txt").write_text("x\n")
+
+    assert Git.get_current_commit() == expected_commit()
+
+    Path("sub/nested.txt").write_text("changed\n")
+    assert Git.get_current_commit() == expected_commit() + "[d]"
+
+
+def test_default_untracked_mode_matches_git_status(repo, monkeypatch):
+    monkeypatch.delenv("SLUTIL_GIT_UNTRACKED", raising=False)
+    counting = CountingSubprocess()
+    monkeypatch.setattr(git, "subprocess", counting)
+    Path("new").mkdir()
+    Path("new/untracked.txt").write_text("x\n")
+
+    assert Git.get_current_commit() == expected_commit() + "[d]"
+    assert counting.calls[-1] == ["git", "status", "--porcelain", "--untracked-files=normal"]
+
+
+def test_outside_a_repository(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GIT_CEILING_DIRECTORIES", str(tmp_path.parent))
+
+    assert Git.get_current_commit() == "UNKNOWN"
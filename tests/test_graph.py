@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import pytest
+from click.testing import CliRunner
+from conftest import FakeSlurm, FakeUow, ScriptedSlurm
+from slutil.cli.command_factory import command_factory
+from slutil.cli.formatter import MAX_TREE_INDENT, dependency_tree_lines
+from slutil.model.Record import Record, JobStatus, Dependencies, DependencyType, DependencyState
+from slutil.services.dependency_index import DependencyIndex
+from slutil.services.services import dependency_graph
+
+
+def job(slurm_id: int, status: JobStatus = JobStatus.PENDING, depends_on: tuple = (), kind=DependencyType.afterok) -> Record:
+    time = datetime.now() - timedelta(hours=1)
+    dependencies = Dependencies(kind, DependencyState.PENDING, list(depends_on)) if depends_on else None
+    return Record(slurm_id, time, "cae42f", "test.sbatch", status, f"job {slurm_id}", time, dependencies)
+
+
+def pipeline() -> list[Record]:
+    # 1 -> 2 -> 4, 1 -> 3 -> 4, 4 -> 5, with 6 on its own
+    return [
+        job(1, JobStatus.COMPLETED),
+        job(2, JobStatus.FAILED, (1,)),
+        job(3, JobStatus.RUNNING, (1,)),
+        job(4, JobStatus.PENDING, (2, 3)),
+        job(5, JobStatus.PENDING, (4,), DependencyType.afterany),
+        job(6, JobStatus.COMPLETED),
+    ]
+
+
+def test_index_queries():
+    index = DependencyIndex(pipeline())
+
+    assert index.upstream_of(4) == [4, 2, 3, 1]
+    assert index.downstream_of([2]) == [2, 4, 5]
+    assert index.downstream_of([1]) == [1, 2, 3, 4, 5]
+    assert index.roots() == [1]
+    assert sorted(index.edges([1, 2, 4])) == [(1, 2, "afterok"), (2, 4, "afterok")]
+
+
+def test_missing_dependencies_are_skipped():
+    index = DependencyIndex([job(2, depends_on=(1,)), job(3, depends_on=(2, 99))])
+
+    assert index.upstream_of(3) == [3, 2]
+    assert index.roots() == []
+
+
+def test_blocked_follows_any_dependency_type():
+    index = DependencyIndex(pipeline())
+
+    # 4 can never run since 2 failed, and 5 waits on 4 finishing, which it never will
+    assert index.blocked() == ([2], [4, 5])
+    assert index.blocked([1, 3]) == ([], [])
+
+
+def test_critical_path_only_follows_unfinished_jobs():
+    jobs = pipeline() + [job(7, JobStatus.PENDING, (3, 5)), job(8, JobStatus.PENDING, (6,))]
+    index = DependencyIndex(jobs)
+
+    assert index.critical_path(7) == [3, 4, 5, 7]
+    assert index.critical_path(8) == [8]
+    assert index.critical_path(99) == []
+
+
+def test_deep_pipeline_without_recursion():
+    depth = 20000
+    index = DependencyIndex([job(i, depends_on=(i - 1,) if i > 1 else ()) for i in range(1, depth + 1)])
+
+    assert index.critical_path(depth) == list(range(1, depth + 1))
+    assert len(index.downstream_of([1])) == depth
+
+
+def test_tree_indentation_is_capped():
+    depth = 200
+    uow = FakeUow()
+    for i in range(1, depth + 1):
+        uow.jobs.add(job(i, JobStatus.COMPLETED, (i - 1,) if i > 1 else ()))
+
+    lines = list(dependency_tree_lines(dependency_graph(FakeSlurm(), uow, 1, "downstream")))
+
+    assert len(lines) == depth
+    assert max(len(line[0][0]) for line in lines) == 4 * (MAX_TREE_INDENT + 1)
+
+
+def test_cycles_terminate():
+    index = DependencyIndex([job(1, depends_on=(3,)), job(2, depends_on=(1,)), job(3, depends_on=(2,))])
+
+    assert sorted(index.upstream_of(1)) == [1, 2, 3]
+    assert index.critical_path(1) == [2, 3, 1]
+
+
+def test_graph_service_refreshes_the_jobs_shown():
+    uow = FakeUow()
+    for j in pipeline():
+        uow.jobs.add(j)
+
+    response = dependency_graph(ScriptedSlurm({3: "COMPLETED", 4: "RUNNING"}, default="PENDING"), uow, 4, "upstream")
+
+    assert [j.slurm_id for j in response.jobs] == [4, 2, 3, 1]
+    assert {j.slurm_id: j.status for j in response.jobs}[3] == "COMPLETED"
+    assert response.roots == [4]
+    assert response.children[4] == [2, 3]
+    assert uow.commited
+
+
+def test_graph_service_blocked_and_critical_path():
+    uow = FakeUow()
+    for j in pipeline():
+        uow.jobs.add(j)
+    slurm = ScriptedSlurm({3: "RUNNING"}, default="PENDING")
+
+    blocked = dependency_graph(slurm, uow, None, "blocked")
+    assert blocked.roots == [2]
+    assert blocked.children == {2: [4], 4: [5], 5: []}
+
+    path = dependency_graph(slurm, uow, 5, "critical-path")
+    assert [j.slurm_id for j in path.jobs] == [3, 4, 5]
+    assert path.children == {3: [], 4: [3], 5: [4]}
+
+    with pytest.raises(KeyError):
+        dependency_graph(slurm, uow, 99, "downstream")
+    with pytest.raises(ValueError):
+        dependency_graph(slurm, uow, None, "upstream")
+
+
+def test_graph_command():
+    uow = FakeUow()
+    for j in pipeline():
+        uow.jobs.add(j)
+    cmd = command_factory({"uow": uow, "slurm": ScriptedSlurm({3: "RUNNING"}, default="PENDING"), "vcs": None})
+    runner = CliRunner()
+
+    result = runner.invoke(cmd, ["graph"])
+    assert result.exit_code == 0
+    assert "Pipelines" in result.output
+    # 4 waits on both 2 and 3, the second time it is reached it refers back
+    assert "4 (shown above)" in result.output
+    assert "job 6" not in result.output
+
+    result = runner.invoke(cmd, ["graph", "4", "--query", "upstream", "--dot"])
+    assert result.exit_code == 0
+    assert result.output.startswith("digraph slutil {")
+    assert '2 -> 4 [label="afterok"];' in result.output
+    assert '1 [label="1\\nCOMPLETED\\njob 1", color="green3"];' in result.output
+
+    result = runner.invoke(cmd, ["graph", "--query", "critical-path"])
+    assert result.exit_code == 2
+    assert "SLURM_ID is required" in result.output
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import io
+import subprocess
+import sys
+from datetime import datetime
+from conftest import FakeUow, FakeSlurm
+from slutil.instrumentation import Profiler
+from slutil.model.Record import Record, JobStatus
+from slutil.services import services
+
+
+def test_disabled_profiler_returns_target():
+    profiler = Profiler()
+    uow = FakeUow()
+
+    assert profiler.instrument(uow, "uow") is uow
+
+
+def test_phase_times_are_exclusive():
+    profiler = Profiler()
+    profiler.start()
+
+    with profiler.phase("outer"):
+        with profiler.phase("inner"):
+            pass
+
+    summary = profiler.stop()
+    assert set(summary["phases"]) == {"cli", "outer", "inner"}
+    assert summary["phases"]["inner"]["calls"] == 1
+    total = sum(p["seconds"] for p in summary["phases"].values())
+    assert abs(total - summary["total_seconds"]) < 1e-5
+
+
+def test_instrumented_service_call():
+    profiler = Profiler()
+    profiler.start()
+
+    uow = profiler.instrument(FakeUow(), "uow", {"jobs": "repository"})
+    slurm = profiler.instrument(FakeSlurm(), "slurm")
+    job = Record(1, datetime.now(), "abc123", "a.sbatch", JobStatus.RUNNING, "running", datetime.now())
+    uow.jobs.add(job)
+
+    services.report(slurm, uow)
+
+    summary = profiler.stop()
+    assert summary["phases"]["repository"]["calls"] >= 1
+    assert summary["phases"]["slurm"]["calls"] >= 1
+    assert summary["phases"]["uow"]["calls"] >= 1
+
+
+def test_subprocess_forks_counted():
+    profiler = Profiler()
+    original = subprocess.check_output
+    profiler.start()
+
+    subprocess.check_output([sys.executable, "-c", "pass"])
+    subprocess.run([sys.executable, "-c", "pass"])
+
+    output = io.StringIO()
+    profiler.report(output)
+
+    assert subprocess.check_output is original
+    program = sys.executable.rsplit("/", 1)[-1]
+    assert json.loads(output.getvalue())["slutil_profile"]["subprocesses"][program]["count"] == 2
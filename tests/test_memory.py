@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from datetime import datetime
+import pytest
+from slutil.adapters.csv_repository import CsvRepository
+from slutil.model.Record import Record, JobStatus, Dependencies, DependencyType, DependencyState
+from slutil.services import dto
+from slutil.services.dto import JobDTOList, map_jobs_to_job_list
+
+
+def job(slurm_id: int) -> Record:
+    time = datetime(2024, 1, 1)
+    return Record(slurm_id, time, "abc123", "run.sbatch", JobStatus.COMPLETED, f"job {slurm_id}", time)
+
+
+def test_records_are_slotted():
+    record = job(1)
+    record.dependencies = Dependencies(DependencyType.afterok, DependencyState.PENDING, [2])
+
+    assert not hasattr(record, "__dict__")
+    assert not hasattr(record.dependencies, "__dict__")
+    with pytest.raises(AttributeError):
+        record.unknown = True  # type: ignore
+    assert record == job(1)
+    assert record.dependencies == Dependencies(DependencyType.afterok, DependencyState.PENDING, [2])
+    assert record.dependencies != Dependencies(DependencyType.afterok, DependencyState.FAILED, [2])
+    assert "dependencies=Dependencies(type=<DependencyType.afterok: 4>" in repr(record)
+
+
+def test_repeated_strings_stored_once(tmp_path):
+    csv_path = tmp_path / CsvRepository.filename
+    csv_path.write_text("".join(
+        f"{i},2024-01-01 00:00:00,abc123,run.sbatch,COMPLETED,job {i},2024-01-01 00:00:00,none,none,[],False\n"
+        for i in range(3)
+    ))
+
+    first, *rest = CsvRepository(csv_path).list()
+
+    for record in rest:
+        assert record.git_tag is first.git_tag
+        assert record.sbatch is first.sbatch
+    assert first.last_updated is first.submitted_timestamp
+
+
+def test_dtos_only_built_when_read(monkeypatch):
+    built = []
+    mapping = dto.map_job_to_jobDTO
+    monkeypatch.setattr(dto, "map_job_to_jobDTO", lambda j: built.append(j.slurm_id) or mapping(j))
+
+    response = map_jobs_to_job_list([job(i) for i in range(1000)])
+    assert isinstance(response.jobs, JobDTOList)
+    assert len(response.jobs) == 1000 and built == []
+
+    assert response.jobs[3].slurm_id == 3
+    assert [j.slurm_id for j in response.jobs[10:12]] == [10, 11]
+    assert built == [3, 10, 11]
+
+    assert response.jobs == [mapping(job(i)) for i in range(1000)]
+    assert response.jobs != [mapping(job(i)) for i in range(999)]
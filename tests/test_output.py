@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import pytest
+from click.testing import CliRunner
+from conftest import FakeSlurm, FakeVCS
+from slutil.cli.output import FIELDS, write_jobs
+from slutil.main import command_factory
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.dto import JobDTO
+
+HISTORY = (
+    "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],False\n"
+    '400745,2023-02-07 14:33:38,abc123,run.sbatch,FAILED,"tabs\tand, commas",2023-02-07 14:33:38,afterok,FAILED,[400744],False\n'
+)
+
+
+def dto(slurm_id: int, description: str = "test", dependency_ids=("NONE",)) -> JobDTO:
+    return JobDTO(slurm_id, "23-02-06 14:32:38", "abc123", "run.sbatch", "COMPLETED", description, "NONE", "NONE", list(dependency_ids))
+
+
+def test_json_formats_agree():
+    jobs = [dto(1), dto(2, "two", ["1"])]
+    json_out, jsonl_out = io.StringIO(), io.StringIO()
+
+    write_jobs(jobs, "json", json_out)
+    write_jobs(jobs, "jsonl", jsonl_out)
+
+    parsed = json.loads(json_out.getvalue())
+    assert parsed == [json.loads(line) for line in jsonl_out.getvalue().splitlines()]
+    assert parsed[1] == {
+        "slurm_id": 2, "submitted_timestamp": "23-02-06 14:32:38", "git_tag": "abc123", "sbatch": "run.sbatch",
+        "status": "COMPLETED", "description": "two", "dependency_type": "NONE", "dependency_state": "NONE",
+        "dependency_ids": [1],
+    }
+
+    empty = io.StringIO()
+    write_jobs([], "json", empty)
+    assert json.loads(empty.getvalue()) == []
+
+
+@pytest.mark.parametrize("output_format,delimiter", [("csv", ","), ("tsv", "\t")])
+def test_delimited_formats_quote_fields(output_format, delimiter):
+    out = io.StringIO()
+
+    write_jobs([dto(1, "tabs\tand, commas", ["3", "4"])], output_format, out)
+
+    rows = list(csv.reader(io.StringIO(out.getvalue()), delimiter=delimiter))
+    assert rows[0] == list(FIELDS)
+    assert rows[1][5] == "tabs\tand, commas"
+    assert rows[1][-1] == "3,4"
+
+
+def test_jobs_written_as_they_are_produced():
+    out = io.StringIO()
+    written = []
+
+    def jobs():
+        for i in range(3):
+            yield dto(i)
+            written.append(out.getvalue().count("\n"))
+
+    write_jobs(jobs(), "jsonl", out)
+
+    assert written == [1, 2, 3]
+
+
+@pytest.mark.parametrize("args", [
+    ["status", "400745"],
+    ["recent"],
+    ["report"],
+    ["filter", "-q", "id > 0"],
+])
+def test_commands_print_machine_formats(args):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open(".slutil_job_history.csv", "w") as f:
+            f.write(HISTORY)
+        cmd = command_factory({"uow": CsvUnitOfWork(), "slurm": FakeSlurm(), "vcs": FakeVCS()})
+
+        result = runner.invoke(cmd, [*args, "--format", "jsonl"])
+
+        assert result.exit_code == 0, result.output
+        jobs = [json.loads(line) for line in result.output.splitlines()]
+        if args[0] != "report":
+            assert {j["slurm_id"] for j in jobs} >= {400745}
+            assert next(j for j in jobs if j["slurm_id"] == 400745)["dependency_ids"] == [400744]
+
+
+def test_live_needs_a_table():
+    runner = CliRunner()
+    cmd = command_factory({"uow": None, "slurm": FakeSlurm(), "vcs": FakeVCS()})
+
+    result = runner.invoke(cmd, ["recent", "--live", "--format", "csv"])
+
+    assert result.exit_code == 2
+    assert "--live can only be used with the table format" in result.output
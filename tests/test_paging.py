@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import re
+import click
+import pytest
+from click.testing import CliRunner
+from conftest import FakeSlurm, FakeUow, ScriptedSlurm
+from slutil.cli import paging
+from slutil.cli.paging import resolve_page
+from slutil.main import command_factory
+from slutil.model.Record import Record, JobStatus
+from slutil.services.dto import FilterQuery, Page
+from slutil.services.query import Query
+from slutil.services.services import filter_jobs, report
+
+
+def odd_jobs_fail(job_id: int) -> str:
+    return "FAILED" if job_id % 2 else "COMPLETED"
+
+
+def history(count: int, status: JobStatus = JobStatus.RUNNING) -> FakeUow:
+    uow = FakeUow()
+    time = datetime.now() - timedelta(hours=1)
+    for i in range(1, count + 1):
+        uow.jobs.add(Record(i, time, "abc123", "run.sbatch", status, f"job {i}", time))
+    return uow
+
+
+def test_filter_only_refreshes_the_page():
+    slurm = ScriptedSlurm(odd_jobs_fail)
+
+    response = filter_jobs(history(100), slurm, FilterQuery(description_filter=re.compile("job")), Page(10, 20))
+
+    assert [j.slurm_id for j in response.jobs] == list(range(80, 70, -1))
+    assert response.total == 100
+    assert sorted(slurm.polled_ids) == list(range(71, 81))
+
+
+def test_filter_refreshes_jobs_whose_status_decides_the_match():
+    slurm = ScriptedSlurm(odd_jobs_fail)
+    uow = history(100)
+
+    response = filter_jobs(uow, slurm, FilterQuery(expression=Query("status = FAILED and id > 50")), Page(5))
+
+    assert [j.slurm_id for j in response.jobs] == [99, 97, 95, 93, 91]
+    assert response.total == 25
+    assert sorted(slurm.polled_ids) == list(range(51, 101))
+
+
+def test_unpaged_filter_unchanged():
+    response = filter_jobs(history(5), FakeSlurm(), FilterQuery(description_filter=re.compile("job")))
+
+    assert [j.slurm_id for j in response.jobs] == [1, 2, 3, 4, 5]
+    assert response.total == 5
+
+
+def test_report_paged():
+    response = report(ScriptedSlurm(odd_jobs_fail), history(30), Page(limit=20, offset=20))
+
+    assert [j.slurm_id for j in response.jobs] == list(range(10, 0, -1))
+    assert response.total == 30
+
+
+@pytest.mark.parametrize("arguments,expected", [
+    ((None, 0, None), None),
+    ((10, 0, None), Page(10, 0)),
+    ((None, 5, None), Page(None, 5)),
+    ((None, 0, 3), Page(50, 100)),
+    ((20, 0, 2), Page(20, 20)),
+])
+def test_resolve_page(arguments, expected):
+    assert resolve_page(*arguments) == expected
+
+
+def test_resolve_page_conflicts():
+    with pytest.raises(click.UsageError):
+        resolve_page(None, 5, 2)
+    with pytest.raises(click.UsageError):
+        resolve_page(10, 0, None, pager=True)
+
+
+def test_filter_command_page():
+    cmd = command_factory({"uow": history(120, JobStatus.COMPLETED), "slurm": FakeSlurm(), "vcs": None})
+
+    result = CliRunner().invoke(cmd, ["filter", "-d", "job", "--limit", "50", "--page", "3", "-v"])
+
+    assert result.exit_code == 0, result.output
+    assert "120 jobs with" in result.output
+    assert "Showing jobs 101-120 of 120" in result.output
+    assert "job 20" in result.output and "job 21" not in result.output
+
+
+def test_pager_fetches_a_screen_at_a_time(monkeypatch):
+    monkeypatch.setattr(paging.shutil, "get_terminal_size", lambda: (120, 27))
+    fetched = []
+    original = paging.show_in_pager
+
+    def counting_pager(fetch, title, verbose):
+        original(lambda page: fetched.append(page) or fetch(page), title, verbose)
+
+    monkeypatch.setattr("slutil.cli.cmd_filter.show_in_pager", counting_pager)
+    cmd = command_factory({"uow": history(45, JobStatus.COMPLETED), "slurm": FakeSlurm(), "vcs": None})
+
+    result = CliRunner().invoke(cmd, ["filter", "-d", "job", "--pager"])
+
+    assert result.exit_code == 0, result.output
+    assert fetched == [Page(20, 0), Page(20, 20), Page(20, 40)]
+    assert "Showing jobs 41-45 of 45" in result.output
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+import pytest
+from click.testing import CliRunner
+from slutil.main import command_factory
+from slutil.adapters.abstract_repository import AbstractRepository
+from slutil.adapters.csv_repository import CsvRepository
+from slutil.model.Record import Record, JobStatus
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.dto import FilterQuery
+from slutil.services.query import Query, QuerySyntaxError
+from slutil.services.services import filter_jobs
+
+
+def job(slurm_id: int, submitted: datetime, status: JobStatus = JobStatus.COMPLETED, description: str = "test") -> Record:
+    return Record(slurm_id, submitted, "abc123", "run.sbatch", status, description, submitted)
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("id > 100", [False, False, True]),
+    ("id >= 100", [False, True, True]),
+    ("id in (99, 101)", [True, False, True]),
+    ("status = failed", [False, True, False]),
+    ("status in (FAILED, TIMEOUT) or id < 100", [True, True, False]),
+    ("not status = FAILED and id != 101", [True, False, False]),
+    ("submitted = 2024-01-31", [False, True, True]),
+    ("submitted <= 2024-01-31", [True, True, True]),
+    ("submitted < 2024-01-31", [True, False, False]),
+    ("submitted > 2024-01-31", [False, False, False]),
+    ('submitted >= "2024-01-31 12:00"', [False, False, True]),
+    ("description ~ '^eval' or (commit = abc123 and sbatch ~ run)", [True, True, True]),
+])
+def test_query_evaluation(text, expected):
+    jobs = [
+        job(99, datetime(2024, 1, 30, 23, 59, 59), description="evaluation"),
+        job(100, datetime(2024, 1, 31, 0, 0, 0), JobStatus.FAILED),
+        job(101, datetime(2024, 1, 31, 23, 59, 59)),
+    ]
+
+    assert [Query(text).evaluate(j) for j in jobs] == expected
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "id >",
+    "id ~ 12",
+    "size > 3",
+    "status = DONE",
+    "submitted > yesterday",
+    "(id > 3",
+    "id > 3 id < 5",
+    "description ~ '('",
+])
+def test_query_syntax_errors(text):
+    with pytest.raises(QuerySyntaxError):
+        Query(text)
+
+
+def test_query_ranges():
+    query = Query("id > 100 and id <= 200 and (submitted >= 2024-01-01 or submitted >= 2024-02-01)")
+
+    assert query.range("id") == (101, 201)
+    assert query.range("submitted") == (datetime(2024, 1, 1), None)
+    assert Query("not id > 100").range("id") == (None, None)
+
+
+def test_unfinished_status_is_unknown_until_refreshed():
+    running = job(1, datetime(2024, 1, 1), JobStatus.RUNNING)
+    query = Query("status = FAILED")
+
+    assert query.evaluate(running, settled=False) is None
+    assert Query("not status = FAILED").evaluate(running, settled=False) is None
+    assert Query("status = FAILED or id = 1").evaluate(running, settled=False) is True
+
+
+def test_csv_range_lookup_matches_scan(tmp_path):
+    randomiser = random.Random(0)
+    (tmp_path / CsvRepository.filename).touch()
+    repository = CsvRepository(tmp_path / CsvRepository.filename)
+    start = datetime(2024, 1, 1)
+    for i in range(500):
+        record = job(randomiser.randrange(1000, 2000), start + timedelta(hours=randomiser.randrange(0, 2000)))
+        record.deleted = randomiser.random() < 0.1
+        repository.add(record)
+
+    for _ in range(50):
+        low, high = sorted(randomiser.randrange(900, 2100) for _ in range(2))
+        since = start + timedelta(hours=randomiser.randrange(0, 2000))
+        for id_range, submitted_range in (((low, high), (None, None)), ((None, high), (since, None)), ((low, None), (None, since))):
+            expected = AbstractRepository.list_in_range(repository, id_range, submitted_range)
+            assert sorted(repository.list_in_range(id_range, submitted_range), key=id) == sorted(expected, key=id)
+
+
+def test_filter_with_query(in_memory_uow, fake_slurm):
+    in_memory_uow.jobs.add(job(1, datetime(2024, 1, 1), JobStatus.FAILED))
+    in_memory_uow.jobs.add(job(2, datetime(2024, 2, 1), JobStatus.FAILED))
+    in_memory_uow.jobs.add(job(3, datetime(2024, 2, 1), JobStatus.RUNNING))
+
+    output = filter_jobs(in_memory_uow, fake_slurm, FilterQuery(expression=Query("submitted >= 2024-02-01 and status != FAILED")))
+
+    # fake slurm completes the running job
+    assert [(j.slurm_id, j.status) for j in output.jobs] == [(3, "COMPLETED")]
+
+
+def test_filter_query_command(fake_slurm, fake_vcs):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open(".slutil_job_history.csv", "w") as f:
+            f.write(
+                "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],False\n"
+                "400745,2023-02-07 14:33:38,abc123,README.md,FAILED,second,2023-02-07 14:33:38,none,none,[],False\n"
+            )
+        cmd = command_factory({"uow": CsvUnitOfWork(), "slurm": fake_slurm, "vcs": fake_vcs})
+
+        result = runner.invoke(cmd, ["filter", "-q", "submitted >= 2023-02-07 or status = FAILED"])
+        assert result.exit_code == 0
+        assert "1 jobs with" in result.output
+        assert "400745" in result.output
+
+        result = runner.invoke(cmd, ["filter", "-q", "submitted >"])
+        assert isinstance(result.exception, QuerySyntaxError)
+
+
+def test_sqlite_range_lookup(tmp_path):
+    from slutil.adapters.sqlite_repository import SqliteRepository
+    from slutil.services.sqlite_uow import SqliteUnitOfWork
+
+    SqliteRepository.create_file(tmp_path)
+    uow = SqliteUnitOfWork(tmp_path / SqliteRepository.filename)
+    with uow:
+        for i, day in enumerate((1, 2, 3, 4)):
+            uow.jobs.add(job(100 + i, datetime(2024, 1, day, 12)))
+        uow.commit()
+        uow.jobs.hide(102)
+
+        found = uow.jobs.list_in_range((101, None), Query("submitted <= 2024-01-03").range("submitted"))
+        assert [j.slurm_id for j in found] == [101]
@@ -1,13 +1,20 @@
-from slutil.model.Record import Record, JobStatus
+from slutil.model.Record import Record, JobStatus, Dependencies, DependencyType, DependencyState
 from slutil.services.services import (
     get_job,
     recent,
     filter_jobs,
+    hide_job,
+    unhide_job,
+    watch_recent,
     FilterQuery,
 )
 from slutil.services.dto import JobDTO, map_job_to_jobDTO
+from slutil.services.dependency_graph import DependencyGraph
 from datetime import datetime
 import re
+import pytest
+from conftest import FakeSlurm, ScriptedSlurm
+from slutil.services.csv_uow import CsvUnitOfWork
 
 
 def test_get_job(in_memory_uow, fake_slurm):
@@ -87,3 +94,129 @@ def test_search_description_some_match(in_memory_uow, fake_slurm):
     )
 
     assert all(x in [map_job_to_jobDTO(job1), map_job_to_jobDTO(job2)] for x in output.jobs)
+
+
+def test_hide_and_unhide_job(in_memory_uow, fake_slurm):
+    time = datetime.now()
+    job = Record(123456, time, "cae42f", "test.sbatch", JobStatus.COMPLETED, "hide me", time)
+    in_memory_uow.jobs.add(job)
+
+    hide_job(in_memory_uow, 123456)
+
+    assert job.deleted
+    assert in_memory_uow.jobs.get_deleted(123456) is job
+    with pytest.raises(KeyError):
+        get_job(fake_slurm, in_memory_uow, 123456)
+
+    unhide_job(in_memory_uow, 123456)
+
+    assert not job.deleted
+    assert get_job(fake_slurm, in_memory_uow, 123456).job.slurm_id == 123456
+    with pytest.raises(KeyError):
+        in_memory_uow.jobs.get_deleted(123456)
+
+
+def test_dependency_state_from_dependent_jobs(in_memory_uow, fake_slurm):
+    time = datetime.now()
+    upstream = [Record(i, time, "cae42f", "test.sbatch", JobStatus.PENDING, "upstream", time) for i in (1, 2)]
+    downstream = Record(
+        3, time, "cae42f", "test.sbatch", JobStatus.PENDING, "downstream", time,
+        Dependencies(DependencyType.afterok, DependencyState.PENDING, [1, 2])
+    )
+    for j in upstream + [downstream]:
+        in_memory_uow.jobs.add(j)
+
+    output = get_job(fake_slurm, in_memory_uow, 3)
+
+    assert output.job.dependency_state == "COMPLETED"
+
+
+def test_refresh_skips_terminal_jobs(in_memory_uow):
+    time = datetime.now()
+    finished = [
+        Record(i, time, "cae42f", "test.sbatch", status, "finished", time)
+        for i, status in enumerate([JobStatus.COMPLETED, JobStatus.CANCELLED, JobStatus.TIMEOUT, JobStatus.OUT_OF_MEMORY, JobStatus.NODE_FAIL])
+    ]
+    active = Record(10, time, "cae42f", "test.sbatch", JobStatus.PENDING, "active", time)
+    dependent = Record(
+        11, time, "cae42f", "test.sbatch", JobStatus.CANCELLED, "dependent", time,
+        Dependencies(DependencyType.afterok, DependencyState.PENDING, [10])
+    )
+    for j in finished + [active, dependent]:
+        in_memory_uow.jobs.add(j)
+    slurm = ScriptedSlurm(default="RUNNING")
+
+    # unfinished jobs and the jobs depending on them, the finished ones are already up to date
+    assert DependencyGraph.build(in_memory_uow.jobs.list(), in_memory_uow.jobs).planned == [active, dependent]
+
+    output = recent(slurm, in_memory_uow, 10)
+
+    assert 10 in slurm.polled_ids
+    assert not any(j.slurm_id in slurm.polled_ids for j in finished)
+    assert all(j.last_updated == time for j in finished)
+    assert dependent.dependencies.state == DependencyState.RUNNING
+    assert output.fresh
+
+
+def test_watch_recent_only_polls_unfinished_jobs(in_memory_uow):
+    time = datetime.now()
+    in_memory_uow.jobs.add(Record(1, time, "cae42f", "test.sbatch", JobStatus.COMPLETED, "done", time))
+    in_memory_uow.jobs.add(Record(2, time, "cae42f", "test.sbatch", JobStatus.PENDING, "waiting", time))
+    slurm = ScriptedSlurm(default="RUNNING")
+
+    updates = watch_recent(slurm, in_memory_uow, 10)
+
+    first = next(updates)
+    assert first is not None
+    assert [j.status for j in first.jobs] == ["RUNNING", "COMPLETED"]
+
+    in_memory_uow.commited = False
+    assert next(updates) is None
+    assert in_memory_uow.commited == False
+
+    slurm.default = "COMPLETED"
+    changed = next(updates)
+    assert changed is not None
+    assert [j.status for j in changed.jobs] == ["COMPLETED", "COMPLETED"]
+    assert in_memory_uow.commited == True
+
+    # nothing is left to poll once every job has finished
+    assert next(updates) is None
+    assert slurm.polled == [[2], [2], [2]]
+
+
+def test_watch_recent_rereads_after_external_write(tmp_path):
+    history = tmp_path / ".slutil_job_history.csv"
+    history.write_text("400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],False\n")
+
+    updates = watch_recent(FakeSlurm(), CsvUnitOfWork(history), 10)
+    assert [j.slurm_id for j in next(updates).jobs] == [400744]
+    assert next(updates) is None
+
+    with open(history, "a") as f:
+        f.write("400745,2023-02-06 14:33:38,abc123,README.md,COMPLETED,second,2023-02-06 14:33:38,none,none,[],False\n")
+    assert [j.slurm_id for j in next(updates).jobs] == [400745, 400744]
+
+
+def test_filter_only_refreshes_candidates(in_memory_uow):
+    time = datetime.now()
+    in_memory_uow.jobs.add(Record(1, time, "cae42f", "train.sbatch", JobStatus.PENDING, "training run", time))
+    in_memory_uow.jobs.add(Record(2, time, "cae42f", "eval.sbatch", JobStatus.PENDING, "evaluation", time))
+    in_memory_uow.jobs.add(Record(3, time, "cae42f", "train.sbatch", JobStatus.FAILED, "training run", time))
+    in_memory_uow.jobs.add(Record(4, time, "cae42f", "train.sbatch", JobStatus.COMPLETED, "training run", time))
+    slurm = ScriptedSlurm(default="RUNNING")
+
+    output = filter_jobs(in_memory_uow, slurm, FilterQuery(sbatch_filter=re.compile("train"), status_filter=re.compile("RUNNING|FAILED")))
+
+    assert sorted(j.slurm_id for j in output.jobs) == [1, 3]
+    # the evaluation job doesn't match the sbatch filter and job 4 has finished with another status
+    assert slurm.polled == [[1]]
+
+
+def test_filter_timestamp(in_memory_uow, fake_slurm):
+    in_memory_uow.jobs.add(Record(1, datetime(2023, 2, 6, 14, 32, 38, 12345), "cae42f", "a.sbatch", JobStatus.COMPLETED, "a", datetime.now()))
+    in_memory_uow.jobs.add(Record(2, datetime(2023, 3, 6, 14, 32, 38), "cae42f", "b.sbatch", JobStatus.COMPLETED, "b", datetime.now()))
+
+    output = filter_jobs(in_memory_uow, fake_slurm, FilterQuery(timestamp_filter=re.compile("^2023-02-06 14:32:38$")))
+
+    assert [j.slurm_id for j in output.jobs] == [1]
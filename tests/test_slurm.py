@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import subprocess
+from datetime import datetime
+import pytest
+from conftest import ScriptedSlurm
+from slutil.adapters import slurm
+from slutil.adapters.slurm import SlurmService
+from slutil.adapters.concurrent_slurm import ConcurrentSlurmService
+from slutil.adapters.abstract_slurm_service import SlurmError, SlurmNotAccessibleError
+from slutil.model.Record import Record, JobStatus
+from slutil.services.services import recent, report
+
+
+class FakeSubprocess:
+    """Stands in for the subprocess module inside the slurm adapter, answering sinfo/sacct and counting calls"""
+
+    CalledProcessError = subprocess.CalledProcessError
+
+    def __init__(self, statuses: dict[int, str]):
+        self.statuses = statuses
+        self.calls: list[list[str]] = []
+        self.sinfo_fails = False
+        self.sacct_fails = False
+
+    def run(self, command, **kwargs):
+        self.calls.append(command)
+        if command[0] == "sbatch":
+            return subprocess.CompletedProcess(command, 0, b"Submitted batch job 4242\n", b"")
+        if self.sinfo_fails:
+            raise subprocess.CalledProcessError(1, command)
+        return subprocess.CompletedProcess(command, 0, b"", b"")
+
+    def check_output(self, command, **kwargs):
+        self.calls.append(command)
+        if self.sacct_fails:
+            raise subprocess.CalledProcessError(1, command)
+        job_ids = [int(i) for i in command[2].split(",")]
+        lines = ["JobID|State|"] + [f"{i}|{self.statuses[i]}|" for i in job_ids if i in self.statuses]
+        return ("\n".join(lines) + "\n").encode()
+
+    def count(self, program: str) -> int:
+        return sum(1 for c in self.calls if c[0] == program)
+
+
+@pytest.fixture
+def fake_subprocess(monkeypatch):
+    fake = FakeSubprocess({})
+    monkeypatch.setattr(slurm, "subprocess", fake)
+    monkeypatch.setattr(SlurmService, "_accessible", None)
+    monkeypatch.delenv("SLUTIL_SLURM_CHECK_TTL", raising=False)
+    return fake
+
+
+def test_get_job_statuses_single_sacct_call(fake_subprocess):
+    fake_subprocess.statuses = {1: "COMPLETED", 2: "CANCELLED by 1234", 3: "RUNNING"}
+
+    statuses = SlurmService.get_job_statuses([1, 2, 3, 4])
+
+    assert statuses == {1: "COMPLETED", 2: "CANCELLED", 3: "RUNNING"}
+    assert fake_subprocess.count("sacct") == 1
+    assert fake_subprocess.calls[-1][2] == "1,2,3,4"
+
+
+def test_get_job_statuses_chunks_large_requests(fake_subprocess, monkeypatch):
+    monkeypatch.setattr(slurm, "SACCT_BATCH_SIZE", 10)
+    fake_subprocess.statuses = {i: "COMPLETED" for i in range(25)}
+
+    statuses = SlurmService.get_job_statuses(list(range(25)))
+
+    assert len(statuses) == 25
+    assert fake_subprocess.count("sacct") == 3
+
+
+def test_recent_uses_bulk_lookup(fake_subprocess, in_memory_uow):
+    time = datetime.now()
+    for i in range(50):
+        in_memory_uow.jobs.add(Record(i, time, "cae42f", "test.sbatch", JobStatus.PENDING, "bulk", time))
+    fake_subprocess.statuses = {i: "RUNNING" for i in range(50)}
+
+    response = recent(SlurmService(), in_memory_uow, 50)
+
+    assert all(j.status == "RUNNING" for j in response.jobs)
+    assert fake_subprocess.count("sacct") == 1
+
+
+def test_report_uses_bulk_lookup(fake_subprocess, in_memory_uow):
+    time = datetime.now()
+    for i in range(50):
+        in_memory_uow.jobs.add(Record(i, time, "cae42f", "test.sbatch", JobStatus.PENDING, "bulk", time))
+    fake_subprocess.statuses = {i: "FAILED" for i in range(0, 50, 2)}
+
+    response = report(SlurmService(), in_memory_uow)
+
+    assert sorted(j.slurm_id for j in response.jobs) == list(range(0, 50, 2))
+    assert fake_subprocess.count("sacct") == 1
+
+
+def test_slurm_access_checked_once_per_process(fake_subprocess):
+    fake_subprocess.statuses = {1: "COMPLETED"}
+
+    for _ in range(5):
+        SlurmService.get_job_statuses([1])
+        SlurmService.get_job_status(1, False)
+
+    assert fake_subprocess.count("sinfo") == 1
+    assert fake_subprocess.count("sacct") == 10
+
+
+def test_submit_passes_sbatch_path_as_one_argument(fake_subprocess):
+    slurm_id = SlurmService.submit_job("jobs/run; rm -rf ~.sbatch", "afterok", [1, 2])
+
+    assert slurm_id == 4242
+    assert fake_subprocess.calls[-1] == ["sbatch", "--dependency=afterok:1:2", "jobs/run; rm -rf ~.sbatch"]
+
+
+def test_slurm_down_fails_fast(fake_subprocess):
+    fake_subprocess.sinfo_fails = True
+
+    for _ in range(5):
+        with pytest.raises(SlurmNotAccessibleError):
+            SlurmService.get_job_statuses([1])
+
+    assert fake_subprocess.count("sinfo") == 1
+    assert fake_subprocess.count("sacct") == 0
+
+
+def test_slurm_access_rechecked_after_ttl(fake_subprocess, monkeypatch):
+    monkeypatch.setenv("SLUTIL_SLURM_CHECK_TTL", "0")
+
+    SlurmService.test_slurm_accessible()
+    SlurmService.test_slurm_accessible()
+
+    assert fake_subprocess.count("sinfo") == 2
+
+
+def test_failed_slurm_call_resets_access_cache(fake_subprocess):
+    SlurmService.test_slurm_accessible()
+    fake_subprocess.sacct_fails = True
+
+    with pytest.raises(SlurmError):
+        SlurmService.get_job_statuses([1])
+    SlurmService.test_slurm_accessible()
+
+    assert fake_subprocess.count("sinfo") == 2
+
+
+def lookup_status(job_id: int):
+    if job_id % 5 == 0:
+        return None
+    return "RUNNING" if job_id % 2 else "FAILED"
+
+
+def test_concurrent_lookup_is_bounded_and_deterministic():
+    slow_slurm = ScriptedSlurm(lookup_status, delay=0.01)
+    service = ConcurrentSlurmService(slow_slurm, 4)
+
+    statuses = service.get_job_statuses(list(range(1, 41)))
+
+    assert statuses == {i: ("RUNNING" if i % 2 else "FAILED") for i in range(1, 41) if i % 5 != 0}
+    assert 1 < slow_slurm.most_running <= 4
+
+
+def test_concurrent_lookup_keeps_slurm_not_accessible(in_memory_uow):
+    time_now = datetime.now()
+    job = Record(1, time_now, "cae42f", "test.sbatch", JobStatus.PENDING, "test", time_now)
+    in_memory_uow.jobs.add(job)
+    unreachable = ScriptedSlurm()
+    unreachable.accessible = False
+    service = ConcurrentSlurmService(unreachable, 4)
+
+    with pytest.raises(SlurmNotAccessibleError):
+        service.get_job_statuses([1])
+
+    response = recent(service, in_memory_uow, 10)
+    assert not response.fresh
+    assert response.jobs[0].status == "PENDING"
+
+
+@pytest.mark.parametrize("concurrency", ["four", "0", "-2"])
+def test_invalid_concurrency_falls_back_to_bulk_lookup(concurrency, monkeypatch, caplog):
+    from slutil.main import create_slurm_service
+
+    monkeypatch.setenv("SLUTIL_SLURM_CONCURRENCY", concurrency)
+    service = create_slurm_service()
+
+    assert type(service) is SlurmService
+    assert "invalid SLUTIL_SLURM_CONCURRENCY" in caplog.text
+
+
+def test_concurrency_from_environment(monkeypatch):
+    from slutil.main import create_slurm_service
+
+    monkeypatch.setenv("SLUTIL_SLURM_CONCURRENCY", "8")
+    service = create_slurm_service()
+
+    assert isinstance(service, ConcurrentSlurmService)
+    assert service.max_workers == 8
@@ -0,0 +1,129 @@
+import os
+from pathlib import Path
+import sqlite3
+from click.testing import CliRunner
+from slutil.main import command_factory
+from slutil.adapters.sqlite_repository import SqliteRepository
+from slutil.services.sqlite_uow import SqliteUnitOfWork
+from slutil.model.Record import JobStatus
+from slutil.services.services import hide_job, update_description
+
+
+HISTORY = (
+    "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],False\n"
+    "400745,2023-02-06 14:33:38,abc123,README.md,PENDING,second,2023-02-06 14:33:38,afterok,PENDING,\"[400744]\",False\n"
+    "400746,2023-02-06 14:34:38,abc123,README.md,FAILED,hidden,2023-02-06 14:34:38,none,none,[],True\n"
+)
+
+
+def test_migrate_command(fake_slurm, fake_vcs):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open(".slutil_job_history.csv", "w") as f:
+            f.write(HISTORY)
+
+        cmd = command_factory({})
+        result = runner.invoke(cmd, ["migrate"])
+        assert result.exit_code == 0
+        assert "Migrated 3 jobs" in result.output
+
+        uow = SqliteUnitOfWork(Path(SqliteRepository.filename))
+        with uow:
+            assert [j.slurm_id for j in uow.jobs.list()] == [400744, 400745]
+            assert uow.jobs.get_deleted(400746).description == "hidden"
+            assert uow.jobs.get(400745).dependencies.ids == [400744]
+
+        result = runner.invoke(cmd, ["migrate"])
+        assert result.exit_code == 1
+        assert isinstance(result.exception, FileExistsError)
+
+
+def test_failed_migration_leaves_no_datafile(monkeypatch):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open(".slutil_job_history.csv", "w") as f:
+            f.write(HISTORY)
+        save = SqliteRepository.save
+
+        def fail_halfway(self):
+            self._new = self._new[:1]
+            save(self)
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(SqliteRepository, "save", fail_halfway)
+        cmd = command_factory({})
+        result = runner.invoke(cmd, ["migrate"])
+        assert isinstance(result.exception, sqlite3.OperationalError)
+        assert not any(name.endswith((".sqlite", ".partial")) for name in os.listdir("."))
+
+        monkeypatch.setattr(SqliteRepository, "save", save)
+        result = runner.invoke(cmd, ["migrate"])
+        assert result.exit_code == 0, result.output
+        assert "Migrated 3 jobs" in result.output
+
+
+def test_status_from_sqlite(fake_slurm, fake_vcs):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open(".slutil_job_history.csv", "w") as f:
+            f.write(HISTORY)
+        runner.invoke(command_factory({}), ["migrate"])
+
+        cmd = command_factory({"uow": SqliteUnitOfWork(Path(SqliteRepository.filename)), "slurm": fake_slurm, "vcs": fake_vcs})
+        result = runner.invoke(cmd, ["status", "400745"])
+        assert result.exit_code == 0
+        assert "400745" in result.output
+
+
+def test_commit_writes_only_changed_rows(tmp_path):
+    SqliteRepository.create_file(tmp_path)
+    db_path = tmp_path / SqliteRepository.filename
+    connection = sqlite3.connect(db_path)
+    connection.executemany(
+        "INSERT INTO jobs (job_id, submitted_timestamp, git_tag, sbatch, status, description, last_updated, dependency_type, dependency_state, dependency_ids, is_deleted) "
+        "VALUES (?, '2023-02-06 14:32:38', 'abc123', 'test.sbatch', 'COMPLETED', 'job', '2023-02-06 14:32:38', NULL, NULL, '', 0)",
+        [(i,) for i in range(1000)],
+    )
+    connection.commit()
+    connection.close()
+
+    uow = SqliteUnitOfWork(db_path)
+    update_description(uow, 500, "new description")
+    assert uow.jobs.connection.total_changes == 1
+
+    hide_job(uow, 10)
+    assert uow.jobs.connection.total_changes == 2
+
+    uow = SqliteUnitOfWork(db_path)
+    with uow:
+        assert uow.jobs.get(500).description == "new description"
+        assert uow.jobs.get_deleted(10).slurm_id == 10
+        assert len(uow.jobs.list()) == 999
+
+
+def test_lists_read_only_the_rows_they_return(tmp_path):
+    SqliteRepository.create_file(tmp_path)
+    db_path = tmp_path / SqliteRepository.filename
+    connection = sqlite3.connect(db_path)
+    connection.executemany(
+        "INSERT INTO jobs (job_id, submitted_timestamp, git_tag, sbatch, status, description, last_updated, dependency_type, dependency_state, dependency_ids, is_deleted) "
+        "VALUES (?, '2023-02-06 14:32:38', 'abc123', 'test.sbatch', ?, 'job', '2023-02-06 14:32:38', NULL, NULL, '', ?)",
+        [(i, "RUNNING" if i % 100 == 0 else "COMPLETED", int(i % 10 == 5)) for i in range(1000)],
+    )
+    connection.commit()
+    connection.close()
+
+    uow = SqliteUnitOfWork(db_path)
+    with uow:
+        assert [j.slurm_id for j in uow.jobs.list_in_progress()] == list(range(0, 1000, 100))
+        assert len(uow.jobs._rows) == 10
+
+        # changes made in this unit of work count, though the stored flags say otherwise
+        uow.jobs.unhide(5)
+        uow.jobs.hide(100)
+        uow.jobs.get(200).status = JobStatus.COMPLETED
+        assert [j.slurm_id for j in uow.jobs.list_in_progress()] == [0] + list(range(300, 1000, 100))
+        listed = [j.slurm_id for j in uow.jobs.list()]
+        assert len(listed) == 900
+        assert 5 in listed and 100 not in listed and 15 not in listed
+        assert listed == sorted(listed)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+
+def imported_modules(cwd: Path, *args: str) -> set[str]:
+    """Run the cli under -X importtime and return the name of every module it imported"""
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    code = f"import sys; sys.argv = ['slutil', *{list(args)!r}]; from slutil.main import start_cli; start_cli()"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in proc.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+@pytest.mark.parametrize("args", [["--help"], ["submit", "--help"], ["filter", "--help"]])
+def test_startup_skips_heavy_imports(tmp_path, args):
+    modules = imported_modules(tmp_path, *args)
+
+    assert "slutil.main" in modules
+    assert not any(m == "rich" or m.startswith("rich.") for m in modules)
+    assert not any(m == "marshmallow" or m.startswith("marshmallow.") for m in modules)
+
+
+def test_dependencies_built_on_use(tmp_path):
+    # --help must not construct the unit of work or the slurm service
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    code = (
+        "import sys; sys.argv = ['slutil', '--help']\n"
+        "import slutil.main as main\n"
+        "def fail(): raise AssertionError('dependency built')\n"
+        "main.find_unit_of_work = fail\n"
+        "main.create_slurm_service = fail\n"
+        "main.start_cli()\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True)
+
+    assert proc.returncode == 0, proc.stderr
+    assert "Usage: slutil" in proc.stdout
+    assert "dependency built" not in proc.stdout
+
+
+def test_machine_readable_output_skips_rich(tmp_path):
+    (tmp_path / ".slutil_job_history.csv").write_text(
+        "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],False\n"
+    )
+    modules = imported_modules(tmp_path, "status", "400744", "--format", "jsonl")
+
+    assert "slutil.cli.output" in modules
+    assert not any(m == "rich" or m.startswith("rich.") for m in modules)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+import pytest
+from click.testing import CliRunner
+from conftest import FakeVCS, ScriptedSlurm
+from slutil.main import command_factory
+from slutil.services.csv_uow import CsvUnitOfWork
+from slutil.services.dto import JobRequestDTO
+from slutil.services.manifest import ManifestError, read_manifests
+from slutil.services.services import submit_many
+
+
+class CountingVCS(FakeVCS):
+    calls = 0
+
+    def get_current_commit(self):
+        self.calls += 1
+        return "abc123"
+
+
+class CountingUow(CsvUnitOfWork):
+    commits = 0
+
+    def _commit(self):
+        self.commits += 1
+        super()._commit()
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / ".slutil_job_history.csv"
+    path.touch()
+    for i in range(20):
+        (tmp_path / f"sweep_{i:02}.sbatch").write_text("srun ...")
+    return path
+
+
+def test_submit_many_forks_once_per_job(history):
+    slurm, vcs, uow = ScriptedSlurm(delay=0.01), CountingVCS(), CountingUow(history)
+    requests = [JobRequestDTO(f"sweep_{i:02}.sbatch", f"point {i}", None, []) for i in range(20)]
+
+    results = submit_many(slurm, uow, vcs, requests, max_workers=4)
+
+    assert [r.request for r in results] == requests
+    assert all(r.error is None for r in results)
+    assert vcs.calls == 1
+    assert slurm.access_checks == 1
+    assert uow.commits == 1
+    assert 1 < slurm.most_running <= 4
+
+    with CsvUnitOfWork(history) as saved:
+        jobs = {j.slurm_id: j for j in saved.jobs.list()}
+    assert {r.slurm_id: r.request.description for r in results} == {i: j.description for i, j in jobs.items()}
+
+
+def test_refused_jobs_reported_and_others_recorded(history):
+    slurm = ScriptedSlurm(delay=0.01, refuse=("sweep_03.sbatch",))
+    requests = [JobRequestDTO(f"sweep_{i:02}.sbatch", f"point {i}", None, []) for i in range(5)]
+
+    results = submit_many(slurm, CsvUnitOfWork(history), FakeVCS(), requests, max_workers=2)
+
+    assert [r.slurm_id is None for r in results] == [False, False, False, True, False]
+    assert "invalid script" in results[3].error
+    with CsvUnitOfWork(history) as saved:
+        assert len(saved.jobs.list()) == 4
+
+
+def test_read_manifests(history):
+    Path("sweep.csv").write_text("sbatch,description,dependency\nsweep_00.sbatch,first,\nsweep_01.sbatch,second,afterok:12:13\n")
+    Path("sweep.json").write_text(json.dumps([{"sbatch": "sweep_02.sbatch", "description": "third", "dependency": "singleton"}]))
+
+    requests = read_manifests(["sweep.csv", "sweep.json", "sweep_1[0-1].sbatch"], "globbed")
+
+    assert requests == [
+        JobRequestDTO("sweep_00.sbatch", "first", None, []),
+        JobRequestDTO("sweep_01.sbatch", "second", "afterok", [12, 13]),
+        JobRequestDTO("sweep_02.sbatch", "third", "singleton", []),
+        JobRequestDTO("sweep_10.sbatch", "globbed", None, []),
+        JobRequestDTO("sweep_11.sbatch", "globbed", None, []),
+    ]
+
+
+def test_manifest_paths_are_relative_to_manifest(history):
+    Path("pipeline").mkdir()
+    Path("pipeline/prepare.sbatch").write_text("#!/bin/bash\n")
+    Path("pipeline/jobs.csv").write_text("sbatch,description\nprepare.sbatch,prepare\n../sweep_00.sbatch,sweep\n")
+
+    requests = read_manifests(["pipeline/jobs.csv"])
+
+    assert [r.sbatch for r in requests] == [os.path.join("pipeline", "prepare.sbatch"), os.path.join("pipeline", "..", "sweep_00.sbatch")]
+
+
+def test_sbatch_names_are_only_globbed_with_glob_characters(history):
+    Path("sweep_{0}.sbatch").write_text("#!/bin/bash\n")
+
+    assert [r.sbatch for r in read_manifests(["sweep_{0}.sbatch"])] == ["sweep_{0}.sbatch"]
+    assert len(read_manifests(["sweep_0?.sbatch"])) == 10
+
+
+@pytest.mark.parametrize("manifest,error", [
+    ('[{"sbatch": "missing.sbatch", "description": "x"}]', "not found: missing.sbatch"),
+    ('[{"sbatch": "sweep_00.sbatch", "dependency": "before:1"}]', "entry 1: 'before:1' is not a supported dependency"),
+    ('[{"sbatch": "sweep_00.sbatch", "nodes": 4}]', "entry 1: unknown fields nodes"),
+    ('{"sbatch": "sweep_00.sbatch"}', "should hold a list"),
+])
+def test_invalid_manifest(history, manifest, error):
+    Path("sweep.json").write_text(manifest)
+
+    with pytest.raises(ManifestError) as e:
+        read_manifests(["sweep.json"])
+    assert error in str(e.value)
+
+
+def test_submit_many_command(history):
+    runner = CliRunner()
+    cmd = command_factory({"uow": CsvUnitOfWork(history), "slurm": ScriptedSlurm(delay=0.01), "vcs": FakeVCS()})
+
+    result = runner.invoke(cmd, ["submit-many", "sweep_0*.sbatch", "-j", "3"])
+
+    assert result.exit_code == 0, result.output
+    assert "Successfully submitted 10 jobs" in result.output
+    with CsvUnitOfWork(history) as saved:
+        assert sorted(j.description for j in saved.jobs.list()) == [f"sweep_{i:02}.sbatch" for i in range(10)]
+
+
+def test_manifest_pipeline_submitted_in_waves(history):
+    Path("pipeline.csv").write_text(
+        "sbatch,description,name,dependency\n"
+        "sweep_00.sbatch,prepare,prepare,afterok:77\n"
+        "sweep_01.sbatch,train a,,afterok:@prepare\n"
+        "sweep_02.sbatch,train b,,afterok:@prepare\n"
+        "sweep_03.sbatch,summarise,,afterany:@2:@3\n"
+    )
+    requests = read_manifests(["sweep_10.sbatch", "pipeline.csv"])
+    assert [r.dependency_requests for r in requests] == [[], [], [1], [1], [2, 3]]
+
+    slurm = ScriptedSlurm()
+    results = submit_many(slurm, CsvUnitOfWork(history), FakeVCS(), requests, max_workers=4)
+
+    ids = [r.slurm_id for r in results]
+    submitted = {sbatch: (dependency_type, dependency_list) for sbatch, dependency_type, dependency_list in slurm.submitted}
+    assert submitted["sweep_00.sbatch"] == ("afterok", [77])
+    assert submitted["sweep_01.sbatch"] == ("afterok", [ids[1]])
+    assert submitted["sweep_03.sbatch"] == ("afterany", [ids[2], ids[3]])
+    # a job is only submitted once the jobs it depends on have been
+    order = [sbatch for sbatch, _, _ in slurm.submitted]
+    assert order.index("sweep_00.sbatch") < order.index("sweep_01.sbatch") < order.index("sweep_03.sbatch")
+    with CsvUnitOfWork(history) as saved:
+        assert saved.jobs.get(ids[4]).dependencies.ids == [ids[2], ids[3]]
+
+
+def test_dependents_of_refused_jobs_are_not_submitted(history):
+    requests = [
+        JobRequestDTO("sweep_00.sbatch", "prepare", None, []),
+        JobRequestDTO("sweep_01.sbatch", "train", "afterok", [], [0]),
+        JobRequestDTO("sweep_02.sbatch", "unrelated", None, []),
+    ]
+    slurm = ScriptedSlurm(refuse=("sweep_00.sbatch",))
+
+    results = submit_many(slurm, CsvUnitOfWork(history), FakeVCS(), requests, max_workers=2)
+
+    assert [r.slurm_id is None for r in results] == [True, True, False]
+    assert results[1].error == "not submitted, depends on sweep_00.sbatch which wasn't submitted"
+    assert [sbatch for sbatch, _, _ in slurm.submitted] == ["sweep_02.sbatch"]
+
+
+@pytest.mark.parametrize("manifest,error", [
+    ('[{"sbatch": "sweep_00.sbatch", "dependency": "afterok:@train"}]', "entry 1: no entry is called train"),
+    ('[{"sbatch": "sweep_00.sbatch", "dependency": "afterok:@1"}]', "entry 1: depends on itself"),
+    ('[{"sbatch": "sweep_00.sbatch", "name": "a"}, {"sbatch": "sweep_01.sbatch", "name": "a"}]', "entry 2: name a is used"),
+    ('[{"sbatch": "sweep_00.sbatch", "name": "3"}]', "entry 1: name can't be a number"),
+])
+def test_invalid_manifest_references(history, manifest, error):
+    Path("pipeline.json").write_text(manifest)
+
+    with pytest.raises(ManifestError) as e:
+        read_manifests(["pipeline.json"])
+    assert error in str(e.value)
+
+
+def test_dependency_cycle_is_refused_before_submitting(history):
+    requests = [
+        JobRequestDTO("sweep_00.sbatch", "a", "afterok", [], [1]),
+        JobRequestDTO("sweep_01.sbatch", "b", "afterok", [], [0]),
+    ]
+    slurm = ScriptedSlurm()
+
+    with pytest.raises(ValueError) as e:
+        submit_many(slurm, CsvUnitOfWork(history), FakeVCS(), requests, max_workers=2)
+    assert "cycle" in str(e.value)
+    assert slurm.submitted == []
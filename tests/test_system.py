@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from unittest.mock import patch
 from click.testing import CliRunner
@@ -7,6 +8,13 @@ import re
 from datetime import datetime
 
 
+def read_history() -> str:
+    """The history as it will be once the journal has been folded into the csv file"""
+    CsvUnitOfWork(Path(".slutil_job_history.csv")).compact()
+    with open(".slutil_job_history.csv", "r") as f:
+        return f.read()
+
+
 def test_submit_job(fake_slurm, fake_vcs):
     runner = CliRunner()
     with runner.isolated_filesystem():
@@ -19,9 +27,7 @@ def test_submit_job(fake_slurm, fake_vcs):
         result = runner.invoke(cmd, ["submit", "test.sbatch", "test description"])
         assert result.exit_code == 0
 
-        file_contents = ""
-        with open(".slutil_job_history.csv", "r") as f:
-            file_contents = f.read()
+        file_contents = read_history()
 
         assert re.match(r"^Successfully submitted job (\d+)$", result.output)
         job_number = re.match(r"^Successfully submitted job (\d+)$", result.output).group(1)  # type: ignore
@@ -42,7 +48,6 @@ def test_status_job(fake_slurm, fake_vcs):
         with open(".slutil_job_history.csv", "w") as f:
             f.write(original_file_contents)
 
-        time = datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")
         open(".slutil_job_history.csv", "a+").close()
         cmd = command_factory({"uow": CsvUnitOfWork(Path(".slutil_job_history.csv")), "slurm": fake_slurm, "vcs": fake_vcs})
 
@@ -53,7 +58,8 @@ def test_status_job(fake_slurm, fake_vcs):
         with open(".slutil_job_history.csv", "r") as f:
             file_contents = f.read()
 
-        assert file_contents == f"329981,2023-02-04 13:39:39,dddbffe,fake.sbatch,COMPLETED,test,{time},none,none,[],False\n"
+        # nothing about a finished job changes, so the history file is left alone
+        assert file_contents == original_file_contents
 
         # CliRunner.invoke does not respect terminal size, (https://github.com/pallets/click/issues/1997)
         # Accept truncated output here until fixed
@@ -100,7 +106,6 @@ def test_recent(fake_slurm, fake_vcs):
         with open(".slutil_job_history.csv", "w") as f:
             f.write(original_file_contents)
 
-        time = datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")
         cmd = command_factory({"uow": CsvUnitOfWork(Path(".slutil_job_history.csv")), "slurm": fake_slurm, "vcs": fake_vcs})
 
         result = runner.invoke(cmd, ["recent"])
@@ -110,8 +115,7 @@ def test_recent(fake_slurm, fake_vcs):
         with open(".slutil_job_history.csv", "r") as f:
             file_contents = f.read()
 
-        assert file_contents == (f"594334,2023-02-04 13:32:47,dddbffe,fake.sbatch,COMPLETED,test,{time},none,none,[],False\n"
-                                  f"329981,2023-02-04 13:39:39,dddbffe,fake2.sbatch,COMPLETED,test2,{time},none,none,[],False\n")
+        assert file_contents == original_file_contents
 
         # CliRunner.invoke does not respect terminal size (https://github.com/pallets/click/issues/1997)
         # Accept truncated output here until fixed
@@ -146,19 +150,16 @@ def test_delete_job(fake_slurm, fake_vcs):
         with open(".slutil_job_history.csv", "w") as f:
             f.write(original_file_contents)
 
-        time = datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")
         cmd = command_factory({"uow": CsvUnitOfWork(Path(".slutil_job_history.csv")), "slurm": fake_slurm, "vcs": fake_vcs})
 
         result = runner.invoke(cmd, ["delete", "400744"], input="y")
         assert result.exit_code == 0
 
-        file_contents = ""
-        with open(".slutil_job_history.csv", "r") as f:
-            file_contents = f.read()
+        file_contents = read_history()
 
         assert (
             file_contents
-            == f"400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,{time},none,none,[],True\n"
+            == "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],True\n"
         )
 
 
@@ -201,9 +202,7 @@ def test_restore_command(fake_slurm, fake_vcs):
         assert result.exit_code == 0
         assert "Job 400744 restored" in result.output
 
-        file_contents = ""
-        with open(".slutil_job_history.csv", "r") as f:
-            file_contents = f.read()
+        file_contents = read_history()
 
         assert (
             file_contents
@@ -223,18 +222,68 @@ def test_edit_description(fake_slurm, fake_vcs):
         with open(".slutil_job_history.csv", "w") as f:
             f.write(original_file_contents)
         
-        time = datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")
         cmd = command_factory({"uow": CsvUnitOfWork(Path(".slutil_job_history.csv")), "slurm": fake_slurm, "vcs": fake_vcs})
 
         result = runner.invoke(cmd, ["edit", "400744"])
         assert result.exit_code == 0
         assert "Job description updated" in result.output
 
-        file_contents = ""
-        with open(".slutil_job_history.csv", "r") as f:
-            file_contents = f.read()
+        file_contents = read_history()
 
         assert (
             file_contents
-            == f"400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,new description,{time},none,none,[],False\n"
+            == "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,new description,2023-02-06 14:32:38,none,none,[],False\n"
+        )
+
+
+def test_read_only_commands_leave_file_untouched(fake_slurm, fake_vcs):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        original_file_contents = (
+            "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],False\n"
+            "400745,2023-02-06 14:33:38,abc123,README.md,FAILED,second,2023-02-06 14:33:38,none,none,[],False\n"
         )
+        with open(".slutil_job_history.csv", "w") as f:
+            f.write(original_file_contents)
+        modified_time = os.stat(".slutil_job_history.csv").st_mtime_ns
+
+        for command in (["status", "400744"], ["recent"], ["report"], ["filter", "-d", "test"]):
+            cmd = command_factory({"uow": CsvUnitOfWork(Path(".slutil_job_history.csv")), "slurm": fake_slurm, "vcs": fake_vcs})
+            result = runner.invoke(cmd, command)
+            assert result.exit_code == 0
+
+            assert os.stat(".slutil_job_history.csv").st_mtime_ns == modified_time
+            with open(".slutil_job_history.csv", "r") as f:
+                assert f.read() == original_file_contents
+
+
+def test_submit_appends_to_file(fake_slurm, fake_vcs):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("test.sbatch", "w") as f:
+            f.write("srun ...")
+        # a hand edited file may be missing its final newline
+        original_file_contents = (
+            "400744,2023-02-06 14:32:38,abc123,README.md,COMPLETED,testing,2023-02-06 14:32:38,none,none,[],False"
+        )
+        with open(".slutil_job_history.csv", "w") as f:
+            f.write(original_file_contents)
+        inode = os.stat(".slutil_job_history.csv").st_ino
+
+        cmd = command_factory({"uow": CsvUnitOfWork(Path(".slutil_job_history.csv")), "slurm": fake_slurm, "vcs": fake_vcs})
+        result = runner.invoke(cmd, ["submit", "test.sbatch", "appended"])
+        assert result.exit_code == 0
+
+        # the new job is appended to the journal, leaving the csv file as it was
+        assert os.stat(".slutil_job_history.csv").st_ino == inode
+        with open(".slutil_job_history.csv", "r") as f:
+            assert f.read() == original_file_contents
+        with open(".slutil_job_history.journal", "r") as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 1
+        assert re.match(r"^\d+,.*,test.sbatch,PENDING,appended,", lines[0])
+
+        lines = read_history().splitlines()
+        assert lines[0] == original_file_contents
+        assert re.match(r"^\d+,.*,test.sbatch,PENDING,appended,", lines[1])
+        assert not os.path.exists(".slutil_job_history.journal")